@@ -47,9 +47,15 @@ numerous ROS tools (e.g. rostopic).
 
 """
 
+# see roslib.instrument for profiling of 'import roslib'
+import roslib.instrument
+roslib.instrument.enter('import')
+
 from roslib.launcher import load_manifest
 from roslib.scriptutil import is_interactive, set_interactive
 
 # this import is necessary due to a bug in purge_build.py in our
 # debian assets.
 import roslib.stacks
+
+roslib.instrument.leave('import')
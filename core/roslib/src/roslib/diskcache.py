@@ -0,0 +1,133 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# Revision $Id$
+
+"""
+Internal library for the cache files that roslib keeps in ROS_HOME
+(e.g. the package index). Cache files are written to a temporary file
+and renamed into place, so concurrent readers never observe a partially
+written file. Caches are an optimization only: any error reading or
+writing a cache file is treated as a cache miss.
+"""
+
+import os
+import sys
+import tempfile
+import hashlib
+
+try:
+    import cPickle as pickle # Python 2.x
+except ImportError:
+    import pickle # Python 3.x
+
+import rospkg
+
+## name of directory within ROS_HOME where roslib stores cache files
+CACHE_DIR = 'roslib_cache'
+
+# pickle protocol 2 is understood by both Python 2 and 3. Cache files
+# are still kept separate per major version as str/bytes do not
+# round-trip between the two.
+_PROTOCOL = 2
+_SUFFIX = '-py%s'%sys.version_info[0]
+
+def get_cache_dir(name, env=None):
+    """
+    @param name: name of cache
+    @type  name: str
+    @param env: override os.environ dictionary
+    @type  env: dict
+    @return: directory that cache files for cache name are stored in
+    @rtype: str
+    """
+    return os.path.join(rospkg.get_ros_home(env), CACHE_DIR, name)
+
+def get_cache_file(name, key, env=None):
+    """
+    @param name: name of cache
+    @type  name: str
+    @param key: key of entry within cache. Must have a stable repr().
+    @type  key: object
+    @return: path of cache file for key
+    @rtype: str
+    """
+    digest = hashlib.md5(repr(key).encode('utf-8')).hexdigest()
+    return os.path.join(get_cache_dir(name, env), digest + _SUFFIX)
+
+def load(path):
+    """
+    @param path: cache file path
+    @type  path: str
+    @return: cached object, or None if the cache file does not exist
+      or cannot be read.
+    @rtype: object
+    """
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+def dump(path, obj):
+    """
+    Atomically write obj to the cache file at path.
+    @param path: cache file path
+    @type  path: str
+    @param obj: object to store. Must be picklable.
+    @type  obj: object
+    @return: True if the cache file was written
+    @rtype: bool
+    """
+    d = os.path.dirname(path)
+    try:
+        if not os.path.isdir(d):
+            os.makedirs(d)
+    except OSError:
+        # makedirs() races with other writers
+        if not os.path.isdir(d):
+            return False
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp', dir=d)
+    except (IOError, OSError):
+        return False
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(obj, f, _PROTOCOL)
+        os.rename(tmp_path, path)
+        return True
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
@@ -50,11 +50,10 @@ The structure of the serialization descends several levels of serializers:
 
 import os
 import keyword
-import shutil
-import atexit
 import itertools
 import sys
 import tempfile
+import threading
 import traceback
 import struct
 
@@ -71,6 +70,10 @@ import roslib.packages #for get_pkg_dir
 # indent width
 INDENT = '  '
 
+## version of the generated code, part of the input fingerprint of
+## generated files. Increment when the generated code changes.
+GENERATOR_VERSION = 2
+
 class MsgGenerationException(roslib.exceptions.ROSLibException):
     """
     Exception type for errors in roslib.genpy
@@ -122,6 +125,18 @@ def is_simple(type_):
     """
     return type_ in SIMPLE_TYPES
 
+def is_simple_array(type_):
+    """
+    @return: True if type_ is a fixed-length array of simple types
+    that is not serialized as a string. Such arrays are (de)serialized
+    together with adjacent simple types.
+    @rtype: bool
+    """
+    if not type_.endswith(']') or type_.endswith('[]'):
+        return False
+    base_type, _, _ = roslib.msgs.parse_type(type_)
+    return is_simple(base_type) and base_type not in ['uint8', 'byte']
+
 def is_special(type_):
     """
     @return True if type_ is a special type (i.e. builtin represented as a class instead of a primitive)
@@ -215,8 +230,11 @@ def default_value(field_type, default_package):
 def flatten(msg):
     """
     Flattens the msg spec so that embedded message fields become
-    direct references. The resulting MsgSpec isn't a true/legal
-    L{MsgSpec} and should only be used for serializer generation
+    direct references. The simple fields of embedded messages, and
+    thus entire fixed-size sub-messages, can then be (de)serialized
+    with a single struct call. The resulting MsgSpec isn't a
+    true/legal L{MsgSpec} and should only be used for serializer
+    generation
     @param msg: msg to flatten
     @type  msg: L{MsgSpec}
     @return: flatten message
@@ -269,16 +287,38 @@ def compute_struct_pattern(types):
     """
     @param types: type names
     @type  types: [str]
-    @return: format string for struct if types are all simple. Otherwise, return None
+    @return: format string for struct if types are all simple or
+    fixed-length arrays of simple types. Otherwise, return None
     @rtype: str
     """
     if not types: #important to filter None and empty first
         return None
     try: 
-        return ''.join([SIMPLE_TYPES_DICT[t] for t in types])
+        pattern = ''
+        for t in types:
+            if t in SIMPLE_TYPES_DICT:
+                pattern += SIMPLE_TYPES_DICT[t]
+            else:
+                base_type, _, array_len = roslib.msgs.parse_type(t)
+                pattern += SIMPLE_TYPES_DICT[base_type] * array_len
+        return pattern
     except:
         return None
 
+def compute_struct_array_fields(type_):
+    """
+    @param type_: message type
+    @type  type_: str
+    @return: flattened (field name, field type) pairs of type_ if all
+    of its fields are simple, i.e. if it has a fixed size. Otherwise,
+    return None
+    @rtype: ((str, str),)
+    """
+    spec = flatten(get_registered_ex(type_))
+    if not spec.types or [t for t in spec.types if not is_simple(t)]:
+        return None
+    return tuple(zip(spec.names, spec.types))
+
 def compute_post_deserialize(type_, varname):
     """
     Compute post-deserialization code for type_, if necessary
@@ -390,7 +430,7 @@ def reduce_pattern(pattern):
     prev = pattern[0]
     count = 1
     new_pattern = ''
-    nums = [str(i) for i in range(0, 9)]
+    nums = [str(i) for i in range(0, 10)]
     for c in pattern[1:]:
         if c == prev and not c in nums:
             count += 1
@@ -422,12 +462,16 @@ def int32_pack(var):
     return serialize('_struct_I.pack(%s)'%var)
 
 # int32 is very common due to length serialization, so it is special cased
-def int32_unpack(var, buff):
+def int32_unpack(var, buff, offset=None):
     """
     @param var: variable name
     @type  var: str
+    @param offset: (optional) offset in buff to unpack from
+    @type  offset: str
     @return: struct unpacking code for an int32
     """
+    if offset is not None:
+        return '(%s,) = _struct_I.unpack_from(%s, %s)'%(var, buff, offset)
     return '(%s,) = _struct_I.unpack(%s)'%(var, buff)
 
 #NOTE: '<' = little endian
@@ -452,7 +496,7 @@ def pack2(pattern, vars):
     @type  vars: str
     """
     return serialize("struct.pack(%s, %s)"%(pattern, vars))
-def unpack(var, pattern, buff):
+def unpack(var, pattern, buff, offset=None):
     """
     create struct.unpack call for when pattern is a string pattern
     @param var: name of variable to unpack
@@ -461,12 +505,16 @@ def unpack(var, pattern, buff):
     @type  pattern: str
     @param buff: buffer to unpack from
     @type  buff: str
+    @param offset: (optional) offset in buff to unpack from
+    @type  offset: str
     """
     # - store pattern in context
     pattern = reduce_pattern(pattern)
     add_pattern(pattern)
+    if offset is not None:
+        return var + " = _struct_%s.unpack_from(%s, %s)"%(pattern, buff, offset)
     return var + " = _struct_%s.unpack(%s)"%(pattern, buff)
-def unpack2(var, pattern, buff):
+def unpack2(var, pattern, buff, offset=None):
     """
     Create struct.unpack call for when pattern refers to variable
     @param var: variable the stores the result of unpack call
@@ -475,7 +523,11 @@ def unpack2(var, pattern, buff):
     @type  pattern: str
     @param buff: buffer that the unpack reads from
     @type  buff: StringIO
+    @param offset: (optional) offset in buff to unpack from
+    @type  offset: str
     """
+    if offset is not None:
+        return "%s = struct.unpack_from(%s, %s, %s)"%(var, pattern, buff, offset)
     return "%s = struct.unpack(%s, %s)"%(var, pattern, buff)
 
 ################################################################################
@@ -501,10 +553,12 @@ _NUMPY_DTYPE = {
     'byte' : 'numpy.int8',
     }
 # TODO: this doesn't explicitly specify little-endian byte order on the numpy data instance
-def unpack_numpy(var, count, dtype, buff):
+def unpack_numpy(var, count, dtype, buff, offset=None):
     """
     create numpy deserialization code
     """
+    if offset is not None:
+        return var + " = numpy.frombuffer(%s, dtype=%s, count=%s, offset=%s)"%(buff, dtype, count, offset)
     return var + " = numpy.frombuffer(%s, dtype=%s, count=%s)"%(buff, dtype, count)
 
 def pack_numpy(var):
@@ -517,15 +571,69 @@ def pack_numpy(var):
 ################################################################################
 # (De)serialization generators
 
-_serial_context = ''
-_context_stack = []
+class GeneratorContext(object):
+    """
+    State of the generation of one message: the variable context
+    stack, the variable counter and the struct patterns that have been
+    used. Generator functions use the context of the current thread,
+    which L{msg_generator()} sets while it generates a message.
+    """
+
+    def __init__(self, zero_copy=False, numpy_struct_arrays=False):
+        """
+        @param zero_copy: generate deserializers that unpack fields in
+        place from any object that supports the buffer protocol
+        @type  zero_copy: bool
+        @param numpy_struct_arrays: generate numpy (de)serializers that
+        map arrays of fixed-size messages onto numpy structured arrays
+        @type  numpy_struct_arrays: bool
+        """
+        self.serial_context = ''
+        self.context_stack = []
+        self.counter = 0
+        self.patterns = []
+        self.zero_copy = zero_copy
+        self.numpy_struct_arrays = numpy_struct_arrays
+
+_local = threading.local()
+
+def get_context():
+    """
+    @return: generator context of the current thread
+    @rtype: L{GeneratorContext}
+    """
+    try:
+        return _local.context
+    except AttributeError:
+        _local.context = GeneratorContext()
+        return _local.context
+
+def _with_context(context, generator):
+    """
+    Iterate generator with context set as the generator context of
+    the current thread, so that interleaved generators do not share
+    state.
+    @param context: generator context
+    @type  context: L{GeneratorContext}
+    @param generator: line generator
+    @type  generator: iterator
+    """
+    while True:
+        previous = get_context()
+        _local.context = context
+        try:
+            l = next(generator)
+        except StopIteration:
+            return
+        finally:
+            _local.context = previous
+        yield l
 
-_counter = 0
 def next_var():
     # we could optimize this by reusing vars once the context is popped
-    global _counter
-    _counter += 1
-    return '_v%s'%_counter
+    context = get_context()
+    context.counter += 1
+    return '_v%s'%context.counter
     
 def push_context(context):
     """
@@ -533,9 +641,9 @@ def push_context(context):
     manages field-reference context for serialization, e.g. 'self.foo'
     vs. 'self.bar.foo' vs. 'var.foo'
     """
-    global _serial_context, _context_stack
-    _context_stack.append(_serial_context)
-    _serial_context = context
+    c = get_context()
+    c.context_stack.append(c.serial_context)
+    c.serial_context = context
 
 def pop_context():
     """
@@ -543,25 +651,36 @@ def pop_context():
     field-reference context for serialization, e.g. 'self.foo'
     vs. 'self.bar.foo' vs. 'var.foo'
     """
-    global _serial_context
-    _serial_context = _context_stack.pop()
+    c = get_context()
+    c.serial_context = c.context_stack.pop()
 
-_context_patterns = []
 def add_pattern(p):
     """
     Record struct pattern that's been used for (de)serialization
     """
-    _context_patterns.append(p)
+    get_context().patterns.append(p)
 def clear_patterns():
     """
     Clear record of struct pattern that have been used for (de)serialization
     """
-    del _context_patterns[:]
+    del get_context().patterns[:]
 def get_patterns():
     """
     @return: record of struct pattern that have been used for (de)serialization
     """
-    return _context_patterns[:]
+    return get_context().patterns[:]
+
+def deserialize_source():
+    """
+    @return: buffer and offset expressions that the current field is
+    deserialized from. The offset is None unless the deserializer is
+    zero-copy, in which case fields are unpacked in place instead of
+    from a slice of the serialized buffer.
+    @rtype: (str, str)
+    """
+    if get_context().zero_copy:
+        return 'str', 'start'
+    return 'str[start:end]', None
 
 # These are the workhorses of the message generation. The generators
 # are implemented as iterators, where each iteration value is a line
@@ -592,7 +711,7 @@ def len_serializer_generator(var, is_string, serialize):
     else:
         yield "start = end"
         yield "end += 4"
-        yield int32_unpack('length', 'str[start:end]') #4 = struct.calcsize('<i') 
+        yield int32_unpack('length', *deserialize_source()) #4 = struct.calcsize('<i') 
     
 def string_serializer_generator(package, type_, name, serialize):
     """
@@ -606,12 +725,12 @@ def string_serializer_generator(package, type_, name, serialize):
     """
     # don't optimize in deserialization case as assignment doesn't
     # work
-    if _serial_context and serialize: 
+    if get_context().serial_context and serialize: 
         # optimize as string serialization accesses field twice
-        yield "_x = %s%s"%(_serial_context, name)
+        yield "_x = %s%s"%(get_context().serial_context, name)
         var = "_x"
     else:
-        var = _serial_context+name
+        var = get_context().serial_context+name
 
     # the length generator is a noop if serialize is True as we
     # optimize the serialization call.
@@ -647,7 +766,11 @@ def string_serializer_generator(package, type_, name, serialize):
             yield "end += %s" % array_len
         else:
             yield "end += length"
-        yield "%s = str[start:end]" % var
+        if get_context().zero_copy:
+            # str may be any buffer object, but fields are always bytes
+            yield "%s = _mv[start:end].tobytes()" % var
+        else:
+            yield "%s = str[start:end]" % var
         
 def array_serializer_generator(package, type_, name, serialize, is_numpy):
     """
@@ -666,7 +789,7 @@ def array_serializer_generator(package, type_, name, serialize, is_numpy):
             yield y
         return
     
-    var = _serial_context+name
+    var = get_context().serial_context+name
     try:
         # yield length serialization, if necessary
         if var_length:
@@ -691,9 +814,9 @@ def array_serializer_generator(package, type_, name, serialize, is_numpy):
                     yield "end += struct.calcsize(pattern)"
                     if is_numpy:
                         dtype = _NUMPY_DTYPE[base_type]
-                        yield unpack_numpy(var, 'length', dtype, 'str[start:end]') 
+                        yield unpack_numpy(var, 'length', dtype, *deserialize_source())
                     else:
-                        yield unpack2(var, 'pattern', 'str[start:end]')
+                        yield unpack2(var, 'pattern', *deserialize_source())
             else:
                 pattern = "%s%s"%(length, compute_struct_pattern([base_type]))
                 if serialize:
@@ -706,9 +829,9 @@ def array_serializer_generator(package, type_, name, serialize, is_numpy):
                     yield "end += %s"%struct.calcsize('<%s'%pattern)
                     if is_numpy:
                         dtype = _NUMPY_DTYPE[base_type]
-                        yield unpack_numpy(var, length, dtype, 'str[start:end]') 
+                        yield unpack_numpy(var, length, dtype, *deserialize_source())
                     else:
-                        yield unpack(var, pattern, 'str[start:end]')
+                        yield unpack(var, pattern, *deserialize_source())
             if not serialize and base_type == 'bool':
                 # convert uint8 to bool
                 if base_type == 'bool':
@@ -718,8 +841,31 @@ def array_serializer_generator(package, type_, name, serialize, is_numpy):
             #generic recursive serializer
             #NOTE: this is functionally equivalent to the is_registered branch of complex_serializer_generator
 
+            # arrays of fixed-size messages can be mapped onto numpy
+            # structured arrays
+            fields = None
+            if is_numpy and get_context().numpy_struct_arrays and base_type != 'string':
+                fields = compute_struct_array_fields(base_type)
+            if fields and not serialize:
+                if var_length:
+                    length = 'length'
+                pattern = compute_struct_pattern([t for _, t in fields])
+                buff, offset = deserialize_source()
+                yield "start = end"
+                yield "end += %s * %s"%(length, struct.calcsize('<%s'%reduce_pattern(pattern)))
+                yield "%s = roslib.message.struct_array(numpy, %s, %s, %s, %s, %r)"%(
+                    var, buff, offset or 0, length, compute_constructor(package, base_type)[:-2], fields)
+                return
+            indent = ''
+            if fields:
+                # elements of StructArrays are written in one call
+                yield 'if type(%s) == roslib.message.StructArray:'%var
+                yield INDENT + 'buff.write(%s.tobytes())'%var
+                yield 'else:'
+                indent = INDENT
+
             # choose a unique temporary variable for iterating
-            loop_var = 'val%s'%len(_context_stack)
+            loop_var = 'val%s'%len(get_context().context_stack)
 
             # compute the variable context and factory to use
             if base_type == 'string':
@@ -727,10 +873,10 @@ def array_serializer_generator(package, type_, name, serialize, is_numpy):
                 factory = string_serializer_generator(package, base_type, loop_var, serialize)
             else:
                 push_context('%s.'%loop_var)
-                factory = serializer_generator(package, get_registered_ex(base_type), serialize, is_numpy)
+                factory = serializer_generator(package, flatten(get_registered_ex(base_type)), serialize, is_numpy)
 
             if serialize:
-                yield 'for %s in %s:'%(loop_var, var)
+                yield indent + 'for %s in %s:'%(loop_var, var)
             else:
                 yield '%s = []'%var
                 if var_length:
@@ -740,7 +886,7 @@ def array_serializer_generator(package, type_, name, serialize, is_numpy):
                 if base_type != 'string':
                     yield INDENT + '%s = %s'%(loop_var, compute_constructor(package, base_type))
             for y in factory:
-                yield INDENT + y
+                yield indent + INDENT + y
             if not serialize:
                 yield INDENT + '%s.append(%s)'%(var, loop_var)
             pop_context()
@@ -784,11 +930,11 @@ def complex_serializer_generator(package, type_, name, serialize, is_numpy):
         if roslib.msgs.is_registered(type_):
             # descend data structure ####################
             ctx_var = next_var()
-            yield "%s = %s"%(ctx_var, _serial_context+name) 
+            yield "%s = %s"%(ctx_var, get_context().serial_context+name) 
             push_context(ctx_var+'.')
             # unoptimized code
             #push_context(_serial_context+name+'.')             
-            for y in serializer_generator(package, get_registered_ex(type_), serialize, is_numpy):
+            for y in serializer_generator(package, flatten(get_registered_ex(type_)), serialize, is_numpy):
                 yield y #recurs on subtype
             pop_context()
         else:
@@ -806,19 +952,23 @@ def simple_serializer_generator(spec, start, end, serialize): #primitives that c
     @type  end: int
     """
     # optimize member var access
-    if end - start > 1 and _serial_context.endswith('.'):
-        yield '_x = '+_serial_context[:-1]
-        vars_ = '_x.' + (', _x.').join(spec.names[start:end])
+    if end - start > 1 and get_context().serial_context.endswith('.'):
+        yield '_x = '+get_context().serial_context[:-1]
+        prefix = '_x.'
     else:
-        vars_ = _serial_context + (', '+_serial_context).join(spec.names[start:end])
+        prefix = get_context().serial_context
+    vars_ = prefix + (', '+prefix).join(spec.names[start:end])
     
     pattern = compute_struct_pattern(spec.types[start:end])
-    if serialize:
+    if [t for t in spec.types[start:end] if not is_simple(t)]:
+        for y in _simple_array_serializer_generator(spec, start, end, serialize, prefix, pattern):
+            yield y
+    elif serialize:
         yield pack(pattern, vars_)
     else:
         yield "start = end"
         yield "end += %s"%struct.calcsize('<%s'%reduce_pattern(pattern))
-        yield unpack('(%s,)'%vars_, pattern, 'str[start:end]')
+        yield unpack('(%s,)'%vars_, pattern, *deserialize_source())
         
         # convert uint8 to bool. this doesn't add much value as Python
         # equality test on a field will return that True == 1, but I
@@ -826,9 +976,65 @@ def simple_serializer_generator(spec, start, end, serialize): #primitives that c
         bool_vars = [(f, t) for f, t in zip(spec.names[start:end], spec.types[start:end]) if t == 'bool']
         for f, t in bool_vars:
             #TODO: could optimize this as well
-            var = _serial_context+f
+            var = get_context().serial_context+f
             yield "%s = bool(%s)"%(var, var)
 
+def _simple_array_serializer_generator(spec, start, end, serialize, prefix, pattern):
+    """
+    Subroutine of L{simple_serializer_generator()} for fields that
+    include fixed-length arrays of simple types. The fields are
+    (de)serialized with a single struct call, which is unpacked into a
+    temporary tuple that the fields are then sliced from.
+    @param prefix: variable prefix of fields
+    @type  prefix: str
+    @param pattern: struct pattern of fields
+    @type  pattern: str
+    """
+    # group consecutive simple fields: [(names, array length or None)]
+    groups = []
+    for f, t in zip(spec.names[start:end], spec.types[start:end]):
+        if is_simple(t):
+            if groups and groups[-1][1] is None:
+                groups[-1][0].append(prefix+f)
+            else:
+                groups.append(([prefix+f], None))
+        else:
+            groups.append(([prefix+f], roslib.msgs.parse_type(t)[2]))
+    if serialize:
+        if groups[-1][1] is not None and not [g for g in groups[:-1] if g[1] is not None]:
+            # arrays can only be passed as the last argument in Python 2
+            args = [', '.join(g[0]) for g in groups[:-1]] + ['*' + groups[-1][0][0]]
+            yield pack(pattern, ', '.join(args))
+        else:
+            arrays = [(names[0], length) for names, length in groups if length is not None]
+            if len(arrays) > 1:
+                # struct only checks the total number of values, so a
+                # wrong length would shift values into the next array
+                for var, length in arrays:
+                    yield "if len(%s) != %s:"%(var, length)
+                    yield INDENT+"raise struct.error('pack expected %s items for packing (got %%s)'%%len(%s))"%(length, var)
+            args = ['(%s,)'%', '.join(names) if length is None else 'tuple(%s)'%names[0] for names, length in groups]
+            yield pack(pattern, '*(%s)'%' + '.join(args))
+    else:
+        yield "start = end"
+        yield "end += %s"%struct.calcsize('<%s'%reduce_pattern(pattern))
+        yield unpack('_t', pattern, *deserialize_source())
+        offset = 0
+        for names, length in groups:
+            if length is None:
+                yield "(%s,) = _t[%s:%s]"%(', '.join(names), offset, offset + len(names))
+                offset += len(names)
+            else:
+                yield "%s = _t[%s:%s]"%(names[0], offset, offset + length)
+                offset += length
+        # convert uint8 to bool, see simple_serializer_generator()
+        for f, t in zip(spec.names[start:end], spec.types[start:end]):
+            var = get_context().serial_context+f
+            if t == 'bool':
+                yield "%s = bool(%s)"%(var, var)
+            elif t.startswith('bool['):
+                yield "%s = map(bool, %s)"%(var, var)
+
 def serializer_generator(package, spec, serialize, is_numpy):
     """
     Python generator that yields un-indented python code for
@@ -854,20 +1060,28 @@ def serializer_generator(package, spec, serialize, is_numpy):
         yield "pass"
         return
 
+    def simple_chunk(start, end):
+        if end - start == 1 and not is_simple(types[start]):
+            # a lone array is better served by the array serializer
+            return complex_serializer_generator(package, types[start], names[start], serialize, is_numpy)
+        return simple_serializer_generator(spec, start, end, serialize)
+
     # iterate through types. whenever we encounter a non-simple type,
     # yield serializer for any simple types we've encountered until
-    # then, then yield the complex type serializer
+    # then, then yield the complex type serializer. Fixed-length
+    # arrays of simple types are included in the chunks of simple
+    # types, except for numpy arrays.
     curr = 0
     for (i, type_) in enumerate(types):
-        if not is_simple(type_):
+        if not is_simple(type_) and (is_numpy or not is_simple_array(type_)):
             if i != curr: #yield chunk of simples
-                for y in simple_serializer_generator(spec, curr, i, serialize):
+                for y in simple_chunk(curr, i):
                     yield y
             curr = i+1
             for y in complex_serializer_generator(package, type_, names[i], serialize, is_numpy): 
                 yield y 
     if curr < len(types): #yield rest of simples
-        for y in simple_serializer_generator(spec, curr, len(types), serialize):
+        for y in simple_chunk(curr, len(types)):
             yield y
 
 def serialize_fn_generator(package, spec, is_numpy=False):
@@ -903,6 +1117,8 @@ def deserialize_fn_generator(package, spec, is_numpy=False):
             yield "  if self.%s is None:"%name
             yield "    self.%s = %s"%(name, compute_constructor(package, type_))
     yield "  end = 0" #initialize var
+    if get_context().zero_copy:
+        yield "  _mv = memoryview(str)"
 
     # method-var context #########
     push_context('self.')
@@ -922,7 +1138,7 @@ def deserialize_fn_generator(package, spec, is_numpy=False):
     yield "except struct.error as e:"
     yield "  raise roslib.message.DeserializationError(e) #most likely buffer underfill"
 
-def msg_generator(package, name, spec):
+def msg_generator(package, name, spec, gendeps_dict=None, zero_copy=False, numpy_struct_arrays=False):
     """
     Python code generator for .msg files. Takes in a package name,
     message name, and message specification and generates a Python
@@ -934,6 +1150,31 @@ def msg_generator(package, name, spec):
     @type  name: str
     @param spec: parsed .msg specification
     @type  spec: L{MsgSpec}
+    @param gendeps_dict: (optional) dependencies of spec, if already
+    computed with L{roslib.gentools.get_dependencies()}
+    @type  gendeps_dict: dict
+    @param zero_copy: (optional) if True, generate deserializers that
+    accept any object that supports the buffer protocol and unpack
+    fields in place with struct.unpack_from() instead of slicing the
+    buffer for every field.
+    @type  zero_copy: bool
+    @param numpy_struct_arrays: (optional) if True, generate numpy
+    deserializers that return arrays of fixed-size messages as
+    L{roslib.message.StructArray}s, which are backed by a numpy
+    structured array and only create message instances for the
+    elements that are accessed.
+    @type  numpy_struct_arrays: bool
+    @return: generator of the lines of Python code. Each message is
+    generated with its own L{GeneratorContext}, so messages can be
+    generated concurrently.
+    @rtype: iterator
+    """
+    context = GeneratorContext(zero_copy, numpy_struct_arrays)
+    return _with_context(context, _msg_generator(package, name, spec, gendeps_dict))
+
+def _msg_generator(package, name, spec, gendeps_dict):
+    """
+    Subroutine of L{msg_generator()}.
     """
     
     # #2990: have to compute md5sum before any calls to make_python_safe
@@ -941,11 +1182,14 @@ def msg_generator(package, name, spec):
     # generate dependencies dictionary. omit files calculation as we
     # rely on in-memory MsgSpecs instead so that we can generate code
     # for older versions of msg files
-    try:
-        gendeps_dict = roslib.gentools.get_dependencies(spec, package, compute_files=False)
-    except roslib.msgs.MsgSpecException as e:
-        raise MsgGenerationException("Cannot generate .msg for %s/%s: %s"%(package, name, str(e)))
+    if gendeps_dict is None:
+        try:
+            gendeps_dict = roslib.gentools.get_dependencies(spec, package, compute_files=False)
+        except roslib.msgs.MsgSpecException as e:
+            raise MsgGenerationException("Cannot generate .msg for %s/%s: %s"%(package, name, str(e)))
     md5sum = roslib.gentools.compute_md5(gendeps_dict)
+    context = get_context()
+    fingerprint = compute_fingerprint(package, name, gendeps_dict, md5sum, context.zero_copy, context.numpy_struct_arrays)
     
     # remap spec names to be Python-safe
     spec = make_python_safe(spec) 
@@ -956,6 +1200,7 @@ def msg_generator(package, name, spec):
     clear_patterns()
 
     yield '"""autogenerated by genmsg_py from %s.msg. Do not edit."""'%name
+    yield '%s%s'%(_FINGERPRINT_PREFIX, fingerprint)
     yield 'import roslib.message\nimport struct\n'
     import_strs = []
     for t in spec.types:
@@ -1047,13 +1292,18 @@ def msg_generator(package, name, spec):
     \"\"\""""
     for y in serialize_fn_generator(package, spec):
         yield "    "+ y
+    if get_context().zero_copy:
+        buff_type = 'str, or any object that supports the buffer protocol'
+    else:
+        buff_type = 'str'
+
     yield """
   def deserialize(self, str):
     \"\"\"
     unpack serialized message in str into this message instance
     @param str: byte array of serialized message
-    @type  str: str
-    \"\"\""""
+    @type  str: %s
+    \"\"\""""%buff_type
     for y in deserialize_fn_generator(package, spec):
         yield "    " + y
     yield ""
@@ -1074,10 +1324,10 @@ def msg_generator(package, name, spec):
     \"\"\"
     unpack serialized message in str into this message instance using numpy for array types
     @param str: byte array of serialized message
-    @type  str: str
+    @type  str: %s
     @param numpy: numpy python module
     @type  numpy: module
-    \"\"\""""
+    \"\"\""""%buff_type
     for y in deserialize_fn_generator(package, spec, is_numpy=True):
         yield "    " + y
     yield ""
@@ -1095,6 +1345,257 @@ def msg_generator(package, name, spec):
         yield '%s = struct.Struct("<%s")'%(var_name, p)
     clear_patterns()
     
+################################################################################
+# bulk generation
+
+_FINGERPRINT_PREFIX = '# input fingerprint: '
+
+def compute_fingerprint(package, name, gendeps_dict, md5sum=None, zero_copy=False, numpy_struct_arrays=False):
+    """
+    Compute the input fingerprint of the generated code of a message.
+    The fingerprint covers the text of the message and of its embedded
+    types, its md5sum, L{GENERATOR_VERSION} and the generator options.
+    @param package: name of package for message
+    @type  package: str
+    @param name: base type name of message
+    @type  name: str
+    @param gendeps_dict: dependencies of message, from L{roslib.gentools.get_dependencies()}
+    @type  gendeps_dict: dict
+    @param md5sum: (optional) md5sum of message, if already computed
+    @type  md5sum: str
+    @param zero_copy: (optional) zero_copy option of L{msg_generator()}
+    @type  zero_copy: bool
+    @param numpy_struct_arrays: (optional) numpy_struct_arrays option
+    of L{msg_generator()}
+    @type  numpy_struct_arrays: bool
+    @return: fingerprint
+    @rtype: str
+    """
+    import hashlib
+    if md5sum is None:
+        md5sum = roslib.gentools.compute_md5(gendeps_dict)
+    full_text = roslib.gentools.compute_full_text(gendeps_dict)
+    if not isinstance(full_text, bytes):
+        full_text = full_text.encode('utf-8')
+    version = GENERATOR_VERSION
+    if zero_copy:
+        version = '%s zero_copy'%version
+    if numpy_struct_arrays:
+        version = '%s numpy_struct_arrays'%version
+    h = hashlib.md5(('%s %s/%s %s\n'%(version, package, name, md5sum)).encode('utf-8'))
+    h.update(full_text)
+    return h.hexdigest()
+
+def read_fingerprint(path):
+    """
+    @param path: path of generated message module
+    @type  path: str
+    @return: input fingerprint of generated file, or None if the file
+    does not exist or has no fingerprint
+    @rtype: str
+    """
+    try:
+        with open(path) as f:
+            f.readline()
+            l = f.readline()
+    except IOError:
+        return None
+    if l.startswith(_FINGERPRINT_PREFIX):
+        return l[len(_FINGERPRINT_PREFIX):].strip()
+    return None
+
+def msg_output_file(package, name):
+    """
+    @param package: name of package for message
+    @type  package: str
+    @param name: base type name of message
+    @type  name: str
+    @return: path of the generated Python module of message
+    @rtype: str
+    """
+    return os.path.join(roslib.packages.get_pkg_dir(package), 'src', package, 'msg', '_%s.py'%name)
+
+def _write_if_changed(path, text):
+    """
+    Write text to path, unless the file already has that content. The
+    file is written to a temporary file and renamed into place.
+    @return: True if the file was written
+    @rtype: bool
+    """
+    try:
+        with open(path) as f:
+            if f.read() == text:
+                return False
+    except IOError:
+        pass
+    d = os.path.dirname(path)
+    try:
+        os.makedirs(d)
+    except OSError:
+        # makedirs() races with other writers
+        if not os.path.isdir(d):
+            raise
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp', dir=d)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.chmod(tmp_path, 0o644)
+        os.rename(tmp_path, path)
+    except:
+        os.remove(tmp_path)
+        raise
+    return True
+
+# jobs of the current generate_messages() call, inherited by pool
+# processes: [(package, name, output file, gendeps dict, msg_generator() options)]
+_bulk_jobs = []
+
+def _generate_jobs(indices):
+    """
+    Generate messages of _bulk_jobs. Runs in pool processes.
+    @param indices: indices of jobs to generate
+    @type  indices: [int]
+    @return: (output file, written, error message) for each job
+    @rtype: [(str, bool, str)]
+    """
+    results = []
+    for i in indices:
+        package, name, path, gendeps_dict, options = _bulk_jobs[i]
+        try:
+            text = ''.join([l + '\n' for l in msg_generator(package, name, gendeps_dict['spec'], gendeps_dict, **options)])
+            results.append((path, _write_if_changed(path, text), None))
+        except Exception as e:
+            results.append((path, False, "%s/%s: %s"%(package, name, e)))
+    return results
+
+def _generate_package(package, processes, dry_run, options):
+    """
+    Subroutine of L{generate_messages()} that generates the messages
+    of a single package.
+    @return: paths of the files that were (or would be) written
+    @rtype: [str]
+    """
+    global _bulk_jobs
+    # messages can refer to types of the same package without package
+    # name, so only one package can be loaded at a time
+    roslib.msgs.reinit()
+    roslib.msgs.load_package_dependencies(package, load_recursive=True)
+    roslib.msgs.load_package(package)
+    msgs = [(name, roslib.msgs.msg_file(package, name)) for name in sorted(roslib.msgs.list_msg_types(package, False))]
+    if not msgs:
+        return []
+    try:
+        deps = roslib.gentools.get_files_dependencies([f for _, f in msgs], compute_files=False)
+    except roslib.msgs.MsgSpecException as e:
+        raise MsgGenerationException("Cannot generate messages of %s: %s"%(package, e))
+
+    # skip messages whose generated files have the same inputs
+    jobs = []
+    for name, f in msgs:
+        path = msg_output_file(package, name)
+        try:
+            fingerprint = compute_fingerprint(package, name, deps[f], **options)
+        except Exception:
+            # let generation report the error
+            fingerprint = None
+        if fingerprint is None or fingerprint != read_fingerprint(path):
+            jobs.append((package, name, path, deps[f], options))
+
+    msg_dir = os.path.dirname(msg_output_file(package, msgs[0][0]))
+    init_files = [(os.path.join(msg_dir, '__init__.py'), ''.join(['from _%s import *\n'%name for name, _ in msgs]))]
+    # src/<package>/__init__.py, unless the package provides it
+    path = os.path.join(os.path.dirname(msg_dir), '__init__.py')
+    if not os.path.exists(path):
+        init_files.append((path, ''))
+
+    if dry_run:
+        written = [path for _, _, path, _, _ in jobs]
+        for path, text in init_files:
+            try:
+                with open(path) as f:
+                    if f.read() == text:
+                        continue
+            except IOError:
+                pass
+            written.append(path)
+        return written
+
+    _bulk_jobs = jobs
+    processes = min(processes, len(_bulk_jobs))
+    try:
+        if processes <= 1:
+            results = _generate_jobs(range(len(_bulk_jobs)))
+        else:
+            import multiprocessing
+            # pool processes inherit the loaded specs and _bulk_jobs
+            pool = multiprocessing.Pool(processes)
+            try:
+                results = []
+                chunks = [list(range(i, len(_bulk_jobs), processes)) for i in range(processes)]
+                for r in pool.imap_unordered(_generate_jobs, chunks):
+                    results.extend(r)
+            finally:
+                pool.close()
+                pool.join()
+    finally:
+        _bulk_jobs = []
+
+    errors = sorted([e for _, _, e in results if e])
+    if errors:
+        raise MsgGenerationException("Cannot generate messages:\n%s"%'\n'.join(errors))
+    written = sorted([path for path, w, _ in results if w])
+
+    for path, text in init_files:
+        if _write_if_changed(path, text):
+            written.append(path)
+    return written
+
+def generate_messages(packages, processes=None, dry_run=False, zero_copy=False, numpy_struct_arrays=False):
+    """
+    Generate the Python modules of all messages of packages, including
+    the msg/__init__.py module of each package. The message
+    specifications and md5sums of each package are loaded once, and
+    code generation is distributed over a pool of processes.
+
+    Messages are only regenerated if the input fingerprint (see
+    L{compute_fingerprint()}) of their generated file differs, and
+    files are only written if their content changes.
+
+    NOTE: this reinitializes the message registration table of
+    L{roslib.msgs}.
+    
+    @param packages: package names
+    @type  packages: [str]
+    @param processes: (optional) number of processes to generate
+    messages with. Defaults to the number of CPUs. If 1, messages
+    are generated in this process.
+    @type  processes: int
+    @param dry_run: (optional) if True, do not generate any files and
+    only return the files that would be regenerated.
+    @type  dry_run: bool
+    @param zero_copy: (optional) generate zero-copy deserializers. See
+    L{msg_generator()}.
+    @type  zero_copy: bool
+    @param numpy_struct_arrays: (optional) map arrays of fixed-size
+    messages onto numpy structured arrays in numpy deserializers. See
+    L{msg_generator()}.
+    @type  numpy_struct_arrays: bool
+    @return: paths of the files that were (or would be) written
+    @rtype: [str]
+    @raise MsgGenerationException: if any message cannot be generated
+    """
+    if processes is None:
+        import multiprocessing
+        processes = multiprocessing.cpu_count()
+    options = {'zero_copy': zero_copy, 'numpy_struct_arrays': numpy_struct_arrays}
+    written = []
+    try:
+        for package in packages:
+            written.extend(_generate_package(package, max(1, processes), dry_run, options))
+    finally:
+        roslib.msgs.reinit()
+    return written
+
 ################################################################################
 # dynamic generation of deserializer
 
@@ -1152,15 +1653,82 @@ def _gen_dyn_modify_references(py_text, types):
     py_text = py_text.replace('std_msgs.msg._Header.Header', _gen_dyn_name('std_msgs', 'Header'))
     return py_text
 
+## environment variable that enables the disk cache of dynamically
+## generated message classes if set to '1'
+ROS_DYNAMIC_CACHE = 'ROS_DYNAMIC_CACHE'
+## name of disk cache of dynamically generated message code in ROS_HOME
+DYNAMIC_CACHE_NAME = 'genpy_dynamic'
+
+# {key: {type name: message class}}
+_dynamic_classes = {}
+
+def _load_dynamic_code(key):
+    """
+    @return: cached code object of dynamically generated module, or None
+    @rtype: code
+    """
+    if os.environ.get(ROS_DYNAMIC_CACHE, '') != '1':
+        return None
+    import imp
+    import marshal
+    import roslib.diskcache
+    try:
+        data = roslib.diskcache.load(roslib.diskcache.get_cache_file(DYNAMIC_CACHE_NAME, key))
+        if type(data) == dict and data.get('magic') == imp.get_magic() and data.get('version') == GENERATOR_VERSION:
+            return marshal.loads(data['code'])
+    except Exception:
+        pass #cache is an optimization only
+    return None
+
+def _save_dynamic_code(key, code):
+    """
+    Store code object of dynamically generated module in the disk cache.
+    """
+    if os.environ.get(ROS_DYNAMIC_CACHE, '') != '1':
+        return
+    import imp
+    import marshal
+    import roslib.diskcache
+    try:
+        roslib.diskcache.dump(roslib.diskcache.get_cache_file(DYNAMIC_CACHE_NAME, key),
+                              {'magic': imp.get_magic(), 'version': GENERATOR_VERSION, 'code': marshal.dumps(code)})
+    except Exception:
+        pass #cache is an optimization only
+
 def generate_dynamic(core_type, msg_cat):
     """
     Dymamically generate message classes from msg_cat .msg text
-    gendeps dump. This method modifies sys.path to include a temp file
-    directory.
+    gendeps dump. Generated classes are cached by the MD5 hash of
+    core_type and msg_cat, so repeated calls for the same types return
+    the same classes. If the ROS_DYNAMIC_CACHE environment variable is
+    set to '1', the compiled code is also cached in ROS_HOME.
+
+    The message specs are registered in a registry that is local to
+    the calling thread, so this can be called from multiple threads.
     @param core_type str: top-level ROS message type of concatenanted .msg text
     @param msg_cat str: concatenation of full message text (output of gendeps --cat)
+    @return: message classes, keyed by type name
+    @rtype: dict
     @raise MsgGenerationException: if dep_msg is improperly formatted
     """
+    import hashlib
+    text = '%s\n%s'%(core_type, msg_cat)
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    key = hashlib.md5(text).hexdigest()
+    messages = _dynamic_classes.get(key, None)
+    if messages is None:
+        # threads that generate the same types concurrently all return
+        # the classes that are cached first
+        messages = _dynamic_classes.setdefault(key, _generate_dynamic(core_type, msg_cat, key))
+    return dict(messages)
+
+def _generate_dynamic(core_type, msg_cat, key):
+    """
+    Subroutine of L{generate_dynamic()}.
+    @param key: cache key of msg_cat
+    @type  key: str
+    """
     core_pkg, core_base_type = roslib.names.package_resource_name(core_type)
     
     # REP 100: pretty gross hack to deal with the fact that we moved
@@ -1181,41 +1749,18 @@ def generate_dynamic(core_type, msg_cat):
         # dependencies require more handling to determine type name
         dep_type, dep_spec = _generate_dynamic_specs(specs, dep_msg)
         specs[dep_type] = dep_spec
-    
-    # clear the message registration table and register loaded
-    # types. The types have to be registered globally in order for
-    # message generation of dependents to work correctly.
-    roslib.msgs.reinit()
-    for t, spec in specs.items():
-        roslib.msgs.register(t, spec)
-
-    # process actual MsgSpecs: we accumulate them into a single file,
-    # rewriting the generated text as needed
-    buff = StringIO()
-    for t, spec in specs.items():
-        pkg, s_type = roslib.names.package_resource_name(t)
-        # dynamically generate python message code
-        for l in msg_generator(pkg, s_type, spec):
-            l = _gen_dyn_modify_references(l, list(specs.keys()))
-            buff.write(l + '\n')
-    full_text = buff.getvalue()
-
-    # Create a temporary directory
-    tmp_dir = tempfile.mkdtemp(prefix='genpy_')
-
-    # Afterwards, we are going to remove the directory so that the .pyc file gets cleaned up if it's still around
-    atexit.register(shutil.rmtree, tmp_dir)
-    
-    # write the entire text to a file and import it
-    tmp_file = tempfile.NamedTemporaryFile(suffix=".py",dir=tmp_dir)
-    tmp_file.file.write(full_text)
-    tmp_file.file.close()
 
-    # import our temporary file as a python module, which requires modifying sys.path
-    sys.path.append(os.path.dirname(tmp_file.name))
+    code = _load_dynamic_code(key)
+    if code is None:
+        code = _compile_dynamic(specs, key)
+        _save_dynamic_code(key, code)
 
-    # - strip the prefix to turn it into the python module name
-    mod = __import__(os.path.basename(tmp_file.name)[:-3])
+    # execute the code in a new module, which is registered in
+    # sys.modules so that the message classes can be pickled
+    import types
+    mod = types.ModuleType('_genpy_dynamic_%s'%key)
+    sys.modules[mod.__name__] = mod
+    exec(code, mod.__dict__)
 
     # finally, retrieve the message classes from the dynamic module
     messages = {}
@@ -1225,10 +1770,31 @@ def generate_dynamic(core_type, msg_cat):
             messages[t] = getattr(mod, _gen_dyn_name(pkg, s_type))
         except AttributeError:
             raise MsgGenerationException("cannot retrieve message class for %s/%s"%(pkg, s_type))
-        
-    # erase the dirty work we've done
-    roslib.msgs.reinit()
-
     return messages
 
-
+def _compile_dynamic(specs, key):
+    """
+    Generate and compile the message code of specs.
+    @param specs: message specs, keyed by type name
+    @type  specs: dict
+    @return: code object of module
+    @rtype: code
+    """
+    # register the loaded types in a registry local to this thread,
+    # which message generation of dependents looks them up in.
+    buff = StringIO()
+    with roslib.msgs.local_registry():
+        for t, spec in specs.items():
+            roslib.msgs.register(t, spec)
+        if 'std_msgs/Header' in specs:
+            roslib.msgs.register(roslib.msgs.HEADER, specs['std_msgs/Header'])
+
+        # process actual MsgSpecs: we accumulate them into a single file,
+        # rewriting the generated text as needed
+        for t, spec in specs.items():
+            pkg, s_type = roslib.names.package_resource_name(t)
+            # dynamically generate python message code
+            for l in msg_generator(pkg, s_type, spec):
+                l = _gen_dyn_modify_references(l, list(specs.keys()))
+                buff.write(l + '\n')
+    return compile(buff.getvalue(), '<genpy_dynamic %s>'%key, 'exec')
@@ -43,6 +43,7 @@ md5sums and message definitions of classes.
 # NOTE: this should not contain any rospy-specific code. The rospy
 # generator library is rospy.genpy.
 
+import hashlib
 import sys
 
 try:
@@ -52,6 +53,7 @@ except ImportError:
 
 import rospkg
 
+import roslib.md5_cache
 import roslib.msgs 
 from roslib.msgs import MsgSpecException
 import roslib.names 
@@ -61,7 +63,7 @@ import roslib.srvs
 # name of the Header type as gentools knows it
 _header_type_name = 'std_msgs/Header'
 
-def _add_msgs_depends(rospack, spec, deps, package_context):
+def _add_msgs_depends(rospack, spec, deps, package_context, memo=None):
     """
     Add the list of message types that spec depends on to depends.
     @param spec: message to compute dependencies for
@@ -69,6 +71,9 @@ def _add_msgs_depends(rospack, spec, deps, package_context):
     @param deps [str]: list of dependencies. This list will be updated
     with the dependencies of spec when the method completes
     @type  deps: [str]
+    @param memo: (optional) dependencies of embedded types that have
+    already been computed, keyed by (id(spec), package_context)
+    @type  memo: dict
     @raise KeyError for invalid dependent types due to missing package dependencies.
     """
     valid_packages = ['', package_context]
@@ -107,7 +112,16 @@ def _add_msgs_depends(rospack, spec, deps, package_context):
             else:
                 # not allowed to load the message, so error.
                 raise KeyError(t)
-            _add_msgs_depends(rospack, depspec, deps, package_context)
+            if memo is None:
+                _add_msgs_depends(rospack, depspec, deps, package_context)
+                continue
+            key = (id(depspec), package_context)
+            entry = memo.get(key, None)
+            if entry is None or entry[0] is not depspec:
+                entry = (depspec, [])
+                _add_msgs_depends(rospack, depspec, entry[1], package_context, memo)
+                memo[key] = entry
+            deps.extend(entry[1])
 
 def compute_md5_text(get_deps_dict, spec):
     """
@@ -117,14 +131,23 @@ def compute_md5_text(get_deps_dict, spec):
     reordered ahead of other declarations, in the order that they were
     originally defined.
 
+    md5sums of embedded types are shared by all dependency
+    dictionaries of one L{get_files_dependencies()} call.
+
     @return: text for ROS MD5-processing
     @rtype: str
     """
-    uniquedeps = get_deps_dict['uniquedeps']
-    package = get_deps_dict['package']
-    # #1554: need to suppress computation of files in dynamic generation case
-    compute_files = 'files' in get_deps_dict
+    md5sums = get_deps_dict.get('md5sums', None)
+    if md5sums is None:
+        md5sums = {}
+    return _compute_md5_text(spec, get_deps_dict['package'], md5sums)
 
+def _compute_md5_text(spec, package, md5sums):
+    """
+    Subroutine of L{compute_md5_text()}.
+    @param md5sums: memo of embedded types, see L{_type_entry()}
+    @type  md5sums: dict
+    """
     buff = StringIO()    
 
     for c in spec.constants:
@@ -135,23 +158,89 @@ def compute_md5_text(get_deps_dict, spec):
         if roslib.msgs.is_builtin(base_msg_type):
             buff.write("%s %s\n"%(type_, name))
         else:
-            # recursively generate md5 for subtype.  have to build up
-            # dependency representation for subtype in order to
-            # generate md5
-
-            # - ugly special-case handling of Header
-            if base_msg_type == roslib.msgs.HEADER:
-                base_msg_type = _header_type_name
-                
-            sub_pkg, _ = roslib.names.package_resource_name(base_msg_type)
-            sub_pkg = sub_pkg or package
-            sub_spec = roslib.msgs.get_registered(base_msg_type, package)
-            sub_deps = get_dependencies(sub_spec, sub_pkg, compute_files=compute_files)
-            sub_md5 = compute_md5(sub_deps)
+            sub_md5 = _compute_type_md5(spec, package, base_msg_type, md5sums)
             buff.write("%s %s\n"%(sub_md5, name))
     
     return buff.getvalue().strip() # remove trailing new line
 
+def _type_entry(spec, package, base_msg_type, md5sums):
+    """
+    Get the memo entry of a type embedded in spec, which is computed
+    once per memo. The key of a type is its resolved name and the
+    hash of its text.
+    @param spec: message that embeds the type
+    @type  spec: L{roslib.msgs.MsgSpec}
+    @param package: package context of spec
+    @type  package: str
+    @param base_msg_type: embedded type, as declared in spec
+    @type  base_msg_type: str
+    @param md5sums: memo of embedded types
+    @type  md5sums: dict
+    @return: [key, sorted keys of all types embedded in the type,
+    md5sum or None if not computed yet, spec, package]
+    @rtype: list
+    """
+    # - ugly special-case handling of Header
+    if base_msg_type == roslib.msgs.HEADER:
+        base_msg_type = _header_type_name
+    sub_pkg, sub_base = roslib.names.package_resource_name(base_msg_type)
+    sub_pkg = sub_pkg or package
+    sub_name = sub_pkg + '/' + sub_base
+    entry = md5sums.get(sub_name, None)
+    if entry is not None:
+        return entry
+
+    try:
+        sub_spec = roslib.msgs.get_registered(base_msg_type, package)
+    except KeyError:
+        # load and register the embedded types of spec relative to its package
+        get_dependencies(spec, package, compute_files=False)
+        sub_spec = roslib.msgs.get_registered(base_msg_type, package)
+
+    embedded = set()
+    for t in sub_spec.types:
+        t = roslib.msgs.base_msg_type(t)
+        if not roslib.msgs.is_builtin(t):
+            e = _type_entry(sub_spec, sub_pkg, t, md5sums)
+            embedded.add(e[0])
+            embedded.update(e[1])
+    text = sub_spec.text
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    entry = [(sub_name, hashlib.md5(text).hexdigest()), tuple(sorted(embedded)), None, sub_spec, sub_pkg]
+    md5sums[sub_name] = entry
+    return entry
+
+def _compute_type_md5(spec, package, base_msg_type, md5sums):
+    """
+    Compute md5sum of a type embedded in spec. md5sums are memoized
+    in md5sums and persistently in L{roslib.md5_cache}, by the key of
+    the type and the keys of all types it embeds, so each embedded
+    type is only processed once.
+    @param spec: message that embeds the type
+    @type  spec: L{roslib.msgs.MsgSpec}
+    @param package: package context of spec
+    @type  package: str
+    @param base_msg_type: embedded type, as declared in spec
+    @type  base_msg_type: str
+    @param md5sums: memo of embedded types, see L{_type_entry()}
+    @type  md5sums: dict
+    @return: md5sum of embedded type
+    @rtype: str
+    """
+    entry = _type_entry(spec, package, base_msg_type, md5sums)
+    if entry[2] is None:
+        key, embedded, _, sub_spec, sub_pkg = entry
+        cache = roslib.md5_cache.get_cache()
+        cached = cache.get(key)
+        # entries are only valid if the embedded types are unchanged as well
+        if cached is not None and cached[1] == embedded:
+            entry[2] = cached[0]
+        else:
+            entry[2] = hashlib.md5(_compute_md5_text(sub_spec, sub_pkg, md5sums)).hexdigest()
+            cache.put(key, entry[2], embedded)
+    return entry[2]
+
 def _compute_hash(get_deps_dict, hash):
     """
     subroutine of compute_md5()
@@ -251,6 +340,21 @@ def compute_full_text(get_deps_dict):
     # #1168: remove the trailing \n separator that is added by the concatenation logic
     return buff.getvalue()[:-1]
 
+def _load_file(f):
+    """
+    @return: package name and spec of message or service file
+    @rtype: (str, L{roslib.msgs.MsgSpec}/L{roslib.srvs.SrvSpec})
+    """
+    _, package = roslib.packages.get_dir_pkg(f)
+    spec = None
+    if f.endswith(roslib.msgs.EXT):
+        _, spec = roslib.msgs.load_from_file(f, package)
+    elif f.endswith(roslib.srvs.EXT):
+        _, spec = roslib.srvs.load_from_file(f, package)
+    else:
+        raise Exception("[%s] does not appear to be a message or service"%spec)
+    return package, spec
+
 def get_file_dependencies(f, stdout=sys.stdout, stderr=sys.stderr):
     """
     Compute dependencies of the specified message/service file
@@ -265,16 +369,57 @@ def get_file_dependencies(f, stdout=sys.stdout, stderr=sys.stderr):
     instance.
     @rtype: dict
     """
-    _, package = roslib.packages.get_dir_pkg(f)
-    spec = None
-    if f.endswith(roslib.msgs.EXT):
-        _, spec = roslib.msgs.load_from_file(f)
-    elif f.endswith(roslib.srvs.EXT):
-        _, spec = roslib.srvs.load_from_file(f)
-    else:
-        raise Exception("[%s] does not appear to be a message or service"%spec)
+    package, spec = _load_file(f)
     return get_dependencies(spec, package, stdout, stderr)
 
+def get_files_dependencies(files, compute_files=True, stdout=sys.stdout, stderr=sys.stderr):
+    """
+    Compute dependencies of many message/service files at once. This
+    is equivalent to calling L{get_file_dependencies()} for each file,
+    but the loaded message specifications and package dependencies are
+    shared between all files.
+    @param files: message and service files to get dependencies for
+    @type  files: [str]
+    @param compute_files: (optional, default=True) compute file
+    dependencies of messages ('files' key in return values)
+    @type  compute_files: bool
+    @param stdout: (optional) stdout pipe
+    @type  stdout: file
+    @param stderr: (optional) stderr pipe
+    @type  stderr: file
+    @return: dependencies of each file, keyed by file. See
+    L{get_dependencies()} for the format of the values, which
+    additionally share a memo of md5sums of embedded types
+    ('md5sums' key).
+    @rtype: dict
+    """
+    roslib.msgs._init()
+    rospack = rospkg.RosPack()
+    memo = {}
+    # md5sums of embedded types, shared by all files, see compute_md5_text()
+    md5sums = {}
+    retval = {}
+    for f in files:
+        if f in retval:
+            continue
+        package, spec = _load_file(f)
+        retval[f] = d = _get_dependencies(spec, package, compute_files, rospack, memo)
+        d['md5sums'] = md5sums
+    return retval
+
+def get_package_files(packages):
+    """
+    @param packages: package names
+    @type  packages: [str]
+    @return: paths of all message and service files of packages
+    @rtype: [str]
+    """
+    files = []
+    for p in packages:
+        files.extend([roslib.msgs.msg_file(p, t) for t in roslib.msgs.list_msg_types(p, False)])
+        files.extend([roslib.srvs.srv_file(p, t) for t in roslib.srvs.list_srv_types(p, False)])
+    return files
+
 def get_dependencies(spec, package, compute_files=True, stdout=sys.stdout, stderr=sys.stderr):
     """
     Compute dependencies of the specified Msgs/Srvs
@@ -304,20 +449,27 @@ def get_dependencies(spec, package, compute_files=True, stdout=sys.stdout, stder
     #we're going to manipulate internal apis of msgs, so have to
     #manually init
     roslib.msgs._init()
+    return _get_dependencies(spec, package, compute_files, rospkg.RosPack(), {})
 
+def _get_dependencies(spec, package, compute_files, rospack, memo):
+    """
+    Subroutine of L{get_dependencies()} and L{get_files_dependencies()}.
+    @param rospack: package dependency lookup
+    @type  rospack: rospkg.RosPack
+    @param memo: dependencies of embedded types, see L{_add_msgs_depends()}
+    @type  memo: dict
+    """
     deps = []
     try:
-        rospack = rospkg.RosPack()
         if isinstance(spec, roslib.msgs.MsgSpec):
-            _add_msgs_depends(rospack, spec, deps, package)
+            _add_msgs_depends(rospack, spec, deps, package, memo)
         elif isinstance(spec, roslib.srvs.SrvSpec):
-            _add_msgs_depends(rospack, spec.request, deps, package)
-            _add_msgs_depends(rospack, spec.response, deps, package)                
+            _add_msgs_depends(rospack, spec.request, deps, package, memo)
+            _add_msgs_depends(rospack, spec.response, deps, package, memo)
         else:
             raise MsgSpecException("spec does not appear to be a message or service")
     except KeyError, e:
         raise MsgSpecException("Cannot load type %s.  Perhaps the package is missing a dependency."%(str(e)))
-
     # convert from type names to file names
     
     if compute_files:
@@ -0,0 +1,214 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# Revision $Id$
+
+"""
+Opt-in instrumentation of roslib startup.
+
+If the ROS_STARTUP_PROFILE environment variable is set, roslib
+records the wall time and the number of filesystem operations (stat,
+listdir, open) of each startup phase:
+
+ - import: C{import roslib}
+ - sys_path: L{roslib.load_manifest()}, i.e. building sys.path
+ - crawl: loading and validating the package index
+ - manifest_parse: parsing manifest files
+ - msg_load: loading .msg/.srv files, including L{roslib.msgs._init()}
+
+Phases nest (e.g. crawl within sys_path). The 'time' of a phase
+includes nested phases, its 'self_time' does not, and filesystem
+operations are counted in the innermost phase. A report is written
+when the process exits: to stderr if ROS_STARTUP_PROFILE is '1',
+otherwise to the file it names ('%p' is replaced with the process
+id). The report is a JSON object, with times in seconds and
+total_time measured from the import of roslib::
+
+  {"pid": 1234, "argv": [...], "total_time": 0.21,
+   "phases": {"crawl": {"calls": 1, "time": 0.12, "self_time": 0.12,
+                        "fs": {"stat": 5012, "listdir": 431, "open": 1}},
+              ...},
+   "other": {"fs": {...}}}
+
+If ROS_STARTUP_PROFILE is not set, L{phase()} returns functions
+unchanged and there is no overhead.
+"""
+
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+
+try:
+    import __builtin__ as builtins # Python 2.x
+except ImportError:
+    import builtins # Python 3.x
+
+## environment variable that enables instrumentation
+ROS_STARTUP_PROFILE = 'ROS_STARTUP_PROFILE'
+
+_enabled = bool(os.environ.get(ROS_STARTUP_PROFILE, ''))
+_start_time = time.time()
+_lock = threading.Lock()
+# {phase name: [calls, time, self_time, {fs op: count}]}
+_phases = {}
+# fs operations outside of any phase
+_other = {}
+# [[name, start time, time of nested phases]] of the active phases
+_stack = []
+
+def is_enabled():
+    """
+    @return: True if startup instrumentation is enabled
+    @rtype: bool
+    """
+    return _enabled
+
+def enter(name):
+    """
+    Start phase name. Must be paired with L{leave()}.
+    @param name: phase name
+    @type  name: str
+    """
+    if _enabled:
+        with _lock:
+            _stack.append([name, time.time(), 0.0])
+
+def leave(name):
+    """
+    End phase name, which must be the innermost active phase.
+    @param name: phase name
+    @type  name: str
+    """
+    if not _enabled:
+        return
+    with _lock:
+        if not _stack or _stack[-1][0] != name:
+            return
+        _, start, nested = _stack.pop()
+        elapsed = time.time() - start
+        record = _phases.get(name, None)
+        if record is None:
+            record = _phases[name] = [0, 0.0, 0.0, {}]
+        record[0] += 1
+        record[2] += elapsed - nested
+        # don't count time of recursive activations twice
+        if not [e for e in _stack if e[0] == name]:
+            record[1] += elapsed
+        if _stack:
+            _stack[-1][2] += elapsed
+
+def phase(name):
+    """
+    Decorator that records calls of the decorated function as phase
+    name.
+    @param name: phase name
+    @type  name: str
+    """
+    def decorator(f):
+        if not _enabled:
+            return f
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            enter(name)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                leave(name)
+        return wrapper
+    return decorator
+
+def _count(op):
+    with _lock:
+        if _stack:
+            fs = _phases.get(_stack[-1][0], None)
+            if fs is None:
+                fs = _phases[_stack[-1][0]] = [0, 0.0, 0.0, {}]
+            fs = fs[3]
+        else:
+            fs = _other
+        fs[op] = fs.get(op, 0) + 1
+
+def _counted(op, f):
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        _count(op)
+        return f(*args, **kwargs)
+    return wrapper
+
+def _install_hooks():
+    """
+    Count filesystem operations by wrapping the os and builtin
+    functions that perform them.
+    """
+    for name, op in [('stat', 'stat'), ('lstat', 'stat'), ('listdir', 'listdir'), ('scandir', 'listdir')]:
+        if hasattr(os, name):
+            setattr(os, name, _counted(op, getattr(os, name)))
+    builtins.open = _counted('open', builtins.open)
+
+def get_report():
+    """
+    @return: startup report. See module documentation.
+    @rtype: dict
+    """
+    with _lock:
+        phases = {}
+        for name, (calls, t, self_time, fs) in _phases.items():
+            phases[name] = {'calls': calls, 'time': t, 'self_time': self_time, 'fs': dict(fs)}
+        return {'pid': os.getpid(), 'argv': sys.argv,
+                'total_time': time.time() - _start_time,
+                'phases': phases, 'other': {'fs': dict(_other)}}
+
+def write_report():
+    """
+    Write the startup report to the destination configured in
+    ROS_STARTUP_PROFILE.
+    """
+    dest = os.environ.get(ROS_STARTUP_PROFILE, '')
+    if not dest:
+        return
+    import json
+    text = json.dumps(get_report(), indent=2, sort_keys=True)
+    if dest == '1':
+        sys.stderr.write(text + '\n')
+    else:
+        try:
+            with open(dest.replace('%p', str(os.getpid())), 'w') as f:
+                f.write(text + '\n')
+        except IOError as e:
+            sys.stderr.write("cannot write startup profile: %s\n"%e)
+
+if _enabled:
+    _install_hooks()
+    atexit.register(write_report)
@@ -41,10 +41,22 @@ derived from dependency structure declared in ROS manifest files.
 
 import sys
 import os
+import time
 
+import roslib.diskcache
+import roslib.instrument
 import roslib.manifest
+import roslib.manifest_cache
 import roslib.packages
 
+## name of python path cache in ROS_HOME
+CACHE_NAME = 'python_path'
+## increment when the format of cache entries changes
+CACHE_VERSION = 1
+
+# packages modified less than this many seconds ago are not cached
+_RACY_WINDOW = 2.0
+
 def get_manifest_file(package_name):
     """
     @return: name of package to get manifest for
@@ -54,8 +66,17 @@ def get_manifest_file(package_name):
     return roslib.manifest.manifest_file(package_name, required=True)
         
 # bootstrapped keeps track of which packages we've loaded so we don't update the path multiple times
-_bootstrapped = []
+_bootstrapped = set()
+
+# python path information of packages, as loaded from and saved to
+# the python path cache. {package: (pkg_dir, manifest_mtime,
+# manifest_size, dir_mtime, paths, depends)}. See _get_package_info().
+_cache = None
+_cache_key = None
+_cache_file = None
+_cache_dirty = False
 
+@roslib.instrument.phase('sys_path')
 def load_manifest(package_name, bootstrap_version="0.7"):
     """
     Update the Python sys.path with package's dependencies
@@ -73,6 +94,87 @@ def load_manifest(package_name, bootstrap_version="0.7"):
         prefix = [os.path.join(os.environ['ROS_BUILD'], 'gen', 'py'),
                   os.path.join(os.environ['ROS_BUILD'], '..', 'rosidl', 'src')]
     sys.path = prefix + _generate_python_path(package_name, [], os.environ) + sys.path
+    _save_cache()
+
+def _load_cache(env):
+    """
+    Load the python path cache for the ROS_ROOT and ROS_PACKAGE_PATH
+    of env. The cache is disabled if ROS_MANIFEST_CACHE is set to '0'.
+    """
+    global _cache, _cache_key, _cache_file, _cache_dirty
+    # ROS_HOME defaults to ~/.ros
+    key = (env.get('ROS_ROOT', None), env.get('ROS_PACKAGE_PATH', None),
+           env.get('ROS_HOME', None), env.get('HOME', None),
+           env.get(roslib.manifest_cache.ROS_MANIFEST_CACHE, '') == '0')
+    if key == _cache_key:
+        return
+    _save_cache()
+    _cache = {}
+    _cache_key = key
+    _cache_file = None
+    _cache_dirty = False
+    if key[-1]:
+        return
+    try:
+        _cache_file = roslib.diskcache.get_cache_file(CACHE_NAME, (CACHE_VERSION,) + key[:2], env)
+    except Exception:
+        return
+    data = roslib.diskcache.load(_cache_file)
+    if type(data) == dict:
+        _cache = data
+
+def _save_cache():
+    """
+    Write the python path cache if it has new entries.
+    """
+    global _cache_dirty
+    if _cache_dirty and _cache_file:
+        roslib.diskcache.dump(_cache_file, _cache)
+        _cache_dirty = False
+
+def _get_package_info(pkg, env):
+    """
+    Get the python path information of pkg, either from the python
+    path cache or from its manifest. Cache entries are valid as long
+    as the package directory and manifest file are unchanged.
+
+    NOTE: a cache entry is not invalidated if a package of the same
+    name is added to a directory that precedes pkg on the package path.
+    
+    @return: package directory, python paths exported by the package
+      and names of the packages it depends on
+    @rtype: (str, [str], [str])
+    @raise InvalidROSPkgException: if pkg cannot be located
+    """
+    global _cache_dirty
+    _load_cache(env)
+    entry = _cache.get(pkg, None)
+    if entry is not None:
+        try:
+            pkg_dir = entry[0]
+            st = os.stat(os.path.join(pkg_dir, roslib.packages.MANIFEST_FILE))
+            dir_mtime = os.stat(pkg_dir).st_mtime
+            if (st.st_mtime, st.st_size, dir_mtime) == entry[1:4]:
+                return pkg_dir, entry[4], entry[5]
+        except OSError:
+            pass
+
+    manifest_file = roslib.manifest.manifest_file(pkg, True, env)
+    if not manifest_file:
+        raise roslib.packages.InvalidROSPkgException("cannot locate package [%s]"%pkg)
+    pkg_dir = os.path.dirname(os.path.abspath(manifest_file))
+    st = os.stat(manifest_file)
+    dir_mtime = os.stat(pkg_dir).st_mtime
+    m = roslib.manifest.parse_file(manifest_file)
+    paths = []
+    _append_package_paths(m, paths, pkg_dir)
+    depends = [d.package for d in m.depends]
+    if time.time() - max(st.st_mtime, dir_mtime) > _RACY_WINDOW:
+        _cache[pkg] = (pkg_dir, st.st_mtime, st.st_size, dir_mtime, paths, depends)
+        _cache_dirty = True
+    elif _cache.pop(pkg, None) is not None:
+        _cache_dirty = True
+    return pkg_dir, paths, depends
     
 def _append_package_paths(manifest_, paths, pkg_dir):
     """
@@ -108,32 +210,25 @@ def _generate_python_path(pkg, depends, env=os.environ):
     """
     if pkg in _bootstrapped:
         return []
-    manifest_file = roslib.manifest.manifest_file(pkg, True, env)
-    if not manifest_file:
-        raise roslib.packages.InvalidROSPkgException("cannot locate package [%s]"%pkg)
-    _bootstrapped.append(pkg)
-    
-    pkg_dir = os.path.dirname(os.path.abspath(manifest_file))
+    pkg_dir, pkg_paths, pkg_depends = _get_package_info(pkg, env)
+    _bootstrapped.add(pkg)
     depends.append(pkg)
-    m = roslib.manifest.parse_file(manifest_file)
     
-    paths = []
-    _append_package_paths(m, paths, pkg_dir)
+    paths = list(pkg_paths)
 
     try:
-        for d in m.depends:
-            if d.package in depends:
+        for d in pkg_depends:
+            if d in depends:
                 continue 
             try: #add sub-dependencies to paths and depends
-                paths.extend(_generate_python_path(d.package, depends, env))
+                paths.extend(_generate_python_path(d, depends, env))
             except roslib.packages.InvalidROSPkgException as e:
                 # translate error message to give more context
-                raise roslib.packages.InvalidROSPkgException("While loading package '%s': %s"%(d.package, str(e)))
+                raise roslib.packages.InvalidROSPkgException("While loading package '%s': %s"%(d, str(e)))
             except:
                 import traceback
-                raise roslib.packages.InvalidROSPkgException("While loading package '%s': cannot load dependency '%s'\nLower level error was %s"%(pkg, d.package, traceback.format_exc()))
+                raise roslib.packages.InvalidROSPkgException("While loading package '%s': cannot load dependency '%s'\nLower level error was %s"%(pkg, d, traceback.format_exc()))
     except:
-        if pkg in _bootstrapped:
-            _bootstrapped.remove(pkg)
+        _bootstrapped.discard(pkg)
         raise
     return paths
@@ -0,0 +1,395 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# Revision $Id$
+
+"""
+Lazy deserialization of messages.
+
+A lazy message is an instance of a subclass of a generated message
+class that keeps the serialized buffer and only decodes a field when
+it is first accessed. The start offsets of the fields are computed
+on demand from the C{_slot_types} of the message class, skipping over
+fixed-size fields and sub-messages without decoding them. This is
+useful to filter or route large messages by their header or a scalar
+field.
+
+Lazy message classes can be used wherever a message class is
+expected, e.g. as the data class of a subscriber::
+
+  msg = lazy_class(sensor_msgs.msg.PointCloud)().deserialize(buff)
+  msg.header.stamp # decodes only the header
+
+An untouched lazy message serializes by writing its buffer. Once a
+field has been set, or a field that is itself mutable (a message or a
+list) has been decoded, the message is fully decoded by
+L{materialize()} and serialized by the generated code.
+"""
+
+import struct
+import sys
+
+import genpy
+
+import roslib.message
+import roslib.msgs
+from roslib.genpy_electric import SIMPLE_TYPES_DICT
+
+# {message class: lazy message class}
+_lazy_classes = {}
+# {(type, package): serialized size or None if not fixed}
+_fixed_sizes = {}
+# {(type, package): message class}
+_classes = {}
+
+_TIME_TYPES = {roslib.msgs.TIME: ('<2I', genpy.Time), roslib.msgs.DURATION: ('<2i', genpy.Duration)}
+
+def _get_class(type_, package):
+    """
+    @return: message class of embedded message type_
+    @rtype: class
+    @raise DeserializationError: if the class cannot be found
+    """
+    key = (type_, package)
+    cls = _classes.get(key, None)
+    if cls is None:
+        if type_ == roslib.msgs.HEADER:
+            full_type = 'std_msgs/Header'
+        elif roslib.msgs.SEP in type_:
+            full_type = type_
+        else:
+            full_type = package + roslib.msgs.SEP + type_
+        pkg, base_type = full_type.split(roslib.msgs.SEP)
+        # the module of the message class has imported the modules of
+        # its embedded types
+        module = sys.modules.get('%s.msg'%pkg, None)
+        cls = getattr(module, base_type, None)
+        if cls is None:
+            cls = roslib.message.get_message_class(full_type)
+        if cls is None:
+            raise roslib.message.DeserializationError("Cannot load message class for [%s]"%full_type)
+        _classes[key] = cls
+    return cls
+
+def _package(cls):
+    return cls._type.split(roslib.msgs.SEP)[0]
+
+def _fixed_size(type_, package):
+    """
+    @return: serialized size of type_, or None if it varies
+    @rtype: int
+    """
+    key = (type_, package)
+    try:
+        return _fixed_sizes[key]
+    except KeyError:
+        pass
+    if type_ in SIMPLE_TYPES_DICT:
+        size = struct.calcsize('<' + SIMPLE_TYPES_DICT[type_])
+    elif type_ in _TIME_TYPES:
+        size = 8
+    elif type_ == 'string':
+        size = None
+    elif type_.endswith(']'):
+        base_type, _, array_len = roslib.msgs.parse_type(type_)
+        size = None
+        if array_len is not None:
+            element_size = _fixed_size(base_type, package)
+            if element_size is not None:
+                size = array_len * element_size
+    else:
+        cls = _get_class(type_, package)
+        size = 0
+        for t in cls._slot_types:
+            s = _fixed_size(t, _package(cls))
+            if s is None:
+                size = None
+                break
+            size += s
+    _fixed_sizes[key] = size
+    return size
+
+def _skip(type_, package, buff, offset):
+    """
+    @return: offset of the end of the field of type_ that starts at
+    offset in buff
+    @rtype: int
+    """
+    size = _fixed_size(type_, package)
+    if size is not None:
+        return offset + size
+    if type_ == 'string':
+        (length,) = roslib.message.struct_I.unpack_from(buff, offset)
+        return offset + 4 + length
+    if type_.endswith(']'):
+        base_type, _, length = roslib.msgs.parse_type(type_)
+        if length is None:
+            (length,) = roslib.message.struct_I.unpack_from(buff, offset)
+            offset += 4
+        size = _fixed_size(base_type, package)
+        if size is not None:
+            return offset + length * size
+        for i in range(length):
+            offset = _skip(base_type, package, buff, offset)
+        return offset
+    cls = _get_class(type_, package)
+    package = _package(cls)
+    for t in cls._slot_types:
+        offset = _skip(t, package, buff, offset)
+    return offset
+
+def _decode(type_, package, buff, start, end):
+    """
+    Decode field of type_ at buff[start:end]
+    @return: decoded value, in the representation of the generated
+    deserializers
+    """
+    if type_ in SIMPLE_TYPES_DICT:
+        (value,) = struct.unpack_from('<' + SIMPLE_TYPES_DICT[type_], buff, start)
+        if type_ == 'bool':
+            value = bool(value)
+        return value
+    if type_ in _TIME_TYPES:
+        pattern, time_class = _TIME_TYPES[type_]
+        value = time_class()
+        value.secs, value.nsecs = struct.unpack_from(pattern, buff, start)
+        value.canon()
+        return value
+    if type_ == 'string':
+        return buff[start + 4:end]
+    if type_.endswith(']'):
+        base_type, _, length = roslib.msgs.parse_type(type_)
+        if length is None:
+            (length,) = roslib.message.struct_I.unpack_from(buff, start)
+            start += 4
+        if base_type in ['uint8', 'byte']:
+            # uint8[] is represented as a string
+            return buff[start:end]
+        if base_type in SIMPLE_TYPES_DICT:
+            value = struct.unpack_from('<%s%s'%(length, SIMPLE_TYPES_DICT[base_type]), buff, start)
+            if base_type == 'bool':
+                value = list(map(bool, value))
+            return value
+        value = []
+        for i in range(length):
+            element_end = _skip(base_type, package, buff, start)
+            value.append(_decode(base_type, package, buff, start, element_end))
+            start = element_end
+        return value
+    return _get_class(type_, package)().deserialize(buff[start:end])
+
+class _LazyField(object):
+    """
+    Descriptor of a field of a lazy message class that decodes the
+    field on first access and stores it in the slot of the message
+    class.
+    """
+    __slots__ = ['index', 'slot']
+
+    def __init__(self, index, slot):
+        self.index = index
+        self.slot = slot
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        try:
+            return self.slot.__get__(obj, objtype)
+        except AttributeError:
+            pass
+        value = _decode_field(obj, self.index)
+        self.slot.__set__(obj, value)
+        if isinstance(value, (list, roslib.message.Message, genpy.TVal)):
+            # value can be changed in place
+            obj._lazy_touched = True
+        return value
+
+    def __set__(self, obj, value):
+        obj._lazy_touched = True
+        self.slot.__set__(obj, value)
+
+def _decode_field(msg, index):
+    """
+    Decode field index of lazy message msg
+    """
+    buff = msg._lazy_buff
+    if buff is None:
+        raise AttributeError(msg.__slots__[index])
+    types = msg._slot_types
+    package = _package(msg)
+    offsets = msg._lazy_offsets
+    try:
+        while len(offsets) <= index + 1:
+            offsets.append(_skip(types[len(offsets) - 1], package, buff, offsets[-1]))
+        start, end = offsets[index], offsets[index + 1]
+        if end > len(buff):
+            raise struct.error("buffer underfill")
+        return _decode(types[index], package, buff, start, end)
+    except struct.error as e:
+        raise roslib.message.DeserializationError(e)
+
+def _reset(msg, buff):
+    """
+    Bind lazy message msg to buff, discarding any decoded fields
+    """
+    cls = type(msg).__bases__[0]
+    for name in cls.__slots__:
+        try:
+            cls.__dict__[name].__delete__(msg)
+        except AttributeError:
+            pass
+    msg._lazy_buff = buff
+    msg._lazy_offsets = [0]
+    msg._lazy_touched = False
+
+def _lazy_init(self, *args, **kwds):
+    cls = type(self).__bases__[0]
+    cls.__init__(self, *args, **kwds)
+    # a constructed message has no buffer to decode from
+    self._lazy_buff = None
+    self._lazy_offsets = [0]
+    self._lazy_touched = True
+
+def _lazy_deserialize(self, str):
+    """
+    Bind message to serialized message str. Fields are decoded when
+    they are accessed.
+    @param str: byte array of serialized message
+    @type  str: str
+    """
+    _reset(self, str)
+    return self
+
+def _lazy_deserialize_numpy(self, str, numpy):
+    cls = type(self).__bases__[0]
+    _reset(self, None)
+    self._lazy_touched = True
+    for name in cls.__slots__:
+        cls.__dict__[name].__set__(self, None)
+    return cls.deserialize_numpy(self, str, numpy)
+
+def _lazy_serialize(self, buff):
+    if not self._lazy_touched:
+        buff.write(self._lazy_buff)
+    else:
+        materialize(self)
+        type(self).__bases__[0].serialize(self, buff)
+
+def _lazy_serialize_numpy(self, buff, numpy):
+    if not self._lazy_touched:
+        buff.write(self._lazy_buff)
+    else:
+        materialize(self)
+        type(self).__bases__[0].serialize_numpy(self, buff, numpy)
+
+def _lazy_eq(self, other):
+    cls = type(self).__bases__[0]
+    if isinstance(other, type(self)):
+        return cls.__eq__(self, other)
+    # instances of msg_class compare equal to lazy instances
+    return isinstance(other, cls) and cls.__eq__(other, self)
+
+def lazy_class(msg_class):
+    """
+    @param msg_class: generated message class
+    @type  msg_class: class
+    @return: lazy subclass of msg_class, whose deserialize() method
+    only keeps the serialized message
+    @rtype: class
+    """
+    lazy = _lazy_classes.get(msg_class, None)
+    if lazy is None:
+        d = {'__slots__': ['_lazy_buff', '_lazy_offsets', '_lazy_touched'],
+             '__init__': _lazy_init,
+             'deserialize': _lazy_deserialize,
+             'deserialize_numpy': _lazy_deserialize_numpy,
+             'serialize': _lazy_serialize,
+             'serialize_numpy': _lazy_serialize_numpy,
+             '__eq__': _lazy_eq,
+             '__module__': msg_class.__module__}
+        for i, name in enumerate(msg_class.__slots__):
+            d[name] = _LazyField(i, msg_class.__dict__[name])
+        lazy = type(msg_class.__name__, (msg_class,), d)
+        # __slots__ of messages are their fields
+        lazy.__slots__ = msg_class.__slots__
+        lazy = _lazy_classes.setdefault(msg_class, lazy)
+    return lazy
+
+def deserialize(msg_class, buff):
+    """
+    Deserialize buff lazily.
+    @param msg_class: generated message class
+    @type  msg_class: class
+    @param buff: byte array of serialized message. It must not be
+    changed while the message is in use.
+    @type  buff: str
+    @return: lazy instance of msg_class
+    @rtype: msg_class
+    """
+    lazy = lazy_class(msg_class)
+    # skip the construction of default field values
+    msg = lazy.__new__(lazy)
+    _reset(msg, buff)
+    return msg
+
+def is_lazy(msg):
+    """
+    @return: True if msg is a lazy message that has not been fully
+    decoded yet
+    @rtype: bool
+    """
+    return type(msg).__dict__.get('deserialize', None) is _lazy_deserialize and getattr(msg, '_lazy_buff', None) is not None
+
+def materialize(msg):
+    """
+    Decode all fields of lazy message msg that have not been decoded
+    yet. The message is no longer lazy afterwards. Fields that have
+    been decoded or set before are kept.
+    @param msg: lazy message
+    @type  msg: Message
+    @return: msg
+    @rtype: Message
+    @raise DeserializationError: if msg cannot be deserialized
+    """
+    if not is_lazy(msg):
+        return msg
+    cls = type(msg).__bases__[0]
+    decoded = cls().deserialize(msg._lazy_buff)
+    for name in cls.__slots__:
+        slot = cls.__dict__[name]
+        try:
+            slot.__get__(msg, cls)
+        except AttributeError:
+            slot.__set__(msg, getattr(decoded, name))
+    msg._lazy_buff = None
+    msg._lazy_touched = True
+    return msg
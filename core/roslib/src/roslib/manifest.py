@@ -46,6 +46,7 @@ import roslib.packages
 
 MANIFEST_FILE = 'manifest.xml'
 
+import roslib.manifest_cache
 import roslib.manifestlib
 # re-export symbols for backwards compatibility
 from roslib.manifestlib import ManifestException, Depend, Export, ROSDep, VersionControl
@@ -126,15 +127,20 @@ def load_manifest(package):
     """
     return parse_file(manifest_file(package))
     
-def parse_file(file):
+def parse_file(file, lazy=False):
     """
     Parse manifest.xml file
     @param file: manifest.xml file path
     @type  file: str
+    @param lazy: only parse dependencies until other fields are
+      accessed. See L{roslib.manifestlib.parse()}. Manifests that
+      are served from the manifest cache (see
+      L{roslib.manifest_cache}) are never lazy.
+    @type  lazy: bool
     @return: Manifest instance
     @rtype: L{Manifest}
     """
-    return roslib.manifestlib.parse_file(Manifest(), file)
+    return roslib.manifest_cache.parse_file(Manifest(), file, lazy)
 
 def parse(string, filename='string'):
     """
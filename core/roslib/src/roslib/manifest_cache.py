@@ -0,0 +1,311 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# Revision $Id$
+
+"""
+Cache of parsed manifest.xml and stack.xml files that is shared
+between processes.
+
+Parsed manifests are stored in compact form in a single cache file in
+ROS_HOME. Entries are keyed by the absolute path of the manifest file
+and are valid as long as the file's modification time and size are
+unchanged. If the ROS_MANIFEST_CACHE environment variable is set to
+'hash', the MD5 hash of the file contents is checked as well. Setting
+ROS_MANIFEST_CACHE to '0' disables the cache.
+
+New entries are written back to the cache file when the process exits
+(or when L{save()} is called). Writers merge their entries with the
+current cache file under a lock and replace it atomically, dropping
+entries of manifests that have changed or been removed and, beyond
+L{MAX_ENTRIES}, the least recently added entries.
+
+This is an internal library. See L{roslib.manifest.parse_file()} and
+L{roslib.stack_manifest.parse_file()}.
+"""
+
+import atexit
+import hashlib
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import roslib.diskcache
+import roslib.instrument
+import roslib.manifestlib
+from roslib.manifestlib import Depend, StackDepend, ROSDep, Platform, Export, VersionControl, _intern
+
+## environment variable that configures the cache
+ROS_MANIFEST_CACHE = 'ROS_MANIFEST_CACHE'
+
+## name of cache in ROS_HOME
+CACHE_NAME = 'manifests'
+## increment when the encoding of entries changes
+CACHE_VERSION = 1
+## maximum number of entries kept in the cache file
+MAX_ENTRIES = 10000
+
+# files modified less than this many seconds ago are not cached, as a
+# further change within the same mtime tick would go unnoticed.
+_RACY_WINDOW = 2.0
+
+def _encode(m):
+    """
+    @param m: fully parsed manifest
+    @type  m: L{roslib.manifestlib._Manifest}
+    @return: manifest fields as a tuple of builtin types
+    @rtype: tuple
+    """
+    if m._type == 'stack':
+        depends = tuple([d.stack for d in m.depends])
+    else:
+        depends = tuple([d.package for d in m.depends])
+    vc = m.versioncontrol
+    if vc is not None:
+        vc = (vc.type, vc.url)
+    return (m._type, m.description, m.brief, m.author, m.license, m.license_url,
+            m.url, m.logo, m.status, m.version, m.notes,
+            depends,
+            tuple([r.name for r in m.rosdeps]),
+            tuple([(p.os, p.version, p.notes) for p in m.platforms]),
+            tuple([(e.tag, e.attrs, e.str) for e in m.exports]),
+            vc, tuple(m.unknown_tags))
+
+def _decode(m, t):
+    """
+    Populate m from an encoded manifest.
+    @param m: manifest to populate
+    @type  m: L{roslib.manifestlib._Manifest}
+    @param t: encoded manifest, from L{_encode()}
+    @type  t: tuple
+    @return: m
+    @rtype: L{roslib.manifestlib._Manifest}
+    """
+    m.description, m.brief, m.author, m.license, m.license_url, \
+        m.url, m.logo, m.status, m.version, m.notes = t[1:11]
+    if m._type == 'stack':
+        m.depends = [StackDepend(d) for d in t[11]]
+    else:
+        m.depends = [Depend(d) for d in t[11]]
+    m.rosdeps = [ROSDep(r) for r in t[12]]
+    m.platforms = [Platform(*p) for p in t[13]]
+    m.exports = [Export(tag, dict([(_intern(k), v) for k, v in attrs.items()]), s) for tag, attrs, s in t[14]]
+    if t[15] is not None:
+        m.versioncontrol = VersionControl(*t[15])
+    else:
+        m.versioncontrol = None
+    m.unknown_tags = list(t[16])
+    return m
+
+def _md5(file):
+    with open(file, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+class ManifestCache(object):
+    """
+    Cache of parsed manifests that is backed by a cache file.
+    """
+
+    def __init__(self, cache_file, use_hash=False):
+        """
+        @param cache_file: path of cache file, or None for an in-process cache
+        @type  cache_file: str
+        @param use_hash: validate entries against the MD5 hash of the file contents
+        @type  use_hash: bool
+        """
+        self.cache_file = cache_file
+        self.use_hash = use_hash
+        # {path: (mtime, size, md5, stamp, encoded manifest)}
+        self.entries = None
+        self._new = {}
+
+    def _load(self):
+        data = None
+        if self.cache_file:
+            data = roslib.diskcache.load(self.cache_file)
+        if type(data) == dict and data.get('version') == CACHE_VERSION:
+            self.entries = data['entries']
+        else:
+            self.entries = {}
+
+    def parse_file(self, m, file, lazy=False):
+        """
+        Parse manifest file into m, using the cache if possible. See
+        L{roslib.manifestlib.parse_file()}. Cached manifests are never lazy.
+        """
+        try:
+            path = os.path.abspath(file)
+            st = os.stat(path)
+        except (OSError, TypeError, AttributeError):
+            # let the parser raise the appropriate error
+            return roslib.manifestlib.parse_file(m, file, lazy)
+        if self.entries is None:
+            self._load()
+        mtime, size = st.st_mtime, st.st_size
+        entry = self.entries.get(path, None)
+        if entry is not None and entry[0] == mtime and entry[1] == size and entry[4][0] == m._type:
+            if not self.use_hash or entry[2] == _md5(path):
+                return _decode(m, entry[4])
+
+        roslib.manifestlib.parse_file(m, file)
+        if time.time() - mtime > _RACY_WINDOW:
+            digest = None
+            if self.use_hash:
+                digest = _md5(path)
+            entry = (mtime, size, digest, time.time(), _encode(m))
+            self.entries[path] = self._new[path] = entry
+        return m
+
+    def save(self):
+        """
+        Merge new entries into the cache file.
+        @return: True if the cache file was written
+        @rtype: bool
+        """
+        if not self._new or not self.cache_file:
+            return False
+        lock = None
+        try:
+            if fcntl is not None:
+                try:
+                    d = os.path.dirname(self.cache_file)
+                    if not os.path.isdir(d):
+                        os.makedirs(d)
+                    lock = open(self.cache_file + '.lock', 'a')
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                except (IOError, OSError):
+                    lock = None
+            # merge with entries that other processes have written
+            data = roslib.diskcache.load(self.cache_file)
+            if type(data) == dict and data.get('version') == CACHE_VERSION:
+                entries = data['entries']
+            else:
+                entries = {}
+            for path, entry in self._new.items():
+                old = entries.get(path, None)
+                if old is None or old[3] < entry[3]:
+                    entries[path] = entry
+            entries = _evict(entries)
+            written = roslib.diskcache.dump(self.cache_file, {'version': CACHE_VERSION, 'entries': entries})
+            if written:
+                self._new = {}
+            return written
+        finally:
+            if lock is not None:
+                lock.close()
+
+def _evict(entries):
+    """
+    Drop entries of manifests that have changed or been removed, and
+    then the oldest entries in excess of L{MAX_ENTRIES}.
+    @param entries: cache entries
+    @type  entries: dict
+    @return: remaining entries
+    @rtype: dict
+    """
+    valid = {}
+    for path, entry in entries.items():
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if st.st_mtime == entry[0] and st.st_size == entry[1]:
+            valid[path] = entry
+    if len(valid) > MAX_ENTRIES:
+        newest = sorted(valid.items(), key=lambda x: x[1][3])[-MAX_ENTRIES:]
+        valid = dict(newest)
+    return valid
+
+_cache = None
+_cache_key = None
+
+def get_cache(env=None):
+    """
+    @param env: override os.environ dictionary
+    @type  env: dict
+    @return: manifest cache for env, or None if caching is disabled
+    @rtype: L{ManifestCache}
+    """
+    global _cache, _cache_key
+    if env is None:
+        env = os.environ
+    mode = env.get(ROS_MANIFEST_CACHE, '')
+    if mode == '0':
+        return None
+    # ROS_HOME defaults to ~/.ros
+    key = (env.get('ROS_HOME', None), env.get('HOME', None), mode)
+    if key != _cache_key:
+        if _cache is not None:
+            _cache.save()
+        try:
+            cache_file = roslib.diskcache.get_cache_file(CACHE_NAME, CACHE_VERSION, env)
+        except Exception:
+            cache_file = None
+        _cache = ManifestCache(cache_file, use_hash=(mode == 'hash'))
+        _cache_key = key
+    return _cache
+
+@roslib.instrument.phase('manifest_parse')
+def parse_file(m, file, lazy=False):
+    """
+    Parse manifest file (package, stack), consulting the manifest
+    cache first. See L{roslib.manifestlib.parse_file()}.
+    @param m: field to populate
+    @type  m: L{roslib.manifestlib._Manifest}
+    @param file: manifest file path
+    @type  file: str
+    @param lazy: parse lazily if the cache is disabled.
+    @type  lazy: bool
+    @return: return m, populated with parsed fields
+    @rtype: L{roslib.manifestlib._Manifest}
+    """
+    cache = get_cache()
+    if cache is None:
+        return roslib.manifestlib.parse_file(m, file, lazy)
+    return cache.parse_file(m, file, lazy)
+
+def save():
+    """
+    Write new entries of the manifest cache to disk. This is invoked
+    automatically when the process exits.
+    """
+    if _cache is not None:
+        try:
+            _cache.save()
+        except Exception:
+            pass #cache is an optimization only
+
+atexit.register(save)
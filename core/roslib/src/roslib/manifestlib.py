@@ -41,10 +41,10 @@ For external code apis, see L{roslib.manifest} and L{roslib.stack_manifest}.
 
 import sys
 import os
-import xml.dom
-import xml.dom.minidom as dom
+import xml.parsers.expat
 
 import roslib.exceptions
+import roslib.instrument
 
 # stack.xml and manifest.xml have the same internal tags right now
 REQUIRED = ['author', 'license']
@@ -56,6 +56,27 @@ VALID = REQUIRED + OPTIONAL
 
 class ManifestException(roslib.exceptions.ROSLibException): pass
 
+# tag and attribute names of all parsed manifests, shared via the
+# intern argument of the expat parser
+_names = {}
+
+try:
+    _intern_str = sys.intern
+except AttributeError:
+    _intern_str = intern #py2
+
+def _intern(s):
+    """
+    Intern package, stack and tag names, which recur across
+    manifests. Names that are not str (i.e. unicode in Python 2) are
+    interned in L{_names}.
+    """
+    if type(s) == str:
+        return _intern_str(s)
+    elif s is not None:
+        return _names.setdefault(s, s)
+    return s
+
 def get_nodes_by_name(n, name):
     return [t for t in n.childNodes if t.nodeType == t.ELEMENT_NODE and t.tagName == name]
     
@@ -198,7 +219,8 @@ class Export(object):
     """
     Manifest 'export' tag
     """
-    
+    __slots__ = ['tag', 'attrs', 'str']
+
     def __init__(self, tag, attrs, str):
         """
         Create new export instance.
@@ -209,7 +231,7 @@ class Export(object):
         @param str: string value contained by tag, if any
         @type  str: str
         """
-        self.tag = tag
+        self.tag = _intern(tag)
         self.attrs = attrs
         self.str = str
 
@@ -250,7 +272,7 @@ class Platform(object):
             raise ValueError("bad 'os' attribute")
         if not version:
             raise ValueError("bad 'version' attribute")
-        self.os = os
+        self.os = _intern(os)
         self.version = version
         self.notes = notes
         
@@ -289,7 +311,7 @@ class Depend(object):
         """
         if not package:
             raise ValueError("bad 'package' attribute")
-        self.package = package
+        self.package = _intern(package)
     def __str__(self):
         return self.package
     def __repr__(self):
@@ -318,7 +340,7 @@ class StackDepend(object):
         """
         if not stack:
             raise ValueError("bad 'stack' attribute")
-        self.stack = stack
+        self.stack = _intern(stack)
         self.annotation = None
         
     def __str__(self):
@@ -353,7 +375,7 @@ class ROSDep(object):
         """
         if not name:
             raise ValueError("bad 'name' attribute")
-        self.name = name
+        self.name = _intern(name)
     def xml(self):
         """
         @return: rosdep instance represented as manifest XML
@@ -400,7 +422,7 @@ class _Manifest(object):
                  'logo', 'exports', 'version',\
                  'versioncontrol', 'status', 'notes',\
                  'unknown_tags',\
-                 '_type']
+                 '_type', '_lazy']
     def __init__(self, _type='package'):
         self.description = self.brief = self.author = \
                            self.license = self.license_url = \
@@ -414,7 +436,29 @@ class _Manifest(object):
         
         # store unrecognized tags during parsing
         self.unknown_tags = []
+        # (string, filename) of a lazily parsed manifest
+        self._lazy = None
         
+    def __getattr__(self, name):
+        # only invoked for unset attributes, i.e. the fields of a
+        # lazily parsed manifest that have not been materialized yet
+        if name == '_lazy':
+            raise AttributeError(name)
+        lazy = self._lazy
+        if lazy is None:
+            raise AttributeError(name)
+        string, filename = lazy
+        try:
+            if string is None:
+                # the text of manifests parsed by parse_file() is not retained
+                with open(filename, 'r') as f:
+                    string = f.read()
+            parse(self, string, filename)
+        except (IOError, ManifestException) as e:
+            raise ManifestException("Invalid manifest file [%s]: %s"%(filename, e))
+        self._lazy = None
+        return getattr(self, name)
+
     def __str__(self):
         return self.xml()
     def get_export(self, tag, attr):
@@ -466,13 +510,195 @@ def _get_text(nodes):
     """
     return "".join([n.data for n in nodes if n.nodeType == n.TEXT_NODE])
 
-def parse_file(m, file):
+def _escape(data):
+    """
+    Escape text and attribute values the same way as xml.dom.minidom
+    """
+    return data.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace(">", "&gt;")
+
+if sys.version_info < (3, 8):
+    _sort_attrs = sorted
+else:
+    _sort_attrs = list
+
+class _Element(object):
+    """
+    Top-level element of a manifest, as collected by L{_ManifestParser}.
+    """
+    __slots__ = ['tag', 'attrs', 'text', 'xml', 'children']
+    def __init__(self, tag, attrs):
+        self.tag = tag
+        self.attrs = attrs
+        # direct text content, i.e. excluding text of child elements and CDATA
+        self.text = []
+        # inner XML (description only)
+        self.xml = None
+        # child elements (export only)
+        self.children = []
+
+class _ManifestParser(object):
+    """
+    Streaming (expat) parser that collects the top-level elements of
+    a manifest. Only the inner XML of 'description' and the children
+    of 'export' are retained below the top level.
+    """
+
+    def __init__(self, lazy=False):
+        """
+        @param lazy: only collect the top-level elements and their
+          attributes, not their contents.
+        @type  lazy: bool
+        """
+        self.lazy = lazy
+        self.root = None
+        self.elements = []
+        self._stack = []
+        # inner XML of the description element being parsed
+        self._xml = None
+        # the innermost open element in self._xml has no content yet
+        self._pending = False
+        self._cdata = False
+        self._cdata_started = False
+
+    def parse(self, string):
+        """
+        @raise xml.parsers.expat.ExpatError: if string is not well-formed XML
+        """
+        p = xml.parsers.expat.ParserCreate(intern=_names)
+        p.buffer_text = True
+        p.StartElementHandler = self._start
+        p.EndElementHandler = self._end
+        if not self.lazy:
+            p.CharacterDataHandler = self._chars
+            p.CommentHandler = self._comment
+            p.ProcessingInstructionHandler = self._pi
+            p.StartCdataSectionHandler = self._start_cdata
+            p.EndCdataSectionHandler = self._end_cdata
+        p.Parse(string, True)
+        return self
+
+    def _content(self):
+        if self._pending:
+            self._xml.append('>')
+            self._pending = False
+
+    def _start(self, name, attrs):
+        stack = self._stack
+        depth = len(stack)
+        if self._xml is not None:
+            # serialize like minidom's toxml()
+            self._content()
+            self._xml.append('<' + name + ''.join([' %s="%s"'%(k, _escape(attrs[k])) for k in _sort_attrs(attrs)]))
+            self._pending = True
+            stack.append(None)
+        elif depth == 1:
+            e = _Element(name, attrs)
+            self.elements.append(e)
+            if name == 'description' and not self.lazy:
+                self._xml = e.xml = []
+            stack.append(e)
+        elif depth == 2 and stack[1] is not None and stack[1].tag == 'export':
+            e = _Element(name, attrs)
+            stack[1].children.append(e)
+            stack.append(e)
+        else:
+            if depth == 0:
+                self.root = name
+            stack.append(None)
+
+    def _end(self, name):
+        stack = self._stack
+        stack.pop()
+        if self._xml is not None:
+            if len(stack) == 1:
+                # end of description
+                self._xml = None
+            elif self._pending:
+                self._xml.append('/>')
+                self._pending = False
+            else:
+                self._xml.append('</%s>'%name)
+
+    def _chars(self, data):
+        if self._xml is not None:
+            if self._cdata:
+                if not self._cdata_started:
+                    self._content()
+                    self._xml.append('<![CDATA[')
+                    self._cdata_started = True
+                self._xml.append(data)
+            else:
+                self._content()
+                self._xml.append(_escape(data))
+        if not self._cdata and self._stack:
+            e = self._stack[-1]
+            if e is not None:
+                e.text.append(data)
+
+    def _comment(self, data):
+        if self._xml is not None:
+            self._content()
+            self._xml.append('<!--%s-->'%data)
+
+    def _pi(self, target, data):
+        if self._xml is not None:
+            self._content()
+            self._xml.append('<?%s %s?>'%(target, data))
+
+    def _start_cdata(self):
+        self._cdata = True
+        self._cdata_started = False
+
+    def _end_cdata(self):
+        if self._cdata_started:
+            self._xml.append(']]>')
+        self._cdata = self._cdata_started = False
+
+def _get_single(elements, name, required):
+    """
+    Get the single top-level element name, with the same validation
+    as L{check_required()} and L{check_optional()}.
+    @return: element, or None if not present
+    @rtype: L{_Element}
+    @raise ManifestException: if there is more than one name element
+    """
+    n = elements.get(name, ())
+    if required:
+        if len(n) > 1:
+            raise ManifestException("Invalid manifest file: must have only one '%s' element"%name)
+    elif len(n) > 1:
+        raise ManifestException("Invalid manifest file: must have a single '%s' element"%name)
+    if n:
+        return n[0]
+    return None
+
+def _get_value(elements, name):
+    """
+    @return: value of element name as computed by L{check()}
+    @rtype: str
+    """
+    required = name in REQUIRED
+    e = _get_single(elements, name, required)
+    if e is None:
+        if required:
+            return ''
+        return None
+    if name in ALLOWXHTML:
+        return ''.join(e.xml)
+    return ''.join(e.text).strip()
+
+@roslib.instrument.phase('manifest_parse')
+def parse_file(m, file, lazy=False):
     """
     Parse manifest file (package, stack)
     @param m: field to populate
     @type  m: L{_Manifest}
     @param file: manifest.xml file path
     @type  file: str
+    @param lazy: only parse dependencies. See L{parse()}. The
+      remaining fields are parsed from the file when they are first
+      accessed.
+    @type  lazy: bool
     @return: return m, populated with parsed fields
     @rtype: L{_Manifest}
     """
@@ -483,75 +709,104 @@ def parse_file(m, file):
     with open(file, 'r') as f:
         text = f.read()
     try:
-        return parse(m, text, file)
+        parse(m, text, file, lazy)
     except ManifestException as e:
         raise ManifestException("Invalid manifest file [%s]: %s"%(os.path.abspath(file), e))
+    if lazy:
+        # re-read the file when the remaining fields are accessed
+        m._lazy = (None, os.path.abspath(file))
+    return m
 
-def parse(m, string, filename='string'):
+def parse(m, string, filename='string', lazy=False):
     """
     Parse manifest.xml string contents
+
+    If lazy is True, only the 'depends' and 'rosdeps' fields are
+    parsed. The remaining fields are parsed when they are first
+    accessed, which will raise L{ManifestException} if they are invalid.
+    
     @param string: manifest.xml contents
     @type  string: str
     @param m: field to populate
     @type  m: L{_Manifest}
+    @param lazy: only parse dependencies.
+    @type  lazy: bool
     @return: return m, populated with parsed fields
     @rtype: L{_Manifest}
     """
     try:
-        d = dom.parseString(string)
+        p = _ManifestParser(lazy).parse(string)
     except Exception as e:
         raise ManifestException("invalid XML: %s"%e)
     
-    p = get_nodes_by_name(d, m._type)
-    if len(p) != 1:
+    if p.root != m._type:
         raise ManifestException("manifest must have a single '%s' element"%m._type)
-    p = p[0]
-    m.description = check('description')(p, filename)
-    m.brief = ''
-    try:
-        tag = get_nodes_by_name(p, 'description')[0]
-        m.brief = tag.getAttribute('brief') or ''
-    except:
-        # means that 'description' tag is missing
-        pass
+    elements = {}
+    for e in p.elements:
+        if e.tag in elements:
+            elements[e.tag].append(e)
+        else:
+            elements[e.tag] = [e]
+
+    if not lazy:
+        m.description = _get_value(elements, 'description')
+        m.brief = ''
+        if 'description' in elements:
+            m.brief = elements['description'][0].attrs.get('brief', '')
+
     #TODO: figure out how to multiplex
     if m._type == 'package':
-        m.depends = check_depends('depend')(p, filename)
+        # TDS 20110419:  this is a hack.
+        # rosbuild2 has a <depend thirdparty="depname"/> tag,
+        # for now, explicitly don't consider thirdparty depends
+        depends = [e.attrs for e in elements.get('depend', ()) if 'thirdparty' not in e.attrs]
+        try:
+            m.depends = [Depend(d['package']) for d in depends]
+        except KeyError:
+            raise ManifestException("Invalid manifest file: depends is missing 'package' attribute")
     elif m._type == 'stack':
-        m.depends = check_stack_depends('depend')(p, filename)
-    elif m._type == 'app':
-        # not implemented yet
-        pass
-    m.rosdeps = check('rosdep')(p, filename)    
-    m.platforms = check('platform')(p, filename)    
-    m.exports = check('export')(p, filename)
-    m.versioncontrol = check('versioncontrol')(p,filename)
-    m.license = check('license')(p, filename)
-    m.license_url = ''
-    try:
-        tag = get_nodes_by_name(p, 'license')[0]
-        m.license_url = tag.getAttribute('url') or ''
-    except:
-        pass #manifest is missing required 'license' tag
-  
-    m.status='unreviewed'
-    try:
-        tag = get_nodes_by_name(p, 'review')[0]
-        m.status=tag.getAttribute('status') or ''
-    except:
-        pass #manifest is missing optional 'review status' tag
+        m.depends = [StackDepend(e.attrs['stack']) for e in elements.get('depend', ())]
+    m.rosdeps = [ROSDep(e.attrs['name']) for e in elements.get('rosdep', ())]
 
-    m.notes=''
-    try:
-        tag = get_nodes_by_name(p, 'review')[0]
-        m.notes=tag.getAttribute('notes') or ''
-    except:
-        pass #manifest is missing optional 'review notes' tag
+    if lazy:
+        if m._type == 'stack' and m.rosdeps:
+            raise ManifestException("stack manifests are not allowed to have rosdeps") 
+        for name in _Manifest.__slots__:
+            if name not in ('depends', 'rosdeps', '_type', '_lazy'):
+                try:
+                    delattr(m, name)
+                except AttributeError:
+                    pass
+        m._lazy = (string, filename)
+        return m
 
-    m.author = check('author')(p, filename)
-    m.url = check('url')(p, filename)
-    m.version = check('version')(p, filename)
-    m.logo = check('logo')(p, filename)
+    try:
+        m.platforms = [Platform(e.attrs['os'], e.attrs['version'], e.attrs.get('notes', '')) for e in elements.get('platform', ())]
+    except KeyError as e:
+        raise ManifestException("<platform> tag is missing required '%s' attribute"%str(e))
+    m.exports = []
+    for e in elements.get('export', ()):
+        m.exports.extend([Export(c.tag, c.attrs, ''.join(c.text)) for c in e.children])
+    m.versioncontrol = None
+    if 'versioncontrol' in elements:
+        attrs = elements['versioncontrol'][0].attrs
+        m.versioncontrol = VersionControl(attrs['type'], attrs['url'])
+    m.license = _get_value(elements, 'license')
+    m.license_url = ''
+    if 'license' in elements:
+        m.license_url = elements['license'][0].attrs.get('url', '')
+  
+    m.status = 'unreviewed'
+    m.notes = ''
+    if 'review' in elements:
+        attrs = elements['review'][0].attrs
+        m.status = attrs.get('status', '')
+        m.notes = attrs.get('notes', '')
+
+    m.author = _get_value(elements, 'author')
+    m.url = _get_value(elements, 'url')
+    m.version = _get_value(elements, 'version')
+    m.logo = _get_value(elements, 'logo')
 
     # do some validation on what we just parsed
     if m._type == 'stack':
@@ -561,5 +816,5 @@ def parse(m, string, filename='string'):
             raise ManifestException("stack manifests are not allowed to have rosdeps") 
 
     # store unrecognized tags
-    m.unknown_tags = [e for e in p.childNodes if e.nodeType == e.ELEMENT_NODE and e.tagName not in VALID]
+    m.unknown_tags = [e.tag for e in p.elements if e.tag not in VALID]
     return m
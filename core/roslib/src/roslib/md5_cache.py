@@ -0,0 +1,184 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# Revision $Id$
+
+"""
+Memo of message md5sums that is shared between processes.
+
+The md5sum of a message type is computed from its own definition and
+the md5sums of the types it embeds. The memo maps a resolved type name
+and the MD5 hash of its definition text to the type's md5sum and the
+(type name, text hash) keys of all types it embeds, directly or
+indirectly, so an entry is only used if all embedded types are
+unchanged as well, without computing their md5sums. Entries are kept in
+memory for the lifetime of the process and in a cache file in
+ROS_HOME. Setting the ROS_MD5_CACHE environment variable to '0'
+disables the cache file.
+
+New entries are written back to the cache file when the process exits
+(or when L{save()} is called), merged with the entries that other
+processes have written in the meantime. Beyond L{MAX_ENTRIES}, the
+least recently added entries are dropped.
+
+This is an internal library. See L{roslib.gentools.compute_md5()}.
+"""
+
+import atexit
+import os
+import time
+
+import roslib.diskcache
+
+## environment variable that configures the cache
+ROS_MD5_CACHE = 'ROS_MD5_CACHE'
+
+## name of cache in ROS_HOME
+CACHE_NAME = 'md5sums'
+## increment when the encoding of entries changes
+CACHE_VERSION = 2
+## maximum number of entries kept in the cache file
+MAX_ENTRIES = 20000
+
+class Md5Cache(object):
+    """
+    Memo of message md5sums that is backed by a cache file.
+    """
+
+    def __init__(self, cache_file):
+        """
+        @param cache_file: path of cache file, or None for an in-process memo
+        @type  cache_file: str
+        """
+        self.cache_file = cache_file
+        # {(type name, text hash): (md5sum, ((type name, text hash), ...), stamp)}
+        self.entries = None
+        self._new = {}
+
+    def _load(self):
+        data = None
+        if self.cache_file:
+            data = roslib.diskcache.load(self.cache_file)
+        if type(data) == dict and data.get('version') == CACHE_VERSION:
+            self.entries = data['entries']
+        else:
+            self.entries = {}
+
+    def get(self, key):
+        """
+        @param key: (type name, text hash)
+        @type  key: (str, str)
+        @return: (md5sum, keys of embedded types), or None
+        @rtype: (str, tuple)
+        """
+        if self.entries is None:
+            self._load()
+        entry = self.entries.get(key, None)
+        if entry is None:
+            return None
+        return entry[:2]
+
+    def put(self, key, md5sum, deps):
+        """
+        @param key: (type name, text hash)
+        @type  key: (str, str)
+        @param md5sum: md5sum of type
+        @type  md5sum: str
+        @param deps: sorted keys of all embedded types
+        @type  deps: tuple
+        """
+        if self.entries is None:
+            self._load()
+        self.entries[key] = self._new[key] = (md5sum, tuple(deps), time.time())
+
+    def save(self):
+        """
+        Merge new entries into the cache file.
+        @return: True if the cache file was written
+        @rtype: bool
+        """
+        if not self._new or not self.cache_file:
+            return False
+        data = roslib.diskcache.load(self.cache_file)
+        if type(data) == dict and data.get('version') == CACHE_VERSION:
+            entries = data['entries']
+        else:
+            entries = {}
+        entries.update(self._new)
+        if len(entries) > MAX_ENTRIES:
+            entries = dict(sorted(entries.items(), key=lambda x: x[1][2])[-MAX_ENTRIES:])
+        written = roslib.diskcache.dump(self.cache_file, {'version': CACHE_VERSION, 'entries': entries})
+        if written:
+            self._new = {}
+        return written
+
+_cache = None
+_cache_key = None
+
+def get_cache(env=None):
+    """
+    @param env: override os.environ dictionary
+    @type  env: dict
+    @return: md5sum memo for env
+    @rtype: L{Md5Cache}
+    """
+    global _cache, _cache_key
+    if env is None:
+        env = os.environ
+    mode = env.get(ROS_MD5_CACHE, '')
+    # ROS_HOME defaults to ~/.ros
+    key = (env.get('ROS_HOME', None), env.get('HOME', None), mode)
+    if key != _cache_key:
+        if _cache is not None:
+            save()
+        cache_file = None
+        if mode != '0':
+            try:
+                cache_file = roslib.diskcache.get_cache_file(CACHE_NAME, CACHE_VERSION, env)
+            except Exception:
+                pass
+        _cache = Md5Cache(cache_file)
+        _cache_key = key
+    return _cache
+
+def save():
+    """
+    Write new entries of the md5sum memo to disk. This is invoked
+    automatically when the process exits.
+    """
+    if _cache is not None:
+        try:
+            _cache.save()
+        except Exception:
+            pass #cache is an optimization only
+
+atexit.register(save)
@@ -39,8 +39,7 @@ libraries for type checking and retrieving message classes by type
 name.
 """
 
-import math
-import itertools
+import operator
 import traceback
 import struct
 import sys
@@ -164,83 +163,213 @@ def get_service_class(service_type, reload_on_error=False):
 
 # we expose the generic message-strify routine for fn-oriented code like rostopic
 
-def strify_message(val, indent='', time_offset=None, current_time=None, field_filter=None):
+# {message class: ((field, is uint8 array, array base type or None),)}
+_field_tables = {}
+# {(message class, indent): (format, field getter) or None}
+_field_formats = {}
+# number of elements of simple arrays that are converted at once
+_ARRAY_CHUNK = 1024
+_scalar_types = set([int, long, float, bool])
+
+def _field_table(msg_class):
     """
-    Convert value to string representation
-    @param val: to convert to string representation. Most likely a Message.
-    @type  val: Value
-    @param indent: indentation. If indent is set, then the return value will have a leading \n
-    @type  indent: str
-    @param time_offset: if not None, time fields will be displayed
-    as deltas from  time_offset
-    @type  time_offset: Time
-    @param current_time: currently not used. Only provided for API compatibility. current_time passes in the current time with respect to the message.
-    @type  current_time: Time
-    @param field_filter: filter the fields that are strified for Messages.
-    @type  field_filter: fn(Message)->iter(str)
-    @return: string (YAML) representation of message
-    @rtype: str
+    @return: field table of msg_class, computed once per class
+    @rtype: ((str, bool, str),)
+    """
+    try:
+        return _field_tables[msg_class]
+    except KeyError:
+        pass
+    table = []
+    for f, t in zip(msg_class.__slots__, msg_class._slot_types):
+        if t.endswith(']'):
+            base_type = t[:t.index('[')]
+        else:
+            base_type = None
+        table.append((f, 'uint8[' in t, base_type))
+    table = _field_tables[msg_class] = tuple(table)
+    return table
+
+def _field_format(msg_class, indent):
     """
+    @return: format string of the fields of msg_class at indent and
+    getter of the field values, or None if not all fields of
+    msg_class are numbers
+    @rtype: (str, fn(Message)->tuple)
+    """
+    key = (msg_class, indent)
+    try:
+        return _field_formats[key]
+    except KeyError:
+        pass
+    slots = msg_class.__slots__
+    fmt = None
+    if len(slots) > 1 and not [t for t in msg_class._slot_types if t not in _simple_types]:
+        sep = '\n' + indent
+        fmt = sep.join(['%s: %%s'%f for f in slots])
+        if indent:
+            fmt = sep + fmt
+        fmt = (fmt, operator.attrgetter(*slots))
+    _field_formats[key] = fmt
+    return fmt
 
+def _strify_array(val, indent, time_offset, field_filter, max_array_length, summarize_arrays):
+    count = len(val)
+    if count == 0:
+        yield '[]'
+        return
+    if max_array_length is None or max_array_length >= count:
+        limit = count
+    else:
+        limit = max(max_array_length, 0)
+    if type(val[0]) in (int, float, str, bool):
+        # TODO: escape strings properly
+        # same as str(list(val)), without building the string of the entire array
+        yield '['
+        for i in range(0, limit, _ARRAY_CHUNK):
+            if i:
+                yield ', '
+            yield str(list(val[i:min(i + _ARRAY_CHUNK, limit)]))[1:-1]
+        if limit < count:
+            if limit:
+                yield ', '
+            yield '... (%s more)'%(count - limit)
+        yield ']'
+    else:
+        pref = '\n' + indent + '- '
+        indent = indent + '  '
+        for i in range(limit):
+            yield pref
+            v = val[i]
+            if isinstance(v, Message):
+                for s in _strify_message(v, indent, time_offset, field_filter, max_array_length, summarize_arrays):
+                    yield s
+            else:
+                for s in _strify(v, indent, time_offset, field_filter, max_array_length, summarize_arrays):
+                    yield s
+        if limit < count:
+            yield '%s... (%s more)'%(pref, count - limit)
+
+def _strify_message(val, indent, time_offset, field_filter, max_array_length, summarize_arrays):
+    # allow caller to select which fields of message are strified
+    if field_filter is not None:
+        fields = list(field_filter(val))
+    else:
+        fields = None
+        fmt = _field_formats.get((type(val), indent), False)
+        if fmt is False:
+            fmt = _field_format(type(val), indent)
+        if fmt is not None:
+            vals = fmt[1](val)
+            if _scalar_types.issuperset(map(type, vals)):
+                yield fmt[0]%vals
+                return
+    ni = '  ' + indent
+    if indent:
+        yield '\n'
+        sep = indent
+    else:
+        sep = ''
+    for f, is_uint8_array, base_type in _field_table(type(val)):
+        if fields is not None and f not in fields:
+            continue
+        v = getattr(val, f)
+        if is_uint8_array and isstring(v):
+            v = [ord(x) for x in v]
+        type_ = type(v)
+        if type_ in (int, long, float, bool):
+            yield '%s%s: %s'%(sep, f, v)
+        elif summarize_arrays and base_type is not None and v is not None:
+            yield '%s%s: <array type: %s, length: %s>'%(sep, f, base_type, len(v))
+        elif isinstance(v, Message):
+            yield '%s%s: '%(sep, f)
+            for s in _strify_message(v, ni, time_offset, field_filter, max_array_length, summarize_arrays):
+                yield s
+        else:
+            yield '%s%s: '%(sep, f)
+            for s in _strify(v, ni, time_offset, field_filter, max_array_length, summarize_arrays):
+                yield s
+        sep = '\n' + indent
+
+def _strify(val, indent, time_offset, field_filter, max_array_length, summarize_arrays):
     type_ = type(val)
     if type_ in (int, long, float, bool):
-        return str(val)
+        yield str(val)
     elif isstring(val):
         #TODO: need to escape strings correctly
         if not val:
-            return "''"
-        return val
+            yield "''"
+        else:
+            yield val
     elif isinstance(val, TVal):
-        
         if time_offset is not None and isinstance(val, Time):
             val = val-time_offset
-
-        return '\n%ssecs: %s\n%snsecs: %s'%(indent, val.secs, indent, val.nsecs)
-        
-    elif type_ in (list, tuple):
-        if len(val) == 0:
-            return "[]"
-        val0 = val[0]
-        if type(val0) in (int, float, str, bool):
-            # TODO: escape strings properly
-            return str(list(val))
-        else:
-            pref = indent + '- '
-            indent = indent + '  '
-            return '\n'+'\n'.join([pref+strify_message(v, indent, time_offset, current_time, field_filter) for v in val])
+        yield '\n%ssecs: %s\n%snsecs: %s'%(indent, val.secs, indent, val.nsecs)
+    elif type_ in (list, tuple) or type_ == StructArray:
+        for s in _strify_array(val, indent, time_offset, field_filter, max_array_length, summarize_arrays):
+            yield s
     elif isinstance(val, Message):
-        # allow caller to select which fields of message are strified
-        if field_filter is not None:
-            fields = list(field_filter(val))
-        else:
-            fields = val.__slots__
-
-        p = '%s%%s: %%s'%(indent)
-        ni = '  '+indent
-        if sys.hexversion > 0x03000000: #Python3
-            vals = '\n'.join([p%(f,
-                                 strify_message(_convert_getattr(val, f, t), ni, time_offset, current_time, field_filter)) for f,t in zip(val.__slots__, val._slot_types) if f in fields])			
-        else: #Python2
-            vals = '\n'.join([p%(f,
-                                 strify_message(_convert_getattr(val, f, t), ni, time_offset, current_time, field_filter)) for f,t in itertools.izip(val.__slots__, val._slot_types) if f in fields])
-        if indent:
-            return '\n'+vals
-        else:
-            return vals
-        
+        for s in _strify_message(val, indent, time_offset, field_filter, max_array_length, summarize_arrays):
+            yield s
     else:
-        return str(val) #punt
+        yield str(val) #punt
 
-def _convert_getattr(val, f, t):
+def strify_message_iter(val, indent='', time_offset=None, field_filter=None, max_array_length=None, summarize_arrays=False):
     """
-    Convert atttribute types on the fly, if necessary.  This is mainly
-    to convert uint8[] fields back to an array type.
+    Generate the string representation of val incrementally. See
+    L{strify_message()} for a description of the parameters.
+    @return: iterator of strings whose concatenation is the string
+    (YAML) representation of val
+    @rtype: iter(str)
     """
-    attr = getattr(val, f)
-    if isstring(attr) and 'uint8[' in t:
-        return [ord(x) for x in attr]
-    else:
-        return attr
+    return _strify(val, indent, time_offset, field_filter, max_array_length, summarize_arrays)
+
+def write_message(buff, val, indent='', time_offset=None, field_filter=None, max_array_length=None, summarize_arrays=False):
+    """
+    Write string representation of val to buff without building the
+    entire string in memory. See L{strify_message()} for a
+    description of the parameters.
+    @param buff: file-like object to write to
+    @type  buff: file
+    """
+    write = buff.write
+    for s in _strify(val, indent, time_offset, field_filter, max_array_length, summarize_arrays):
+        write(s)
+
+def strify_message(val, indent='', time_offset=None, current_time=None, field_filter=None, max_array_length=None, summarize_arrays=False):
+    """
+    Convert value to string representation
+    @param val: to convert to string representation. Most likely a Message.
+    @type  val: Value
+    @param indent: indentation. If indent is set, then the return value will have a leading \n
+    @type  indent: str
+    @param time_offset: if not None, time fields will be displayed
+    as deltas from  time_offset
+    @type  time_offset: Time
+    @param current_time: currently not used. Only provided for API compatibility. current_time passes in the current time with respect to the message.
+    @type  current_time: Time
+    @param field_filter: filter the fields that are strified for Messages.
+    @type  field_filter: fn(Message)->iter(str)
+    @param max_array_length: if not None, only the first
+    max_array_length elements of arrays are shown, followed by the
+    number of remaining elements.
+    @type  max_array_length: int
+    @param summarize_arrays: if True, array fields of messages are
+    shown as their type and length only.
+    @type  summarize_arrays: bool
+    @return: string (YAML) representation of message
+    @rtype: str
+    """
+    # join in batches, as many small strings take more memory than the result
+    chunks = []
+    batch = []
+    for s in _strify(val, indent, time_offset, field_filter, max_array_length, summarize_arrays):
+        batch.append(s)
+        if len(batch) == _ARRAY_CHUNK:
+            chunks.append(''.join(batch))
+            batch = []
+    chunks.append(''.join(batch))
+    return ''.join(chunks)
 
 # check_type mildly violates some abstraction boundaries between .msg
 # representation and the python Message representation. The
@@ -254,13 +383,19 @@ _widths = {
     'int32': 32, 'uint32': 32, 
     'int64': 64, 'uint64': 64, 
 }
+_signed_types = ['byte', 'int8', 'int16', 'int32', 'int64']
+_unsigned_types = ['char', 'uint8', 'uint16', 'uint32', 'uint64']
+# check_type() limits on signed and unsigned values of each width
+_maxvals = dict([(t, 2 ** (_widths[t] - 1)) for t in _signed_types] +
+                [(t, 2 ** _widths[t]) for t in _unsigned_types])
+_simple_types = set(_widths.keys()) | set(['float32', 'float64', 'bool'])
 
 def check_type(field_name, field_type, field_val):
     """
     Dynamic type checker that maps ROS .msg types to python types and
     verifies the python value.  check_type() is not designed to be
-    fast and is targeted at error diagnosis. This type checker is not
-    designed to run fast and is meant only for error diagnosis.
+    fast and is targeted at error diagnosis. Use L{get_validator()} to
+    check entire messages.
     
     @param field_name: ROS .msg field name
     @type  field_name: str
@@ -270,21 +405,18 @@ def check_type(field_name, field_type, field_val):
     @type  field_val: Any
     @raise SerializationError: if typecheck fails
     """
-    # lazy-import as roslib.genpy has lots of extra imports. Would
-    # prefer to do lazy-init in a different manner
-    import roslib.genpy_electric
-    if roslib.genpy_electric.is_simple(field_type):
+    if field_type in _simple_types:
         # check sign and width
-        if field_type in ['byte', 'int8', 'int16', 'int32', 'int64']:
+        if field_type in _signed_types:
             if type(field_val) not in [long, int]:
                 raise SerializationError('field %s must be an integer type'%field_name)
-            maxval = int(math.pow(2, _widths[field_type]-1))
+            maxval = _maxvals[field_type]
             if field_val >= maxval or field_val <= -maxval:
                 raise SerializationError('field %s exceeds specified width [%s]'%(field_name, field_type))
-        elif field_type in ['char', 'uint8', 'uint16', 'uint32', 'uint64']:
+        elif field_type in _unsigned_types:
             if type(field_val) not in [long, int] or field_val < 0:
                 raise SerializationError('field %s must be unsigned integer type'%field_name)
-            maxval = int(math.pow(2, _widths[field_type]))
+            maxval = _maxvals[field_type]
             if field_val >= maxval:
                 raise SerializationError('field %s exceeds specified width [%s]'%(field_name, field_type))
         elif field_type == 'bool':
@@ -319,7 +451,7 @@ def check_type(field_name, field_type, field_val):
                 #string.
                 return
             
-        if not type(field_val) in [list, tuple]:
+        if not type(field_val) in [list, tuple, StructArray]:
             raise SerializationError('field %s must be a list or tuple type'%field_name)
         for v in field_val:
             check_type(field_name+"[]", base_type, v)
@@ -394,14 +526,12 @@ class Message(object):
         raise Exception("must be overriden")
     def _check_types(self, exc=None):
         """
-        Perform dynamic type-checking of Message fields. This is performance intensive
-        and is meant for post-error diagnosis
+        Perform dynamic type-checking of Message fields. See L{get_validator()}.
         @param exc: underlying exception that gave cause for type check. 
         @type  exc: Exception
         @raise roslib.messages.SerializationError: if typecheck fails
         """
-        for n, t in zip(self.__slots__, self._get_types()):
-            check_type(n, t, getattr(self, n))
+        get_validator(type(self))(self)
         if exc: # if exc is set and check_type could not diagnose, raise wrapped error
             raise SerializationError(str(exc))
 
@@ -449,6 +579,297 @@ class SerializationError(ROSMessageException):
     """Message serialization error"""
     pass
 
+# numpy types of simple types, see struct_array()
+_NUMPY_TYPES = {
+    'int8': 'i1', 'byte': 'i1',
+    'uint8': 'u1', 'char': 'u1', 'bool': 'u1',
+    'int16': '<i2', 'uint16': '<u2',
+    'int32': '<i4', 'uint32': '<u4',
+    'int64': '<i8', 'uint64': '<u8',
+    'float32': '<f4', 'float64': '<f8',
+    }
+# {fields: numpy dtype}
+_struct_dtypes = {}
+
+class StructArray(object):
+    """
+    Fixed-length sequence of messages of a fixed-size type that is
+    backed by a numpy structured array. Generated deserialize_numpy()
+    methods return arrays of such messages as StructArrays if they are
+    generated with the numpy_struct_arrays option of
+    L{roslib.genpy_electric.msg_generator()}.
+
+    Elements are only materialized into message instances when they
+    are accessed. Changes to materialized elements are included when
+    the array is serialized. The structured array itself is available
+    as the C{array} attribute.
+    """
+    __slots__ = ['array', 'cls', 'fields', '_paths', '_messages']
+
+    def __init__(self, array, cls, fields):
+        """
+        @param array: structured array of elements
+        @type  array: numpy.ndarray
+        @param cls: message class of elements
+        @type  cls: class
+        @param fields: flattened (field name, field type) pairs of
+        cls, in the order of the fields of array
+        @type  fields: ((str, str),)
+        """
+        self.array = array
+        self.cls = cls
+        self.fields = fields
+        self._paths = [(n.split('.'), t == 'bool') for n, t in fields]
+        # {index: materialized message}
+        self._messages = {}
+
+    def _index(self, i):
+        if i < 0:
+            i += len(self.array)
+        if i < 0 or i >= len(self.array):
+            raise IndexError("StructArray index out of range")
+        return i
+
+    def _materialize(self, i):
+        m = self._messages.get(i, None)
+        if m is None:
+            m = self.cls()
+            for (path, is_bool), v in zip(self._paths, self.array[i].item()):
+                obj = m
+                for a in path[:-1]:
+                    obj = getattr(obj, a)
+                setattr(obj, path[-1], bool(v) if is_bool else v)
+            self._messages[i] = m
+        return m
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._materialize(j) for j in range(*i.indices(len(self.array)))]
+        return self._materialize(self._index(i))
+
+    def __setitem__(self, i, msg):
+        self._messages[self._index(i)] = msg
+
+    def __iter__(self):
+        for i in range(len(self.array)):
+            yield self._materialize(i)
+
+    def __eq__(self, other):
+        try:
+            if len(self) != len(other):
+                return False
+        except TypeError:
+            return False
+        for a, b in zip(self, other):
+            if not a == b:
+                return False
+        return True
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def tobytes(self):
+        """
+        @return: serialized elements
+        @rtype: str
+        """
+        if not self._messages:
+            return self.array.tobytes()
+        array = self.array.copy()
+        for i, m in self._messages.items():
+            values = []
+            for path, _ in self._paths:
+                obj = m
+                for a in path:
+                    obj = getattr(obj, a)
+                values.append(obj)
+            array[i] = tuple(values)
+        return array.tobytes()
+
+def struct_array(numpy, buff, offset, count, cls, fields):
+    """
+    Deserialize an array of messages of a fixed-size type without
+    creating the message instances. Used by generated code.
+    @param numpy: numpy python module
+    @type  numpy: module
+    @param buff: serialized data
+    @type  buff: str
+    @param offset: offset of first element in buff
+    @type  offset: int
+    @param count: number of elements
+    @type  count: int
+    @param cls: message class of elements
+    @type  cls: class
+    @param fields: flattened (field name, field type) pairs of cls
+    @type  fields: ((str, str),)
+    @return: deserialized array
+    @rtype: L{StructArray}
+    @raise DeserializationError: if buff is too short
+    """
+    dtype = _struct_dtypes.get(fields, None)
+    if dtype is None:
+        dtype = _struct_dtypes[fields] = numpy.dtype([(n, _NUMPY_TYPES[t]) for n, t in fields])
+    if len(buff) < offset + count * dtype.itemsize:
+        raise DeserializationError("buffer underfill: %s elements of %s"%(count, cls._type))
+    return StructArray(numpy.frombuffer(buff, dtype=dtype, count=count, offset=offset), cls, fields)
+
+# Compiled validators. get_validator() generates a function per message
+# class from _slot_types that performs the same checks as check_type()
+# in a single pass over the fields of a message. Numeric arrays are
+# checked with min()/max() and only fall back to check_type() on each
+# element to report the offending element.
+
+# {message class: validator}
+_validators = {}
+
+_int_types = set([int, long])
+_array_types = [list, tuple, StructArray]
+_bool_values = [True, False, 0, 1]
+_header_types = ['std_msgs/Header', 'roslib/Header']
+_header_field_types = ['Header', 'std_msgs/Header', 'roslib/Header']
+
+def _all_bools(vals):
+    try:
+        return set(vals).issubset(_bool_values)
+    except TypeError: # unhashable value
+        return False
+
+def _all_strings(vals):
+    types = set(map(type, vals))
+    if sys.hexversion > 0x03000000:
+        return str not in types
+    else:
+        return types.issubset([str])
+
+def _check_elements(field_name, field_type, field_val):
+    for v in field_val:
+        check_type(field_name, field_type, v)
+
+def _check_message(field_name, field_type, field_val):
+    """
+    Check type of embedded message field_val and validate its fields.
+    """
+    if not isinstance(field_val, Message):
+        raise SerializationError("field %s must be of type [%s]"%(field_name, field_type))
+    # roslib/Header is the old location of Header. We check it for backwards compat
+    if field_val._type in _header_types:
+        if field_type not in _header_field_types:
+            raise SerializationError("field %s must be a Header instead of a %s"%(field_name, field_val._type))
+    elif field_val._type != field_type:
+        raise SerializationError("field %s must be of type %s instead of %s"%(field_name, field_type, field_val._type))
+    get_validator(type(field_val))(field_val, field_name + '.')
+
+def _validator_source(msg_class):
+    """
+    @return: source of validate() function for msg_class
+    @rtype: [str]
+    """
+    s = ["def validate(msg, prefix=''):"]
+    for field, field_type in zip(msg_class.__slots__, msg_class._slot_types):
+        name = "(prefix + %r)"%field
+        s.append("    v = msg.%s"%field)
+        if field_type.endswith(']'):
+            base_type = field_type[:field_type.index('[')]
+            s.append("    if type(v) == str:")
+            if base_type in ['char', 'uint8']:
+                s.append("        pass")
+            else:
+                s.append("        raise SerializationError('field %%s must be a list or tuple type. Only uint8[] can be a string'%%%s)"%name)
+            s.append("    elif type(v) not in _array_types:")
+            s.append("        raise SerializationError('field %%s must be a list or tuple type'%%%s)"%name)
+            elements = "_check_elements(%s + '[]', %r, v)"%(name, base_type)
+            if base_type in _signed_types:
+                s.append("    elif v and not (_int_types.issuperset(map(type, v)) and min(v) > %s and max(v) < %s):"%(-_maxvals[base_type], _maxvals[base_type]))
+                s.append("        " + elements)
+            elif base_type in _unsigned_types:
+                s.append("    elif v and not (_int_types.issuperset(map(type, v)) and min(v) >= 0 and max(v) < %s):"%_maxvals[base_type])
+                s.append("        " + elements)
+            elif base_type == 'bool':
+                s.append("    elif not _all_bools(v):")
+                s.append("        " + elements)
+            elif base_type == 'string':
+                s.append("    elif not _all_strings(v):")
+                s.append("        " + elements)
+            elif base_type in _simple_types:
+                pass # floats are not checked
+            elif base_type in ['time', 'duration']:
+                s.append("    else:")
+                s.append("        " + elements)
+            else:
+                s.append("    else:")
+                s.append("        for x in v:")
+                s.append("            _check_message(%s + '[]', %r, x)"%(name, base_type))
+        elif field_type in _signed_types:
+            s.append("    if type(v) not in _int_types:")
+            s.append("        raise SerializationError('field %%s must be an integer type'%%%s)"%name)
+            s.append("    if v >= %s or v <= %s:"%(_maxvals[field_type], -_maxvals[field_type]))
+            s.append("        raise SerializationError('field %%s exceeds specified width [%s]'%%%s)"%(field_type, name))
+        elif field_type in _unsigned_types:
+            s.append("    if type(v) not in _int_types or v < 0:")
+            s.append("        raise SerializationError('field %%s must be unsigned integer type'%%%s)"%name)
+            s.append("    if v >= %s:"%_maxvals[field_type])
+            s.append("        raise SerializationError('field %%s exceeds specified width [%s]'%%%s)"%(field_type, name))
+        elif field_type == 'bool':
+            s.append("    if v not in _bool_values:")
+            s.append("        raise SerializationError('field %%s is not a bool'%%%s)"%name)
+        elif field_type in _simple_types:
+            pass # floats are not checked
+        elif field_type == 'string':
+            if sys.hexversion > 0x03000000:
+                s.append("    if type(v) == str:")
+            else:
+                s.append("    if type(v) == unicode:")
+            s.append("        raise SerializationError('field %%s is a unicode string instead of an ascii string'%%%s)"%name)
+            if sys.hexversion < 0x03000000:
+                s.append("    elif not isstring(v):")
+                s.append("        raise SerializationError('field %%s must be of type str'%%%s)"%name)
+        elif field_type == 'time':
+            s.append("    if not isinstance(v, Time):")
+            s.append("        raise SerializationError('field %%s must be of type Time'%%%s)"%name)
+        elif field_type == 'duration':
+            s.append("    if not isinstance(v, Duration):")
+            s.append("        raise SerializationError('field %%s must be of type Duration'%%%s)"%name)
+        else:
+            s.append("    _check_message(%s, %r, v)"%(name, field_type))
+    s.append("    return")
+    return s
+
+def _check_fields(msg, prefix=''):
+    # validator of message classes without _slot_types
+    for n, t in zip(msg.__slots__, msg._get_types()):
+        check_type(prefix + n, t, getattr(msg, n))
+
+def get_validator(msg_class):
+    """
+    Get the validator of a message class. The validator performs the
+    same checks as L{check_type()} on every field of a message,
+    including embedded messages, and raises the same errors, but is
+    generated once per class and is fast enough to be used before
+    every publish.
+    @param msg_class: message class
+    @type  msg_class: class
+    @return: function that takes a message instance of msg_class
+    @rtype: fn(msg)
+    """
+    try:
+        return _validators[msg_class]
+    except KeyError:
+        pass
+    if getattr(msg_class, '_slot_types', None) is None:
+        validator = _check_fields
+    else:
+        namespace = dict(globals())
+        exec('\n'.join(_validator_source(msg_class)), namespace)
+        validator = namespace['validate']
+    _validators[msg_class] = validator
+    return validator
+
 # Utilities for rostopic/rosservice
 
 def get_printable_message_args(msg, buff=None, prefix=''):
@@ -480,7 +901,42 @@ def get_printable_message_args(msg, buff=None, prefix=''):
             buff.write(prefix+f+' ')
     return buff.getvalue().rstrip()
 
-def _fill_val(msg, f, v, keys, prefix):
+# {message class: {field: [base type, is primitive, is array, element class]}}
+_fill_plans = {}
+
+def _fill_plan(msg_class):
+    """
+    Compute the fill plan of msg_class, i.e. how each field is filled
+    by L{_fill_val()}. Plans are computed once per class.
+    @param msg_class: message class, or L{genpy.TVal} subclass
+    @type  msg_class: class
+    @return: {field: [base type, is primitive, is array, element class]}.
+    The element class of arrays of messages is resolved on first use.
+    @rtype: dict
+    """
+    try:
+        return _fill_plans[msg_class]
+    except KeyError:
+        pass
+    # lazy-import, as roslib.msgs is not needed to use messages
+    import roslib.msgs
+    slot_types = getattr(msg_class, '_slot_types', None)
+    plan = {}
+    for i, f in enumerate(msg_class.__slots__):
+        if slot_types is None:
+            # time values
+            base_type = None
+            primitive = True
+            array = False
+        else:
+            base_type = roslib.msgs.base_msg_type(slot_types[i])
+            primitive = base_type in roslib.msgs.PRIMITIVE_TYPES
+            array = slot_types[i].endswith(']')
+        plan[f] = [base_type, primitive, array, None]
+    _fill_plans[msg_class] = plan
+    return plan
+
+def _fill_val(msg, f, v, keys, prefix, plan):
     """
     Subroutine of L{_fill_message_args()}. Sets a particular field on a message
     @param f: field name
@@ -488,9 +944,16 @@ def _fill_val(msg, f, v, keys, prefix):
     @param v: field value
     @param keys: keys to use as substitute values for messages and timestamps. 
     @type  keys: dict
+    @param plan: fill plan of msg, from L{_fill_plan()}
+    @type  plan: dict
     """
-    if not f in msg.__slots__:
+    try:
+        field = plan[f]
+    except KeyError:
         raise ROSMessageException("No field name [%s%s]"%(prefix, f))
+    if field[1] and not field[2]:
+        setattr(msg, f, v)
+        return
     def_val = getattr(msg, f)
     if isinstance(def_val, Message) or isinstance(def_val, genpy.TVal):
         # check for substitution key, e.g. 'now'
@@ -513,28 +976,27 @@ def _fill_val(msg, f, v, keys, prefix):
     elif type(def_val) == list:
         if not type(v) in [list, tuple]:
             raise ROSMessageException("Field [%s%s] must be a list or tuple instead of: %s"%(prefix, f, type(v).__name__))
-        # determine base_type of field by looking at _slot_types
-        idx = msg.__slots__.index(f)
-        t = msg._slot_types[idx]
-        base_type = roslib.msgs.base_msg_type(t)
         # - for primitives, we just directly set (we don't
         #   type-check. we rely on serialization type checker)
-        if base_type in roslib.msgs.PRIMITIVE_TYPES:
+        if field[1]:
             setattr(msg, f, v)
 
         # - for complex types, we have to iteratively append to def_val
         else:
-            list_msg_class = get_message_class(base_type)
+            list_msg_class = field[3]
+            if list_msg_class is None:
+                list_msg_class = field[3] = get_message_class(field[0])
+            list_plan = _fill_plans.get(list_msg_class, None) or _fill_plan(list_msg_class)
             for el in v:
                 inner_msg = list_msg_class()
-                _fill_message_args(inner_msg, el, prefix)
+                _fill_message_args(inner_msg, el, keys, prefix, list_plan)
                 def_val.append(inner_msg)
     else:
         #print "SET2", f, v
         setattr(msg, f, v)
     
     
-def _fill_message_args(msg, msg_args, keys, prefix=''):
+def _fill_message_args(msg, msg_args, keys, prefix='', plan=None):
     """
     Populate message with specified args.
     
@@ -546,6 +1008,8 @@ def _fill_message_args(msg, msg_args, keys, prefix=''):
     @type  keys: dict
     @param prefix: field name prefix (for verbose printing)
     @type  prefix: str
+    @param plan: fill plan of msg, from L{_fill_plan()}
+    @type  plan: dict
     @return: unused/leftover message arguments. 
     @rtype: [args]
     @raise ROSMessageException: if not enough message arguments to fill message
@@ -553,6 +1017,8 @@ def _fill_message_args(msg, msg_args, keys, prefix=''):
     """
     if not isinstance(msg, (Message, genpy.TVal)):
         raise ValueError("msg must be a Message instance: %s"%msg)
+    if plan is None:
+        plan = _fill_plans.get(type(msg), None) or _fill_plan(type(msg))
 
     if type(msg_args) == dict:
         
@@ -561,9 +1027,9 @@ def _fill_message_args(msg, msg_args, keys, prefix=''):
         
         for f, v in msg_args.items():
             # assume that an empty key is actually an empty string
-            if v == None:
+            if v is None:
                 v = ''
-            _fill_val(msg, f, v, keys, prefix)
+            _fill_val(msg, f, v, keys, prefix, plan)
     elif type(msg_args) == list:
         
         #print "LIST ARGS", msg_args
@@ -575,7 +1041,7 @@ def _fill_message_args(msg, msg_args, keys, prefix=''):
             raise ROSMessageException("Not enough arguments:\n * Given: %s\n * Expected: %s"%(msg_args, msg.__slots__))
         
         for f, v in zip(msg.__slots__, msg_args):
-            _fill_val(msg, f, v, keys, prefix)
+            _fill_val(msg, f, v, keys, prefix, plan)
     else:
         raise ValueError("invalid msg_args type: %s"%str(msg_args))
 
@@ -624,3 +1090,36 @@ def fill_message_args(msg, msg_args, keys={}):
     else:
         _fill_message_args(msg, msg_args, keys, '')
 
+
+def fill_messages(msg_class, msg_args_list, keys={}):
+    """
+    Create and populate messages of msg_class, one for each element of
+    msg_args_list. This is equivalent to calling L{fill_message_args()}
+    on a new instance of msg_class for each element, but a dictionary
+    element is used directly as keyword arguments, i.e. like a list
+    with a single dictionary.
+
+    @param msg_class: message class
+    @type  msg_class: class
+    @param msg_args_list: list of arguments of each message
+    @type  msg_args_list: [[args] or dict]
+    @param keys: keys to use as substitute values for messages and timestamps.
+    @type  keys: dict
+    @return: new messages
+    @rtype: [Message]
+    @raise ROSMessageException: if not enough/too many message arguments to fill a message
+    """
+    plan = _fill_plan(msg_class)
+    msgs = []
+    for msg_args in msg_args_list:
+        msg = msg_class()
+        if msg_args is None:
+            msg_args = []
+        if type(msg_args) == dict:
+            _fill_message_args(msg, msg_args, keys, '', plan)
+        elif len(msg_args) == 1 and type(msg_args[0]) == dict:
+            _fill_message_args(msg, msg_args[0], keys, '', plan)
+        else:
+            _fill_message_args(msg, msg_args, keys, '', plan)
+        msgs.append(msg)
+    return msgs
@@ -46,18 +46,21 @@ try:
 except ImportError:
     from io import StringIO # Python 3.x
 
+import collections
+import contextlib
 import os
 import itertools
 import sys
 import re
 import string
+import threading
 
-import rospkg
-
+import roslib.instrument
 import roslib.manifest
 import roslib.packages
 import roslib.names
 import roslib.resources
+import roslib.spec_cache
 
 VERBOSE = False
 
@@ -310,7 +313,8 @@ class MsgSpec(object):
         self.full_name = full_name
         self.short_name = short_name
         self.package = package
-        self._parsed_fields = [Field(name, type) for (name, type) in zip(self.names, self.types)]
+        # Field instances, created on demand
+        self._fields = None
         
     def fields(self):
         """
@@ -324,7 +328,12 @@ class MsgSpec(object):
         @return: list of Field classes
         @rtype: [Field,]
         """
-        return self._parsed_fields
+        if self._fields is None:
+            self._fields = [Field(name, type) for (name, type) in zip(self.names, self.types)]
+        return self._fields
+
+    # backwards compatibility
+    _parsed_fields = property(parsed_fields)
 
     def has_header(self):
         """
@@ -364,11 +373,21 @@ def reinit():
     _initialized = False
     del _loaded_packages[:]
     REGISTERED_TYPES.clear()
+    _lazy_packages.clear()
+    _lazy_types.clear()
     _init()
     
 _initialized = False
+_init_lock = threading.RLock()
+@roslib.instrument.phase('msg_load')
 def _init():
     #lazy-init
+    if _initialized:
+        return
+    with _init_lock:
+        return _init_unlocked()
+
+def _init_unlocked():
     global _initialized
     if _initialized:
         return
@@ -383,14 +402,15 @@ def _init():
         sys.stderr.write("ERROR: cannot locate %s. Expected to find it at '%s'\n"%(fname, header))
         return False
 
-    # register Header under both contexted and de-contexted name
+    # register Header under both contexted and de-contexted name. The
+    # global registry is used even if a local registry is active.
     _, spec = load_from_file(header, '')
-    register(HEADER, spec)
-    register('std_msgs/'+HEADER, spec)    
+    REGISTERED_TYPES[HEADER] = spec
+    REGISTERED_TYPES['std_msgs/'+HEADER] = spec
     # backwards compat, REP 100
-    register('roslib/'+HEADER, spec)    
+    REGISTERED_TYPES['roslib/'+HEADER] = spec
     for k, spec in EXTENDED_BUILTINS.items():
-        register(k, spec)
+        REGISTERED_TYPES[k] = spec
         
     _initialized = True
 
@@ -455,6 +475,8 @@ def get_pkg_msg_specs(package):
 def load_package_dependencies(package, load_recursive=False):
     """
     Register all messages that the specified package depends on.
+    Messages are registered lazily, i.e. they are loaded when they
+    are first looked up with L{is_registered()} or L{get_registered()}.
     
     @param load_recursive: (optional) if True, load all dependencies,
         not just direct dependencies. By default, this is false to
@@ -471,10 +493,8 @@ def load_package_dependencies(package, load_recursive=False):
         m = roslib.manifest.parse_file(manifest_file)
         depends = [d.package for d in m.depends] # #391
     else:
-        depends = rospkg.RosPack().get_depends(package, implicit=True)
+        depends = roslib.packages.ROSPackages().depends([package])[package]
 
-    msgs = []
-    failures = []
     for d in depends:
         if VERBOSE:
             print("Load dependency", d)
@@ -483,11 +503,7 @@ def load_package_dependencies(package, load_recursive=False):
         if d in _loaded_packages or d == package:
             continue
         _loaded_packages.append(d)
-        specs, failed = get_pkg_msg_specs(d)
-        msgs.extend(specs)
-        failures.extend(failed)
-    for key, spec in msgs:
-        register(key, spec)
+        _lazy_packages.add(d)
 
 def load_package(package):
     """
@@ -632,6 +648,7 @@ def load_from_string(text, package_context='', full_name='', short_name=''):
             names.append(name)
     return MsgSpec(types, names, constants, text, full_name, short_name, package_context)
 
+@roslib.instrument.phase('msg_load')
 def load_from_file(file_path, package_context=''):
     """
     Convert the .msg representation in the file to a MsgSpec instance.
@@ -662,15 +679,36 @@ def load_from_file(file_path, package_context=''):
     if not roslib.names.is_legal_resource_name(type_):
         raise MsgSpecException("%s: [%s] is not a legal type name"%(file_path, type_))
     
+    cached, token = roslib.spec_cache.lookup(file_path, package_context)
+    if cached is not None:
+        return (type_, _decode_spec(cached, type_, base_type_, package_context))
     f = open(file_path, 'r')
     try:
         try:
             text = f.read()
-            return (type_, load_from_string(text, package_context, type_, base_type_))
+            spec = load_from_string(text, package_context, type_, base_type_)
         except MsgSpecException as e:
             raise MsgSpecException('%s: %s'%(file_name, e))
     finally:
         f.close()
+    roslib.spec_cache.store(token, _encode_spec(spec))
+    return (type_, spec)
+
+def _encode_spec(spec):
+    """
+    @return: spec as a tuple of builtin types, for L{roslib.spec_cache}
+    @rtype: tuple
+    """
+    return (spec.types, spec.names, [(c.type, c.name, c.val, c.val_text) for c in spec.constants], spec.text)
+
+def _decode_spec(t, full_name, short_name, package):
+    """
+    @param t: encoded spec, from L{_encode_spec()}
+    @type  t: tuple
+    @rtype: L{MsgSpec}
+    """
+    types, names, constants, text = t
+    return MsgSpec(list(types), list(names), [Constant(*c) for c in constants], text, full_name, short_name, package)
 
 # data structures and builtins specification ###########################
 
@@ -724,6 +762,96 @@ RESERVED_TYPES  = BUILTIN_TYPES + [HEADER]
 REGISTERED_TYPES = { } 
 _loaded_packages = [] #keep track of packages so that we only load once (note: bug #59)
 
+## maximum number of lazily registered messages that are kept loaded
+LAZY_CACHE_SIZE = 1000
+
+class _LRUCache(object):
+    """
+    Dictionary with a bounded number of entries that evicts the least
+    recently used entry.
+    """
+    
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                return None
+            self._entries[key] = value
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+# packages whose messages are registered lazily, see load_package_dependencies()
+_lazy_packages = set()
+# lazily registered messages that have been looked up
+_lazy_types = _LRUCache(LAZY_CACHE_SIZE)
+
+def _get_lazy(msg_type_name):
+    """
+    Look up a lazily registered message, loading it if necessary.
+    @return: msg spec, or None if msg_type_name is not lazily registered
+    @rtype: L{MsgSpec}
+    """
+    spec = _lazy_types.get(msg_type_name)
+    if spec is not None:
+        return spec
+    package, base_type = roslib.names.package_resource_name(msg_type_name)
+    if package not in _lazy_packages or not base_type:
+        return None
+    try:
+        f = msg_file(package, base_type)
+    except roslib.packages.InvalidROSPkgException:
+        return None
+    if not os.path.isfile(f):
+        return None
+    try:
+        _, spec = load_from_file(f, package)
+    except Exception:
+        print("ERROR: unable to load %s"%base_type)
+        return None
+    _lazy_types.put(msg_type_name, spec)
+    return spec
+
+# thread-local state: 'registry' is the active local registry, see local_registry()
+_local = threading.local()
+
+@contextlib.contextmanager
+def local_registry():
+    """
+    Context manager that makes L{register()} register message types
+    in a registry that is local to the current thread until the with
+    statement exits. Types in the local registry take precedence over
+    the global registry. This allows message specs to be registered
+    temporarily, e.g. for dynamic message generation, without
+    affecting other threads.
+    @return: local registry
+    @rtype: dict
+    """
+    previous = getattr(_local, 'registry', None)
+    _local.registry = {}
+    try:
+        yield _local.registry
+    finally:
+        _local.registry = previous
+
 def is_registered(msg_type_name):
     """
     @param msg_type_name: name of message type
@@ -732,7 +860,10 @@ def is_registered(msg_type_name):
     registered. NOTE: builtin types are not registered.
     @rtype: bool
     """
-    return msg_type_name in REGISTERED_TYPES
+    local = getattr(_local, 'registry', None)
+    if local is not None and msg_type_name in local:
+        return True
+    return msg_type_name in REGISTERED_TYPES or _get_lazy(msg_type_name) is not None
 
 def get_registered(msg_type_name, default_package=None):
     """
@@ -741,18 +872,33 @@ def get_registered(msg_type_name, default_package=None):
     @return: msg spec for msg type name
     @rtype: L{MsgSpec}
     """
+    local = getattr(_local, 'registry', None)
+    if local is not None and msg_type_name in local:
+        return local[msg_type_name]
     if msg_type_name in REGISTERED_TYPES:
         return REGISTERED_TYPES[msg_type_name]
+    spec = _get_lazy(msg_type_name)
+    if spec is not None:
+        return spec
     elif default_package:
         # if msg_type_name has no package specifier, try with default package resolution
         p, n = roslib.names.package_resource_name(msg_type_name)
         if not p:
-            return REGISTERED_TYPES[roslib.names.resource_name(default_package, msg_type_name)]
+            name = roslib.names.resource_name(default_package, msg_type_name)
+            if local is not None and name in local:
+                return local[name]
+            if name in REGISTERED_TYPES:
+                return REGISTERED_TYPES[name]
+            spec = _get_lazy(name)
+            if spec is not None:
+                return spec
+            raise KeyError(name)
     raise KeyError(msg_type_name)
 
 def register(msg_type_name, msg_spec):
     """
-    Load MsgSpec into the type dictionary
+    Load MsgSpec into the type dictionary, or into the local registry
+    of the current thread if one is active (see L{local_registry()}).
     
     @param msg_type_name: name of message type
     @type  msg_type_name: str
@@ -761,5 +907,9 @@ def register(msg_type_name, msg_spec):
     """
     if VERBOSE:
         print("Register msg %s"%msg_type_name)
-    REGISTERED_TYPES[msg_type_name] = msg_spec
+    local = getattr(_local, 'registry', None)
+    if local is not None:
+        local[msg_type_name] = msg_spec
+    else:
+        REGISTERED_TYPES[msg_type_name] = msg_spec
 
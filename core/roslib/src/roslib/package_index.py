@@ -0,0 +1,438 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# Revision $Id$
+
+"""
+Persistent index of the ROS packages and stacks found on a set of
+paths (i.e. ROS_ROOT and ROS_PACKAGE_PATH).
+
+The index records every directory that a crawl visits along with its
+modification time. The index is stored in ROS_HOME and is revalidated
+on load by stat()ing the recorded directories: only directories whose
+mtime has changed are listed again, so a valid index costs one stat per
+directory instead of a full crawl.
+
+This is an internal library. See L{roslib.packages} and L{roslib.stacks}
+for the public APIs that use it.
+"""
+
+import os
+import time
+
+import rospkg
+
+import roslib.diskcache
+import roslib.instrument
+
+MANIFEST_FILE = 'manifest.xml'
+STACK_FILE = 'stack.xml'
+NOSUBDIRS_FILE = 'rospack_nosubdirs'
+
+## name of cache in ROS_HOME
+CACHE_NAME = 'package_index'
+## increment when the on-disk format changes
+INDEX_VERSION = 1
+
+# directories modified less than this many seconds before they were
+# listed are relisted on the next validation, as a further change
+# within the same mtime tick would otherwise go unnoticed.
+_RACY_WINDOW = 2.0
+
+try:
+    _scandir = os.scandir
+except AttributeError:
+    try:
+        from scandir import scandir as _scandir
+    except ImportError:
+        _scandir = None
+
+## default number of threads that list directories in a crawl
+CRAWL_THREADS = 8
+
+def _list_dir(path):
+    """
+    List the names in a directory and the names of its non-hidden
+    subdirectories. If scandir is available the dirent type information
+    is used, so that only symlinks need an additional stat() call.
+    @return: (names, subdirectory names)
+    @rtype: ([str], [str])
+    @raise OSError: if path cannot be listed
+    """
+    if _scandir is not None:
+        names = []
+        subdirs = []
+        for entry in list(_scandir(path)):
+            name = entry.name
+            names.append(name)
+            # hidden directories (e.g. .svn, .git) are never crawled
+            if name[0] == '.':
+                continue
+            try:
+                if entry.is_dir():
+                    subdirs.append(name)
+            except OSError:
+                pass
+        return names, subdirs
+    names = os.listdir(path)
+    isdir = os.path.isdir
+    join = os.path.join
+    return names, [n for n in names if n[0] != '.' and isdir(join(path, n))]
+
+def _scan_dir(path, st):
+    """
+    List a single directory of a crawl.
+    @param path: directory path
+    @type  path: str
+    @param st: os.stat() result for path
+    @type  st: stat_result
+    @return: directory record (dir_mtime, manifest_mtime, is_stack, children).
+      dir_mtime is None if the directory was modified too recently to be
+      trusted. manifest_mtime is None if the directory is not a package. children
+      are the names of subdirectories that need to be crawled.
+    @rtype: (float, float, bool, (str,))
+    """
+    mtime = st.st_mtime
+    if time.time() - mtime < _RACY_WINDOW:
+        mtime = None
+    try:
+        names, subdirs = _list_dir(path)
+    except OSError:
+        return (mtime, None, False, ())
+    manifest_mtime = None
+    if MANIFEST_FILE in names:
+        try:
+            manifest_mtime = os.stat(os.path.join(path, MANIFEST_FILE)).st_mtime
+        except OSError:
+            pass
+    is_stack = STACK_FILE in names
+    if manifest_mtime is not None or NOSUBDIRS_FILE in names:
+        children = () #leaf
+    else:
+        children = tuple(sorted(subdirs))
+    return (mtime, manifest_mtime, is_stack, children)
+
+def _visit(old_dirs, path, ancestors):
+    """
+    Validate or list a single directory of a crawl. This is the unit
+    of work that is handed to crawl threads.
+    @param old_dirs: directory records of the previous crawl
+    @type  old_dirs: dict
+    @param ancestors: (st_dev, st_ino) of the ancestors of path
+    @type  ancestors: frozenset
+    @return: (record, changed, ancestors of children), or None if path
+      does not exist or closes a symlink cycle.
+    @rtype: (tuple, bool, frozenset)
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    inode = (st.st_dev, st.st_ino)
+    if inode in ancestors:
+        return None #symlink cycle
+    changed = False
+    record = old_dirs.get(path, None)
+    if record is not None and record[0] == st.st_mtime and record[1] is not None:
+        # the manifest may be edited without touching the directory
+        try:
+            manifest_mtime = os.stat(os.path.join(path, MANIFEST_FILE)).st_mtime
+        except OSError:
+            manifest_mtime = None
+        if manifest_mtime != record[1]:
+            record = (record[0], manifest_mtime, record[2], record[3])
+            changed = True
+    if record is None or record[0] != st.st_mtime:
+        record = _scan_dir(path, st)
+        changed = True
+    return record, changed, ancestors | frozenset([inode])
+
+class PackageIndex(object):
+    """
+    Index of the packages and stacks found on an ordered list of
+    paths. Earlier paths take precedence if a package or stack name is
+    found more than once.
+    """
+
+    def __init__(self, paths, cache_file=None, threads=None):
+        """
+        @param paths: paths to index, in order of precedence
+        @type  paths: [str]
+        @param cache_file: (optional) path of cache file to load and store the index in.
+        @type  cache_file: str
+        @param threads: (optional) number of threads to crawl with. Defaults to L{CRAWL_THREADS}.
+        @type  threads: int
+        """
+        self.paths = tuple(paths)
+        self.cache_file = cache_file
+        if threads is None:
+            threads = CRAWL_THREADS
+        self.threads = threads
+        # {dir: (dir_mtime, manifest_mtime, is_stack, children)}
+        self._dirs = {}
+        # {package: (dir, manifest_mtime, stack)}
+        self.packages = {}
+        # {stack: dir}
+        self.stacks = {}
+        # names in precedence order
+        self._package_list = []
+        self._stack_list = []
+        self._loaded = False
+
+    def list_packages(self):
+        """
+        @return: package names in precedence (crawl) order
+        @rtype: [str]
+        """
+        self.load()
+        return self._package_list[:]
+
+    def list_stacks(self):
+        """
+        @return: stack names in precedence (crawl) order
+        @rtype: [str]
+        """
+        self.load()
+        return self._stack_list[:]
+
+    def get_pkg_dir(self, package):
+        """
+        @return: directory of package, or None if package is not in the index
+        @rtype: str
+        """
+        self.load()
+        entry = self.packages.get(package, None)
+        if entry is None or not os.path.isfile(os.path.join(entry[0], MANIFEST_FILE)):
+            # the package may have been created or moved since we
+            # last validated. Revalidate once before giving up.
+            self.refresh()
+            entry = self.packages.get(package, None)
+        if entry is not None:
+            return entry[0]
+        return None
+
+    def get_manifest_mtime(self, package):
+        """
+        @return: modification time of package's manifest, or None if package is not in the index
+        @rtype: float
+        """
+        self.load()
+        entry = self.packages.get(package, None)
+        if entry is not None:
+            return entry[1]
+        return None
+
+    def get_stack_of(self, package):
+        """
+        @return: name of the stack that package is in, or None if package
+          is not in the index or is not in a stack.
+        @rtype: str
+        """
+        self.load()
+        entry = self.packages.get(package, None)
+        if entry is not None:
+            return entry[2]
+        return None
+
+    def get_stack_dir(self, stack):
+        """
+        @return: directory of stack, or None if stack is not in the index
+        @rtype: str
+        """
+        self.load()
+        return self.stacks.get(stack, None)
+
+    def load(self):
+        """
+        Load the index, validating any on-disk copy against the
+        filesystem. This is a no-op if the index is already loaded.
+        """
+        if not self._loaded:
+            self._load()
+
+    @roslib.instrument.phase('crawl')
+    def _load(self):
+        if self.cache_file:
+            data = roslib.diskcache.load(self.cache_file)
+            if type(data) == dict and data.get('version') == INDEX_VERSION and \
+                    data.get('paths') == self.paths:
+                self._dirs = data['dirs']
+        self.refresh()
+
+    def refresh(self):
+        """
+        Revalidate the index against the filesystem. Directories that
+        have not changed since they were last listed are not listed again.
+        """
+        changed = self._update()
+        self._loaded = True
+        if changed and self.cache_file:
+            roslib.diskcache.dump(self.cache_file, {'version': INDEX_VERSION, 'paths': self.paths, 'dirs': self._dirs})
+
+    @roslib.instrument.phase('crawl')
+    def _update(self):
+        """
+        Crawl the paths, relisting only directories whose mtime has
+        changed, and recompute the package and stack tables.
+
+        The crawl proceeds one directory level at a time, with the
+        directories of a level validated by a pool of threads. The
+        package and stack tables are then computed from the directory
+        records in a depth-first pass that does no I/O.
+        @return: True if the directory records changed
+        @rtype: bool
+        """
+        old_dirs = self._dirs
+        roots = [os.path.abspath(p) for p in self.paths]
+        dirs = {}
+        changed = False
+        pool = None
+        try:
+            level = [(r, frozenset()) for r in roots]
+            while level:
+                if len(level) > 1 and self.threads > 1 and pool is None:
+                    from multiprocessing.dummy import Pool
+                    pool = Pool(self.threads)
+                if pool is not None:
+                    results = pool.map(lambda item: _visit(old_dirs, item[0], item[1]), level)
+                else:
+                    results = [_visit(old_dirs, p, a) for p, a in level]
+                next_level = []
+                for (path, _), result in zip(level, results):
+                    if result is None or path in dirs:
+                        continue
+                    record, record_changed, ancestors = result
+                    dirs[path] = record
+                    changed = changed or record_changed
+                    if record[1] is None:
+                        next_level.extend([(os.path.join(path, c), ancestors) for c in record[3]])
+                level = next_level
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        if len(dirs) != len(old_dirs):
+            changed = True
+
+        packages = {}
+        stacks = {}
+        package_list = []
+        stack_list = []
+        visited = set()
+        for root in roots:
+            # depth-first, preorder traversal. Stack entries are
+            # (path, stack the path is in, outermost stack dir).
+            queue = [(root, None, None)]
+            while queue:
+                path, stack, stack_root = queue.pop()
+                record = dirs.get(path, None)
+                if record is None or path in visited:
+                    continue
+                visited.add(path)
+                _, manifest_mtime, is_stack, children = record
+
+                if is_stack:
+                    name = os.path.basename(path)
+                    # stacks do not nest: only the outermost is listed
+                    if stack_root is None and name not in stacks:
+                        stacks[name] = path
+                        stack_list.append(name)
+                    stack = name
+                    if stack_root is None:
+                        stack_root = path
+                if manifest_mtime is not None:
+                    name = os.path.basename(path)
+                    if name not in packages:
+                        packages[name] = (path, manifest_mtime, stack)
+                        package_list.append(name)
+                    continue #leaf
+                # push in reverse so that children are visited in order
+                for c in reversed(children):
+                    queue.append((os.path.join(path, c), stack, stack_root))
+        self._dirs = dirs
+        self.packages = packages
+        self.stacks = stacks
+        self._package_list = package_list
+        self._stack_list = stack_list
+        return changed
+
+## in-process indices, keyed by path tuple
+_indices = {}
+
+def get_index(paths, env=None, persist=True, refresh=False):
+    """
+    Get the (validated) index for paths. Indices are cached in-process
+    and, if persist is True, on disk in ROS_HOME. An index is validated
+    against the filesystem when it is first loaded, and, if refresh is
+    True, on each call.
+
+    @param paths: paths to index, in order of precedence
+    @type  paths: [str]
+    @param env: override os.environ dictionary. Used to locate ROS_HOME.
+    @type  env: dict
+    @param persist: store index on disk
+    @type  persist: bool
+    @param refresh: revalidate the index if it is already loaded
+    @type  refresh: bool
+    @rtype: L{PackageIndex}
+    """
+    key = tuple([os.path.abspath(p) for p in paths])
+    index = _indices.get(key, None)
+    if index is None:
+        cache_file = None
+        if persist:
+            cache_file = roslib.diskcache.get_cache_file(CACHE_NAME, key, env)
+        index = _indices[key] = PackageIndex(key, cache_file)
+    if refresh and index._loaded:
+        index.refresh()
+    else:
+        index.load()
+    return index
+
+def get_ros_index(env=None):
+    """
+    Get the index for the ROS_ROOT and ROS_PACKAGE_PATH of env.
+
+    @param env: override os.environ dictionary
+    @type  env: dict
+    @rtype: L{PackageIndex}
+    """
+    if env is None:
+        env = os.environ
+    return get_index(rospkg.get_ros_paths(env), env=env)
+
+def clear():
+    """
+    Clear in-process indices. On-disk indices are unaffected and will
+    be revalidated on next use.
+    """
+    _indices.clear()
@@ -42,17 +42,17 @@ experimental and incomplete. In particular, the L{ROSPackages} class
 in very experimental.
 """
 
+import itertools
 import os
 import sys
 import stat
 import string
 
-from subprocess import Popen, PIPE
-
 import rospkg
 
 import roslib.manifest
 import roslib.os_detect
+import roslib.package_index
 
 SRC_DIR = 'src'
 
@@ -116,15 +116,32 @@ def get_dir_pkg(d):
         return d, pkg
     return None, None
 
-_pkg_dir_cache = {}
+def _get_package_index(ros_root=None, ros_package_path=None, env=None):
+    """
+    @param ros_root: if specified, override ROS_ROOT
+    @type  ros_root: str
+    @param ros_package_path: if specified, override ROS_PACKAGE_PATH
+    @type  ros_package_path: str
+    @param env: override os.environ dictionary
+    @type  env: dict
+    @return: validated package index for the ROS environment
+    @rtype: L{roslib.package_index.PackageIndex}
+    """
+    if env is None:
+        env = os.environ
+    if ros_root is not None or ros_package_path is not None:
+        env = env.copy()
+        if ros_root is not None:
+            env[ROS_ROOT] = ros_root
+        if ros_package_path is not None:
+            env[ROS_PACKAGE_PATH] = ros_package_path
+    return roslib.package_index.get_ros_index(env)
 
 def get_pkg_dir(package, required=True, ros_root=None, ros_package_path=None):
     """
-    Locate directory package is stored in. This routine uses an
-    internal cache.
-
-    NOTE: cache does *not* rebuild if packages are relocated after
-    this process is initiated.
+    Locate directory package is stored in. This routine uses a
+    persistent package index (see L{roslib.package_index}), which is
+    revalidated against the filesystem if package cannot be found.
     
     @param package: package name
     @type  package: str
@@ -139,68 +156,20 @@ def get_pkg_dir(package, required=True, ros_root=None, ros_package_path=None):
     @rtype: str
     @raise InvalidROSPkgException: if required is True and package cannot be located
     """    
-
-    #UNIXONLY
-    #TODO: replace with non-rospack-based solution (e.g. os.walk())
     try:
-        penv = os.environ.copy()
         if ros_root:
             ros_root = rospkg.environment._resolve_path(ros_root)
-            penv[ROS_ROOT] = ros_root
         elif ROS_ROOT in os.environ:
-            # record setting for _pkg_dir_cache
             ros_root = os.environ[ROS_ROOT]
-        if ros_root:
-            rospack = os.path.join(ros_root, 'bin', 'rospack')
-        else:
-            rospack = 'rospack'
-
-        if 'ROS_BUILD' in os.environ:
-            rospack = os.path.join(os.environ['ROS_BUILD'], 'bin', 'rospack')
-
         if ros_package_path is not None:
             ros_package_path = rospkg.environment._resolve_paths(ros_package_path)
-            penv[ROS_PACKAGE_PATH] = ros_package_path
         elif ROS_PACKAGE_PATH in os.environ:
-            # record setting for _pkg_dir_cache
             ros_package_path = os.environ[ROS_PACKAGE_PATH]
 
-        # update cache if we haven't. NOTE: we only get one cache
-        if not _pkg_dir_cache:
-            _read_rospack_cache(_pkg_dir_cache, ros_root, ros_package_path)
-            
-        # now that we've resolved the args, check the cache
-        if package in _pkg_dir_cache:
-            dir_, rr, rpp = _pkg_dir_cache[package]
-            if rr == ros_root and rpp == ros_package_path:
-                if os.path.isfile(os.path.join(dir_, MANIFEST_FILE)):
-                    return dir_
-                else:
-                    # invalidate cache
-                    _invalidate_cache(_pkg_dir_cache)
-            
-        rpout, rperr = Popen([rospack, 'find', package], \
-                                 stdout=PIPE, stderr=PIPE, env=penv).communicate()
-
-        pkg_dir = (rpout or '').strip()
-        #python3.1 popen returns as bytes
-        if (isinstance(pkg_dir, bytes)):
-            pkg_dir = pkg_dir.decode()
+        pkg_dir = _get_package_index(ros_root, ros_package_path).get_pkg_dir(package)
         if not pkg_dir:
-            raise InvalidROSPkgException("Cannot locate installation of package %s: %s. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, rperr.strip(), ros_root, ros_package_path))
-
-        if not os.path.exists(pkg_dir):
-            raise InvalidROSPkgException("Cannot locate installation of package %s: [%s] is not a valid path. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, pkg_dir, ros_root, ros_package_path))
-        elif not os.path.isdir(pkg_dir):
-            raise InvalidROSPkgException("Package %s is invalid: file [%s] is in the way"%(package, pkg_dir))
-        # don't update cache: this should only be updated from
-        # rospack_cache as it will corrupt package list otherwise.
-        #_pkg_dir_cache[package] = (pkg_dir, ros_root, ros_package_path)
+            raise InvalidROSPkgException("Cannot locate installation of package %s. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, ros_root, ros_package_path))
         return pkg_dir
-    except OSError as e:
-        if required:
-            raise InvalidROSPkgException("Environment configuration is invalid: cannot locate rospack (%s)"%e)
-        return None
     except Exception as e:
         if required:
             raise
@@ -285,72 +254,15 @@ def resource_file(package, subdir, resource_name):
         raise InvalidROSPkgException(package)
     return os.path.join(d, resource_name)
 
-def _update_rospack_cache(env=None):
-    """
-    Internal routine to update global package directory cache
-    
-    @return: True if cache is valid
-    @rtype: bool
-    """
-    if env is None:
-        env = os.environ
-    cache = _pkg_dir_cache
-    if cache:
-        return True
-    ros_root = env[ROS_ROOT]
-    ros_package_path = env.get(ROS_PACKAGE_PATH, '')
-    return _read_rospack_cache(cache, ros_root, ros_package_path)
-
-def _invalidate_cache(cache):
-    # I've only made this a separate routine because roslib.packages should really be using
-    # the roslib.stacks cache implementation instead with the separate cache marker
-    cache.clear()
-
-def _read_rospack_cache(cache, ros_root, ros_package_path):
-    """
-    Read in rospack_cache data into cache. On-disk cache specifies a
-    ROS_ROOT and ROS_PACKAGE_PATH, which must match the requested
-    environment.
-    
-    @param cache: empty dictionary to store package list in. 
-        If no cache argument provided, will use internal _pkg_dir_cache
-        and will return cached answers if available.
-        The format of the cache is {package_name: dir_path, ros_root, ros_package_path}.
-    @type  cache: {str: str, str, str}
-    @param ros_package_path: ROS_ROOT value
-    @type  ros_root: str
-    @param ros_package_path: ROS_PACKAGE_PATH value or '' if not specified
-    @type  ros_package_path: str
-    @return: True if on-disk cache matches and was loaded, false otherwise
-    @rtype: bool
-    """
-    try:
-        with open(os.path.join(rospkg.get_ros_home(), 'rospack_cache')) as f:
-            for l in f.readlines():
-                l = l[:-1]
-                if not len(l):
-                    continue
-                if l[0] == '#':
-                    # check that the cache matches our env
-                    if l.startswith('#ROS_ROOT='):
-                        if not l[len('#ROS_ROOT='):] == ros_root:
-                            return False
-                    elif l.startswith('#ROS_PACKAGE_PATH='):
-                        if not l[len('#ROS_PACKAGE_PATH='):] == ros_package_path:
-                            return False
-                else:
-                    cache[os.path.basename(l)] = l, ros_root, ros_package_path
-        return True
-    except:
-        pass
-    
 def list_pkgs_by_path(path, packages=None, cache=None, env=None):
     """
     List ROS packages within the specified path.
 
     Optionally, a cache dictionary can be provided, which will be
     updated with the package->path mappings. list_pkgs_by_path() does
-    NOT returned cached results -- it only updates the cache.
+    NOT returned cached results -- it only updates the cache. The
+    listing itself is served from a package index for path that is
+    revalidated against the filesystem on each call.
     
     @param path: path to list packages in
     @type  path: str
@@ -370,32 +282,12 @@ def list_pkgs_by_path(path, packages=None, cache=None, env=None):
     ros_root = env[ROS_ROOT]
     ros_package_path = env.get(ROS_PACKAGE_PATH, '')
 
-    path = os.path.abspath(path)
-    for d, dirs, files in os.walk(path, topdown=True):
-        if MANIFEST_FILE in files:
-            package = os.path.basename(d)
-            if package not in packages:
-                packages.append(package)
-                if cache is not None:
-                    cache[package] = d, ros_root, ros_package_path
-            del dirs[:]
-            continue #leaf
-        elif 'rospack_nosubdirs' in files:
-            del dirs[:]
-            continue #leaf
-        #small optimization
-        elif '.svn' in dirs:
-            dirs.remove('.svn')
-        elif '.git' in dirs:
-            dirs.remove('.git')
-
-        for sub_d in dirs:
-            # followlinks=True only available in Python 2.6, so we
-            # have to implement manually
-            sub_p = os.path.join(d, sub_d)
-            if os.path.islink(sub_p):
-                packages.extend(list_pkgs_by_path(sub_p, cache=cache))
-            
+    index = roslib.package_index.get_index([os.path.abspath(path)], env=env, refresh=True)
+    for package in index.list_packages():
+        if package not in packages:
+            packages.append(package)
+            if cache is not None:
+                cache[package] = index.packages[package][0], ros_root, ros_package_path
     return packages
 
 def find_node(pkg, node_type, ros_root=None, ros_package_path=None):
@@ -509,7 +401,6 @@ def rosdeps_of(packages):
     """
     if not type(packages) in [list, tuple]:
         raise TypeError("packages must be list or tuple")
-    _update_rospack_cache()
     from roslib.manifest import load_manifest
     manifests = [load_manifest(p) for p in packages]
     map = {}
@@ -517,11 +408,19 @@ def rosdeps_of(packages):
         map[pkg] = [d.name for d in m.rosdeps]
     return map
 
-def _safe_load_manifest(p):
+def _safe_load_manifest(p, index=None):
     """
-    Calls roslib.manifest.load_manifest and returns None if the calls raises an Exception (i.e. invalid package)
+    Calls roslib.manifest.load_manifest and returns an empty Manifest if the calls raises an Exception (i.e. invalid package)
+    @param index: (optional) package index to locate p with. If
+      specified, the manifest is parsed lazily.
+    @type  index: L{roslib.package_index.PackageIndex}
     """
     try:
+        if index is not None:
+            d = index.get_pkg_dir(p)
+            if d is None:
+                raise InvalidROSPkgException(p)
+            return roslib.manifest.parse_file(os.path.join(d, MANIFEST_FILE), lazy=True)
         return roslib.manifest.load_manifest(p)
     except:
         return roslib.manifest.Manifest()
@@ -546,8 +445,19 @@ class ROSPackages(object):
     
     def __init__(self):
         self.manifests = {}
-        self._depends_cache = {}
-        self._rosdeps_cache = {}
+        # dependency graph: integer ids of packages and rosdeps, and
+        # bitsets of the recursive dependencies/rosdeps of each package id
+        self._ids = {}
+        self._names = []
+        self._closures = []
+        self._rosdep_ids = {}
+        self._rosdep_names = []
+        self._rosdep_closures = []
+        self._all_packages = None
+        # reverse-dependency index: {package: [direct dependents]}
+        self._reverse = None
+        self._depends_on_cache = {}
+        self._crawl_order = None
 
     def load_manifests(self, packages):
         """
@@ -564,8 +474,8 @@ class ROSPackages(object):
         # load any manifests that we haven't already
         to_load = [p for p in packages if not p in self.manifests]
         if to_load:
-            _update_rospack_cache()
-            self.manifests.update(dict([(p, _safe_load_manifest(p)) for p in to_load]))
+            index = _get_package_index()
+            self.manifests.update(dict([(p, _safe_load_manifest(p, index)) for p in to_load]))
         
     def depends1(self, packages):
         """
@@ -587,7 +497,9 @@ class ROSPackages(object):
     def depends(self, packages):
         """
         Collect all dependencies of specified packages into a
-        dictionary.
+        dictionary. Dependencies are listed in topological order,
+        i.e. every package is listed after its own dependencies
+        (packages in a dependency cycle are listed in load order).
         
         @param packages: package names
         @type  packages: [str]
@@ -596,47 +508,279 @@ class ROSPackages(object):
         """
 
         self.load_manifests(packages)
+        self._update_graph(packages)
+        ids = self._ids
+        closures = self._closures
+        names = self._names
         map = {}
         for pkg in packages:
-            if pkg in self._depends_cache:
-                map[pkg] = self._depends_cache[pkg]
-            else:
-                # this will cache for future reference
-                map[pkg] = self._depends(pkg)
+            map[pkg] = _decode_bits(closures[ids[pkg]], names)
         return map
 
-    def _depends(self, package):
+    def _update_graph(self, packages):
         """
-        Compute recursive dependencies of a single package and cache
-        the result in self._depends_cache.
+        Add packages and their (recursive) dependencies to the
+        dependency graph and compute their closures.
+
+        Packages are assigned integer ids, and the recursive
+        dependencies and rosdeps of each package are stored as
+        bitsets over those ids. The graph is always closed under
+        dependencies, so packages that are added later cannot be
+        depended on by packages that are already in the graph. This
+        allows the graph to be extended without recomputing existing
+        closures: the strongly connected components of the new
+        packages are found with an iterative version of Tarjan's
+        algorithm, which completes every component after the
+        components it depends on. Ids are assigned in that order, so
+        ids are a topological order of the graph.
+
+        This is an internal routine. It assumes that load_manifests()
+        has already been invoked for packages.
 
-        This is an internal routine. It assumes that
-        load_manifests() has already been invoked for package.
+        @param packages: package names
+        @type  packages: [str]
+        """
+        ids = self._ids
+        new = [p for p in packages if not p in ids]
+        if not new:
+            return
+        manifests = self.manifests
+        # load everything that the new packages depend on
+        seen = set(new)
+        to_load = new
+        while to_load:
+            self.load_manifests(to_load)
+            next_load = []
+            for p in to_load:
+                for d in manifests[p].depends:
+                    d = d.package
+                    if not d in ids and not d in seen:
+                        seen.add(d)
+                        next_load.append(d)
+            to_load = next_load
+
+        names = self._names
+        closures = self._closures
+        rosdep_ids = self._rosdep_ids
+        rosdep_names = self._rosdep_names
+        rosdep_closures = self._rosdep_closures
         
+        index = {}
+        lowlink = {}
+        on_stack = set()
+        scc_stack = []
+        counter = 0
+        for root in new:
+            if root in ids or root in index:
+                continue
+            index[root] = lowlink[root] = counter
+            counter += 1
+            scc_stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter([d.package for d in manifests[root].depends]))]
+            while work:
+                p, it = work[-1]
+                recurse = False
+                for d in it:
+                    if d in ids:
+                        continue #closure already computed
+                    if not d in index:
+                        index[d] = lowlink[d] = counter
+                        counter += 1
+                        scc_stack.append(d)
+                        on_stack.add(d)
+                        work.append((d, iter([x.package for x in manifests[d].depends])))
+                        recurse = True
+                        break
+                    elif d in on_stack and index[d] < lowlink[p]:
+                        lowlink[p] = index[d]
+                if recurse:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if lowlink[p] < lowlink[parent]:
+                        lowlink[parent] = lowlink[p]
+                if lowlink[p] != index[p]:
+                    continue
+                # p is the root of a strongly connected component
+                members = []
+                while True:
+                    m = scc_stack.pop()
+                    on_stack.discard(m)
+                    members.append(m)
+                    if m == p:
+                        break
+                members.reverse()
+                member_bits = 0
+                for m in members:
+                    ids[m] = len(names)
+                    member_bits |= 1 << len(names)
+                    names.append(m)
+                deps_bits = 0
+                rosdep_bits = 0
+                for m in members:
+                    for d in manifests[m].depends:
+                        d_id = ids[d.package]
+                        if member_bits & (1 << d_id):
+                            continue #same component
+                        deps_bits |= (1 << d_id) | closures[d_id]
+                        rosdep_bits |= rosdep_closures[d_id]
+                    for r in manifests[m].rosdeps:
+                        r_id = rosdep_ids.get(r.name, None)
+                        if r_id is None:
+                            r_id = rosdep_ids[r.name] = len(rosdep_names)
+                            rosdep_names.append(r.name)
+                        rosdep_bits |= 1 << r_id
+                # members of a cycle depend on each other, but a
+                # package is not its own dependency
+                if len(members) > 1:
+                    deps_bits |= member_bits
+                for m in members:
+                    m_bit = 1 << ids[m]
+                    closures.append(deps_bits & ~m_bit)
+                    rosdep_closures.append(rosdep_bits)
+
+    def depends_on1(self, packages):
+        """
+        Collect all packages that directly depend on the specified
+        packages into a dictionary. All packages in the ROS
+        environment are loaded on first use.
+
+        @param packages: package names
+        @type  packages: [str]
+        @return: dictionary mapping package names to list of names of
+          packages that directly depend on them, in crawl order.
+        @rtype: {str: [str]}
+        """
+        reverse = self._reverse_index()
+        map = {}
+        for pkg in packages:
+            map[pkg] = list(reverse.get(pkg, ()))
+        return map
+
+    def depends_on(self, packages):
+        """
+        Collect all packages that depend, directly or indirectly, on
+        the specified packages into a dictionary. All packages in the
+        ROS environment are loaded on first use, and transitive
+        results are cached, so that querying many packages in one
+        call is cheap.
+
+        @param packages: package names
+        @type  packages: [str]
+        @return: dictionary mapping package names to list of names of
+          packages that depend on them, in crawl order.
+        @rtype: {str: [str]}
+        """
+        self._reverse_index()
+        order = self._crawl_order
+        map = {}
+        for pkg in packages:
+            map[pkg] = sorted(self._depends_on(pkg), key=order.__getitem__)
+        return map
+
+    def _depends_on(self, package):
+        """
+        Compute the packages that recursively depend on a single
+        package, caching the result in self._depends_on_cache.
+
+        This is an internal routine. It assumes that _reverse_index()
+        has already been invoked.
+
         @param package: package name
         @type  package: str
-        @return: list of rosdeps
-        @rtype: [str]
+        @return: names of dependent packages
+        @rtype: set
         """
+        cache = self._depends_on_cache
+        if package in cache:
+            return cache[package]
+        # walk the reverse dependencies iteratively. Closures are only
+        # cached once complete, so a cached closure can be used in
+        # place of walking the dependents of a package.
+        reverse = self._reverse
+        s = set()
+        stack = [package]
+        while stack:
+            for p in reverse.get(stack.pop(), ()):
+                if p in s:
+                    continue
+                s.add(p)
+                if p in cache:
+                    s.update(cache[p])
+                else:
+                    stack.append(p)
+        cache[package] = s
+        return s
 
-        if package in self._depends_cache:
-            return self._depends_cache[package]
+    def _reverse_index(self):
+        """
+        Build the reverse-dependency index, which maps each package
+        to the packages that directly depend on it, from the manifests
+        of all packages in the ROS environment.
+        @return: reverse-dependency index
+        @rtype: {str: [str]}
+        """
+        if self._reverse is None:
+            all_packages = self._load_all()
+            manifests = self.manifests
+            reverse = {}
+            for p in all_packages:
+                for d in manifests[p].depends:
+                    l = reverse.setdefault(d.package, [])
+                    if not p in l:
+                        l.append(p)
+            self._crawl_order = dict([(p, i) for i, p in enumerate(all_packages)])
+            self._reverse = reverse
+        return self._reverse
+
+    def plugins(self, packages, attrib, top=None):
+        """
+        Collect the plugins that packages export for the specified
+        packages, i.e. the values of 'attrib' on export tags named
+        after the package, like 'rospack plugins'. The package itself
+        and packages that directly depend on it are searched.
 
-        # assign key before recursive call to prevent infinite case
-        self._depends_cache[package] = s = set()
-        
-        manifests = self.manifests
-        # take the union of all dependencies
-        pkgs = [p.package for p in manifests[package].depends]
-        self.load_manifests(pkgs)
-        for p in pkgs:
-            s.update(self._depends(p))
-        # add in our own deps
-        s.update(pkgs)
-        # cache the return value as a list
-        s = list(s)
-        self._depends_cache[package] = s
-        return s
+        @param packages: package names
+        @type  packages: [str]
+        @param attrib: name of export attribute
+        @type  attrib: str
+        @param top: (optional) restrict search to package top and its dependencies
+        @type  top: str
+        @return: dictionary mapping package names to list of (package, value) tuples.
+        @rtype: {str: [(str, str)]}
+        """
+        depends_on1 = self.depends_on1(packages)
+        if top is not None:
+            self.load_manifests([top])
+            allowed = set(self.depends([top])[top] + [top])
+        index = _get_package_index()
+        map = {}
+        for pkg in packages:
+            map[pkg] = plugins = []
+            for p in depends_on1[pkg] + [pkg]:
+                if top is not None and not p in allowed:
+                    continue
+                try:
+                    value = _export_flags(self.manifests[p], pkg, attrib, index.get_pkg_dir(p))
+                except roslib.manifest.ManifestException:
+                    continue #invalid manifest, like rospack
+                if value:
+                    plugins.append((p, value))
+        return map
+
+    def _load_all(self):
+        """
+        Load manifests for all packages in the ROS environment.
+        @return: names of all packages, in crawl order
+        @rtype: [str]
+        """
+        if self._all_packages is None:
+            packages = _get_package_index().list_packages()
+            self.load_manifests(packages)
+            self._all_packages = packages
+        return self._all_packages
     
     def rosdeps0(self, packages):
         """
@@ -666,47 +810,94 @@ class ROSPackages(object):
         """
 
         self.load_manifests(packages)
+        self._update_graph(packages)
+        ids = self._ids
+        closures = self._rosdep_closures
+        names = self._rosdep_names
         map = {}
         for pkg in packages:
-            if pkg in self._rosdeps_cache:
-                map[pkg] = self._rosdeps_cache[pkg]
-            else:
-                # this will cache for future reference
-                map[pkg] = self._rosdeps(pkg)
+            map[pkg] = _decode_bits(closures[ids[pkg]], names)
         return map
-
-    def _rosdeps(self, package):
-        """
-        Compute recursive rosdeps of a single package and cache the
-        result in self._rosdeps_cache.
-
-        This is an internal routine. It assumes that
-        load_manifests() has already been invoked for package.
         
-        @param package: package name
-        @type  package: str
-        @return: list of rosdeps
-        @rtype: [str]
-        """
+if sys.hexversion > 0x03000000: #Python3
+    _BITS_TABLE = str.maketrans('01', '\x00\x01')
+else:
+    _BITS_TABLE = string.maketrans('01', '\x00\x01')
+
+def _decode_bits(bits, names):
+    """
+    @param bits: bitset of ids
+    @type  bits: int
+    @param names: names indexed by id
+    @type  names: [str]
+    @return: names of the ids in bits, in id order
+    @rtype: [str]
+    """
+    # lowest bit first, as a byte per bit
+    s = bin(bits)[:1:-1].translate(_BITS_TABLE)
+    if not isinstance(s, bytes):
+        s = s.encode('latin-1')
+    return list(itertools.compress(names, bytearray(s)))
 
-        if package in self._rosdeps_cache:
-            return self._rosdeps_cache[package]
-        # set the key before recursive call to prevent infinite case
-        self._rosdeps_cache[package] = s = set()
+def _get_ros_os():
+    """
+    @return: OS name that rospack uses to select os-specific export tags
+    @rtype: str
+    """
+    if sys.platform == 'darwin':
+        return 'osx'
+    elif sys.platform == 'win32':
+        return 'win32'
+    return 'linux'
+
+def _export_flags(m, tag, attrib, pkg_dir):
+    """
+    Compute the value of an export attribute like rospack does: an
+    export tag for the current OS takes precedence, ${prefix} is
+    replaced with the package directory and shell expressions are
+    expanded.
+
+    @param m: package manifest
+    @type  m: L{roslib.manifest.Manifest}
+    @param tag: name of export tag
+    @type  tag: str
+    @param attrib: name of export attribute
+    @type  attrib: str
+    @param pkg_dir: directory of package
+    @type  pkg_dir: str
+    @return: value of export attribute, or '' if not exported
+    @rtype: str
+    @raise ROSPkgException: if shell expansion fails
+    """
+    best = None
+    ros_os = _get_ros_os()
+    for e in m.exports:
+        if e.tag != tag:
+            continue
+        e_os = e.get('os')
+        if e_os == ros_os:
+            best = e
+            break
+        if best is None:
+            best = e
+    value = best is not None and best.get(attrib) or ''
+    if not value:
+        return ''
+    value = value.replace('${prefix}', pkg_dir or '')
+    if '`' in value or '$' in value:
+        # rospack evaluates the value with the shell
+        import subprocess
+        cmd = 'ret="%s" && echo $ret'%value.replace('\n', ' ')
+        p = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE)
+        output = p.communicate()[0]
+        if p.returncode != 0:
+            raise ROSPkgException("error in backquote expansion for %s"%tag)
+        if not isinstance(output, str):
+            output = output.decode()
+        return output.strip()
+    # the shell would collapse whitespace
+    return ' '.join(value.split())
 
-        manifests = self.manifests
-        # take the union of all dependencies
-        pkgs = [p.package for p in manifests[package].depends]
-        self.load_manifests(pkgs)
-        for p in pkgs:
-            s.update(self._rosdeps(p))
-        # add in our own deps
-        s.update([d.name for d in manifests[package].rosdeps])
-        # cache the return value as a list
-        s = list(s)
-        self._rosdeps_cache[package] = s
-        return s
-        
 def _platform_supported(file, os, version):
     m = roslib.manifest.parse_file(file)
     for p in m.platforms:
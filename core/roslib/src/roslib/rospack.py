@@ -35,12 +35,21 @@
 
 """
 Wrappers for calling an processing return values from rospack and rosstack
+
+The dependency queries (deps, deps1, depends-on, depends-on1, plugins
+and their rosstack equivalents) are answered in-process from parsed
+manifests (see L{roslib.packages.ROSPackages} and
+L{roslib.stacks.ROSStacks}) instead of executing rospack and rosstack.
+Results are cached for the lifetime of the process per ROS_ROOT and
+ROS_PACKAGE_PATH.
 """
 
 import os
 import sys
 import subprocess
 import roslib.exceptions
+import roslib.packages
+import roslib.stacks
 import rospkg
 
 if sys.hexversion > 0x03000000: #Python3
@@ -67,6 +76,66 @@ def rospackexec(args):
         raise roslib.exceptions.ROSLibException(val)
     return val
 
+_ros_paths = None
+_rospack = None
+_rosstack = None
+
+def _init_rospack():
+    """
+    (Re)initialize the in-process dependency engines if the ROS
+    environment has changed.
+    """
+    global _ros_paths, _rospack, _rosstack
+    ros_paths = rospkg.get_ros_paths(os.environ)
+    if ros_paths != _ros_paths:
+        _ros_paths = ros_paths
+        _rospack = roslib.packages.ROSPackages()
+        _rosstack = roslib.stacks.ROSStacks()
+
+def _require_packages(rp, packages):
+    """
+    Check that packages and their direct dependencies exist, like rospack does.
+    @param rp: dependency engine
+    @type  rp: L{roslib.packages.ROSPackages}
+    @raise roslib.exceptions.ROSLibException: if a package or dependency cannot be located
+    """
+    index = roslib.packages._get_package_index()
+    rp.load_manifests(packages)
+    for p in packages:
+        if index.get_pkg_dir(p) is None:
+            raise roslib.exceptions.ROSLibException("rospack: couldn't find package [%s]"%p)
+        for d in rp.manifests[p].depends:
+            if index.get_pkg_dir(d.package) is None:
+                raise roslib.exceptions.ROSLibException("rospack: couldn't find dependency [%s] of [%s]"%(d.package, p))
+
+def _postorder(rp, pkg):
+    """
+    List the dependencies of pkg in the order used by 'rospack deps',
+    which is a postorder traversal of the dependency tree in manifest
+    order.
+    
+    @param rp: dependency engine. Manifests of pkg and its dependencies must be loaded.
+    @type  rp: L{roslib.packages.ROSPackages}
+    @rtype: [str]
+    """
+    manifests = rp.manifests
+    order = []
+    visited = set([pkg])
+    work = [(pkg, iter(manifests[pkg].depends))]
+    while work:
+        p, it = work[-1]
+        for d in it:
+            d = d.package
+            if not d in visited:
+                visited.add(d)
+                work.append((d, iter(manifests[d].depends)))
+                break
+        else:
+            work.pop()
+            if work:
+                order.append(p)
+    return order
+
 def rospack_depends_on_1(pkg):
     """
     @param pkg: package name
@@ -74,7 +143,8 @@ def rospack_depends_on_1(pkg):
     @return: A list of the names of the packages which depend directly on pkg
     @rtype: list
     """
-    return rospackexec(['depends-on1', pkg]).split()
+    _init_rospack()
+    return _rospack.depends_on1([pkg])[pkg]
 
 def rospack_depends_on(pkg):
     """
@@ -83,7 +153,8 @@ def rospack_depends_on(pkg):
     @return: A list of the names of the packages which depend on pkg
     @rtype: list
     """
-    return rospackexec(['depends-on', pkg]).split()
+    _init_rospack()
+    return _rospack.depends_on([pkg])[pkg]
 
 def rospack_depends_1(pkg):
     """
@@ -91,8 +162,11 @@ def rospack_depends_1(pkg):
     @type  pkg: str
     @return: A list of the names of the packages which pkg directly depends on
     @rtype: list    
+    @raise roslib.exceptions.ROSLibException: if pkg or one of its dependencies cannot be located
     """
-    return rospackexec(['deps1', pkg]).split()
+    _init_rospack()
+    _require_packages(_rospack, [pkg])
+    return _rospack.depends1([pkg])[pkg]
 
 def rospack_depends(pkg):
     """
@@ -100,8 +174,12 @@ def rospack_depends(pkg):
     @type  pkg: str
     @return: A list of the names of the packages which pkg depends on
     @rtype: list    
+    @raise roslib.exceptions.ROSLibException: if pkg or one of its dependencies cannot be located
     """
-    return rospackexec(['deps', pkg]).split()
+    _init_rospack()
+    deps = _rospack.depends([pkg])[pkg]
+    _require_packages(_rospack, [pkg] + deps)
+    return _postorder(_rospack, pkg)
 
 def rospack_plugins(pkg):
     """
@@ -110,11 +188,11 @@ def rospack_plugins(pkg):
     @return: A list of the names of the packages which provide a plugin for pkg
     @rtype: list    
     """
-    val = rospackexec(['plugins', '--attrib=plugin', pkg])
-    if val:
-      return [tuple(x.split(' ')) for x in val.split('\n')]
-    else:
-      return []
+    _init_rospack()
+    try:
+        return _rospack.plugins([pkg], 'plugin')[pkg]
+    except roslib.packages.ROSPkgException as e:
+        raise roslib.exceptions.ROSLibException(str(e))
 
 def rosstackexec(args):
     """
@@ -132,6 +210,22 @@ def rosstackexec(args):
         raise roslib.exceptions.ROSLibException(val)
     return val
 
+def _require_stacks(rs, stacks):
+    """
+    Check that stacks and their direct dependencies exist, like rosstack does.
+    @param rs: dependency engine
+    @type  rs: L{roslib.stacks.ROSStacks}
+    @raise roslib.exceptions.ROSLibException: if a stack or dependency cannot be located
+    """
+    index = roslib.packages._get_package_index()
+    rs.load_manifests(stacks)
+    for s in stacks:
+        if index.get_stack_dir(s) is None:
+            raise roslib.exceptions.ROSLibException("rosstack: couldn't find stack [%s]"%s)
+        for d in rs.manifests[s].depends:
+            if index.get_stack_dir(d.stack) is None:
+                raise roslib.exceptions.ROSLibException("rosstack: couldn't find dependency [%s] of [%s]"%(d.stack, s))
+
 def rosstack_depends_on(s):
     """
     @param s: stack name
@@ -139,7 +233,8 @@ def rosstack_depends_on(s):
     @return: A list of the names of the stacks which depend on s
     @rtype: list
     """
-    return rosstackexec(['depends-on', s]).split()
+    _init_rospack()
+    return _rosstack.depends_on([s])[s]
 
 def rosstack_depends_on_1(s):
     """
@@ -148,7 +243,8 @@ def rosstack_depends_on_1(s):
     @return: A list of the names of the stacks which depend directly on s
     @rtype: list
     """
-    return rosstackexec(['depends-on1', s]).split()
+    _init_rospack()
+    return _rosstack.depends_on1([s])[s]
 
 def rosstack_depends(s):
     """
@@ -156,8 +252,12 @@ def rosstack_depends(s):
     @type  s: str
     @return: A list of the names of the stacks which s depends on 
     @rtype: list
+    @raise roslib.exceptions.ROSLibException: if s or one of its dependencies cannot be located
     """
-    return rosstackexec(['depends', s]).split()
+    _init_rospack()
+    deps = _rosstack.depends([s])[s]
+    _require_stacks(_rosstack, [s] + deps)
+    return deps[:]
 
 def rosstack_depends_1(s):
     """
@@ -165,5 +265,8 @@ def rosstack_depends_1(s):
     @type  s: str
     @return: A list of the names of the stacks which s depends on directly
     @rtype: list
+    @raise roslib.exceptions.ROSLibException: if s or one of its dependencies cannot be located
     """
-    return rosstackexec(['depends1', s]).split()
+    _init_rospack()
+    _require_stacks(_rosstack, [s])
+    return _rosstack.depends1([s])[s]
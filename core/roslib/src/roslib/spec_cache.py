@@ -0,0 +1,213 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# Revision $Id$
+
+"""
+Cache of parsed .msg and .srv files that is shared between processes.
+
+Parsed specs are stored in compact form, with one cache file in
+ROS_HOME per msg/srv directory. Entries are keyed by the absolute
+path of the spec file and the package context it was loaded with, and
+are valid as long as the file's modification time and size are
+unchanged. Setting the ROS_SPEC_CACHE environment variable to '0'
+disables the cache.
+
+New entries are written back to the cache files when the process
+exits (or when L{save()} is called), merged with the entries that
+other processes have written in the meantime.
+
+This is an internal library. See L{roslib.msgs.load_from_file()} and
+L{roslib.srvs.load_from_file()}.
+"""
+
+import atexit
+import os
+import time
+
+import roslib.diskcache
+
+## environment variable that configures the cache
+ROS_SPEC_CACHE = 'ROS_SPEC_CACHE'
+
+## name of cache in ROS_HOME
+CACHE_NAME = 'specs'
+## increment when the encoding of entries changes
+CACHE_VERSION = 1
+
+# files modified less than this many seconds ago are not cached, as a
+# further change within the same mtime tick would go unnoticed.
+_RACY_WINDOW = 2.0
+
+class SpecCache(object):
+    """
+    Cache of the parsed specs of one msg/srv directory that is backed
+    by a cache file.
+    """
+
+    def __init__(self, cache_file):
+        """
+        @param cache_file: path of cache file, or None for an in-process cache
+        @type  cache_file: str
+        """
+        self.cache_file = cache_file
+        # {(filename, package_context): (mtime, size, encoded spec)}
+        self.entries = None
+        self._new = {}
+
+    def _load(self):
+        data = None
+        if self.cache_file:
+            data = roslib.diskcache.load(self.cache_file)
+        if type(data) == dict and data.get('version') == CACHE_VERSION:
+            self.entries = data['entries']
+        else:
+            self.entries = {}
+
+    def lookup(self, key, st):
+        """
+        @param key: (filename, package_context)
+        @type  key: (str, str)
+        @param st: stat of the spec file
+        @return: encoded spec or None
+        """
+        if self.entries is None:
+            self._load()
+        entry = self.entries.get(key, None)
+        if entry is not None and entry[0] == st.st_mtime and entry[1] == st.st_size:
+            return entry[2]
+        return None
+
+    def store(self, key, st, value):
+        """
+        @param key: (filename, package_context)
+        @type  key: (str, str)
+        @param st: stat of the spec file, before it was read
+        @param value: encoded spec
+        """
+        if time.time() - st.st_mtime > _RACY_WINDOW:
+            self.entries[key] = self._new[key] = (st.st_mtime, st.st_size, value)
+
+    def save(self):
+        """
+        Merge new entries into the cache file, dropping the entries of
+        files that have changed or been removed.
+        @return: True if the cache file was written
+        @rtype: bool
+        """
+        if not self._new or not self.cache_file:
+            return False
+        data = roslib.diskcache.load(self.cache_file)
+        if type(data) == dict and data.get('version') == CACHE_VERSION:
+            entries = data['entries']
+        else:
+            entries = {}
+        entries.update(self._new)
+        valid = {}
+        stats = {}
+        for key, entry in entries.items():
+            filename = key[0]
+            if filename not in stats:
+                try:
+                    st = os.stat(filename)
+                    stats[filename] = (st.st_mtime, st.st_size)
+                except OSError:
+                    stats[filename] = None
+            if stats[filename] == entry[:2]:
+                valid[key] = entry
+        written = roslib.diskcache.dump(self.cache_file, {'version': CACHE_VERSION, 'entries': valid})
+        if written:
+            self._new = {}
+        return written
+
+# {(msg/srv directory, ROS_HOME): SpecCache}
+_caches = {}
+
+def _get_cache(directory, env):
+    key = (directory, env.get('ROS_HOME', None), env.get('HOME', None))
+    cache = _caches.get(key, None)
+    if cache is None:
+        try:
+            cache_file = roslib.diskcache.get_cache_file(CACHE_NAME, (CACHE_VERSION, directory), env)
+        except Exception:
+            cache_file = None
+        cache = _caches[key] = SpecCache(cache_file)
+    return cache
+
+def lookup(file_path, package_context, env=None):
+    """
+    Look up the parsed spec of a .msg/.srv file.
+    @param file_path: path of spec file
+    @type  file_path: str
+    @param package_context: package context the spec is loaded with
+    @type  package_context: str
+    @param env: override os.environ dictionary
+    @type  env: dict
+    @return: encoded spec, or None if not cached, and a token to pass
+      to L{store()} or None if the spec cannot be cached.
+    @rtype: (object, object)
+    """
+    if env is None:
+        env = os.environ
+    if env.get(ROS_SPEC_CACHE, '') == '0':
+        return None, None
+    try:
+        path = os.path.abspath(file_path)
+        st = os.stat(path)
+    except (OSError, TypeError, AttributeError):
+        return None, None
+    cache = _get_cache(os.path.dirname(path), env)
+    key = (path, package_context)
+    return cache.lookup(key, st), (cache, key, st)
+
+def store(token, value):
+    """
+    Store the parsed spec of a .msg/.srv file.
+    @param token: token returned by L{lookup()}
+    @param value: encoded spec. Must be picklable.
+    """
+    if token is not None:
+        cache, key, st = token
+        cache.store(key, st, value)
+
+def save():
+    """
+    Write new entries of the spec caches to disk. This is invoked
+    automatically when the process exits.
+    """
+    for cache in list(_caches.values()):
+        try:
+            cache.save()
+        except Exception:
+            pass #cache is an optimization only
+
+atexit.register(save)
@@ -46,10 +46,12 @@ try:
 except ImportError:
     from io import StringIO # Python 3.x
 
+import roslib.instrument
 import roslib.msgs
 import roslib.names
 import roslib.packages
 import roslib.resources
+import roslib.spec_cache
 
 # don't directly use code from this, though we do depend on the
 # manifest.Depend data type
@@ -185,6 +187,7 @@ def load_from_string(text, package_context='', full_name='', short_name=''):
     msg_out = roslib.msgs.load_from_string(text_out.getvalue(), package_context, '%sResponse'%(full_name), '%sResponse'%(short_name))
     return SrvSpec(msg_in, msg_out, text, full_name, short_name, package_context)
 
+@roslib.instrument.phase('msg_load')
 def load_from_file(file_name, package_context=''):
     """
     Convert the .srv representation in the file to a SrvSpec instance.
@@ -213,12 +216,20 @@ def load_from_file(file_name, package_context=''):
     if not roslib.names.is_legal_resource_name(type_):
         raise SrvSpecException("%s: %s is not a legal service type name"%(file_name, type_))
     
+    cached, token = roslib.spec_cache.lookup(file_name, package_context)
+    if cached is not None:
+        request, response, text = cached
+        return (type_, SrvSpec(roslib.msgs._decode_spec(request, '%sRequest'%type_, '%sRequest'%base_type_, package_context),
+                               roslib.msgs._decode_spec(response, '%sResponse'%type_, '%sResponse'%base_type_, package_context),
+                               text, type_, base_type_, package_context))
     f = open(file_name, 'r')
     try:
         text = f.read()
-        return (type_, load_from_string(text, package_context, type_, base_type_))
+        spec = load_from_string(text, package_context, type_, base_type_)
     finally:
         f.close()
+    roslib.spec_cache.store(token, (roslib.msgs._encode_spec(spec.request), roslib.msgs._encode_spec(spec.response), spec.text))
+    return (type_, spec)
 
 
 
@@ -44,6 +44,7 @@ import getopt
 
 STACK_FILE = 'stack.xml'
 
+import roslib.manifest_cache
 import roslib.manifestlib
 # re-export symbols so that external code does not have to import manifestlib as well
 from roslib.manifestlib import ManifestException, StackDepend
@@ -95,15 +96,20 @@ def stack_file(stack, required=True):
     d = roslib.stacks.get_stack_dir(stack)
     return _stack_file_by_dir(d, required)
         
-def parse_file(file):
+def parse_file(file, lazy=False):
     """
     Parse stack.xml file
     @param file: stack.xml file path
     @param file: str
+    @param lazy: only parse dependencies until other fields are
+      accessed. See L{roslib.manifestlib.parse()}. Manifests that
+      are served from the manifest cache (see
+      L{roslib.manifest_cache}) are never lazy.
+    @type  lazy: bool
     @return: StackManifest instance
     @rtype:  L{StackManifest}
     """
-    return roslib.manifestlib.parse_file(StackManifest(), file)
+    return roslib.manifest_cache.parse_file(StackManifest(), file, lazy)
 
 def parse(string, filename='string'):
     """
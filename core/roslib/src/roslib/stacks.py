@@ -44,6 +44,7 @@ import os
 import sys
 import re
 
+import roslib.package_index
 import roslib.packages
 import roslib.stack_manifest
 
@@ -126,13 +127,16 @@ def list_stacks(env=None):
     _init_rosstack(env=env)
     return _rosstack.list()
 
-def list_stacks_by_path(path, stacks=None, cache=None):
+def list_stacks_by_path(path, stacks=None, cache=None, env=None):
     """
     List ROS stacks within the specified path.
 
     Optionally, a cache dictionary can be provided, which will be
     updated with the stack->path mappings. list_stacks_by_path() does
-    NOT returned cached results -- it only updates the cache.
+    NOT returned cached results -- it only updates the cache. The
+    listing itself is served from the same package index as
+    L{roslib.packages.list_pkgs_by_path()}, so packages and stacks are
+    found in a single crawl.
     
     @param path: path to list stacks in
     @type  path: str
@@ -141,36 +145,19 @@ def list_stacks_by_path(path, stacks=None, cache=None):
     @type  stacks: [str]
     @param cache: (optional) stack path cache to update. Maps stack name to directory path.
     @type  cache: {str: str}
+    @param env: override environment variables. Used to locate ROS_HOME.
+    @type  env: {str: str}
     @return: complete list of stack names in ROS environment. Same as stacks parameter.
     @rtype: [str]
     """
     if stacks is None:
         stacks = []
-    MANIFEST_FILE = rospkg.MANIFEST_FILE
-    basename = os.path.basename
-    for d, dirs, files in os.walk(path, topdown=True):
-        if STACK_FILE in files:
-            stack = basename(d)
-            if stack not in stacks:
-                stacks.append(stack)
-                if cache is not None:
-                    cache[stack] = d
-            del dirs[:]
-            continue #leaf
-        elif MANIFEST_FILE in files:
-            del dirs[:]
-            continue #leaf     
-        elif 'rospack_nosubdirs' in files:
-            del dirs[:]
-            continue  #leaf
-        # remove hidden dirs (esp. .svn/.git)
-        [dirs.remove(di) for di in dirs if di[0] == '.']
-        for sub_d in dirs:
-            # followlinks=True only available in Python 2.6, so we
-            # have to implement manually
-            sub_p = os.path.join(d, sub_d)
-            if os.path.islink(sub_p):
-                stacks.extend(list_stacks_by_path(sub_p, cache=cache))
+    index = roslib.package_index.get_index([os.path.abspath(path)], env=env, refresh=True)
+    for stack in index.list_stacks():
+        if stack not in stacks:
+            stacks.append(stack)
+            if cache is not None:
+                cache[stack] = index.stacks[stack]
     return stacks
 
 # #2022
@@ -235,3 +222,168 @@ def _get_cmake_version(text):
             if len(lsplit) < 2:
                 raise ReleaseException("couldn't find version number in CMakeLists.txt:\n\n%s"%l)
             return lsplit[1]
+
+def _safe_load_manifest(s, index):
+    """
+    Load the manifest of stack s, or an empty StackManifest if s cannot
+    be located or its manifest is invalid.
+    @param index: package index to locate s with
+    @type  index: L{roslib.package_index.PackageIndex}
+    """
+    try:
+        d = index.get_stack_dir(s)
+        if d is None:
+            raise InvalidROSStackException(s)
+        return roslib.stack_manifest.parse_file(os.path.join(d, STACK_FILE), lazy=True)
+    except:
+        return roslib.stack_manifest.StackManifest()
+
+class ROSStacks(object):
+    """
+    UNSTABLE/EXPERIMENTAL
+
+    Utility class for querying dependencies of multiple ROS stacks,
+    analogous to L{roslib.packages.ROSPackages}. ROSStacks caches the
+    parsed stack manifests, which enables it to have higher
+    performance than shelling out to rosstack.
+
+    Example::
+      rs = ROSStacks()
+      d = rs.depends(['common', 'navigation'])
+      print d['navigation']
+    """
+
+    def __init__(self, env=None):
+        """
+        @param env: override environment variables
+        @type  env: {str: str}
+        """
+        self.env = env
+        self.manifests = {}
+        self._depends_cache = {}
+        self._all_stacks = None
+
+    def _get_index(self):
+        env = self.env
+        if env is None:
+            env = os.environ
+        return roslib.package_index.get_ros_index(env)
+        
+    def load_manifests(self, stacks):
+        """
+        Load manifests for specified stacks into 'manifests' attribute.
+
+        @param stacks: stack names
+        @type  stacks: [str]
+        """
+        if not type(stacks) in [list, tuple]:
+            raise TypeError("stacks must be list or tuple")
+        to_load = [s for s in stacks if not s in self.manifests]
+        if to_load:
+            index = self._get_index()
+            self.manifests.update(dict([(s, _safe_load_manifest(s, index)) for s in to_load]))
+
+    def depends1(self, stacks):
+        """
+        Collect all direct dependencies of specified stacks into a
+        dictionary.
+
+        @param stacks: stack names
+        @type  stacks: [str]
+        @return: dictionary mapping stack names to list of dependent stack names.
+        @rtype: {str: [str]}
+        """
+        self.load_manifests(stacks)
+        map = {}
+        manifests = self.manifests
+        for s in stacks:
+            map[s] = [d.stack for d in manifests[s].depends]
+        return map
+
+    def depends(self, stacks):
+        """
+        Collect all dependencies of specified stacks into a
+        dictionary. Dependencies are listed in postorder, like
+        'rosstack depends'.
+
+        @param stacks: stack names
+        @type  stacks: [str]
+        @return: dictionary mapping stack names to list of dependent stack names.
+        @rtype: {str: [str]}
+        """
+        self.load_manifests(stacks)
+        map = {}
+        for s in stacks:
+            map[s] = self._depends(s)
+        return map
+
+    def _depends(self, stack):
+        """
+        Compute recursive dependencies of a single stack and cache the
+        result in self._depends_cache.
+        """
+        if stack in self._depends_cache:
+            return self._depends_cache[stack]
+        # assign key before recursive call to prevent infinite case
+        self._depends_cache[stack] = []
+        stacks = [d.stack for d in self.manifests[stack].depends]
+        self.load_manifests(stacks)
+        deps = []
+        seen = set()
+        for s in stacks:
+            for d in self._depends(s) + [s]:
+                if not d in seen:
+                    seen.add(d)
+                    deps.append(d)
+        self._depends_cache[stack] = deps
+        return deps
+
+    def depends_on1(self, stacks):
+        """
+        Collect all stacks that directly depend on the specified
+        stacks into a dictionary.
+
+        @param stacks: stack names
+        @type  stacks: [str]
+        @return: dictionary mapping stack names to list of names of
+          stacks that directly depend on them.
+        @rtype: {str: [str]}
+        """
+        all_stacks = self._load_all()
+        map = dict([(s, []) for s in stacks])
+        for s in all_stacks:
+            for d in self.manifests[s].depends:
+                l = map.get(d.stack, None)
+                if l is not None and not s in l:
+                    l.append(s)
+        return map
+
+    def depends_on(self, stacks):
+        """
+        Collect all stacks that depend, directly or indirectly, on
+        the specified stacks into a dictionary.
+
+        @param stacks: stack names
+        @type  stacks: [str]
+        @return: dictionary mapping stack names to list of names of
+          stacks that depend on them.
+        @rtype: {str: [str]}
+        """
+        all_stacks = self._load_all()
+        depends = self.depends(all_stacks)
+        map = {}
+        for stack in stacks:
+            map[stack] = [s for s in all_stacks if stack in depends[s]]
+        return map
+
+    def _load_all(self):
+        """
+        Load manifests for all stacks in the ROS environment.
+        @return: names of all stacks, in crawl order
+        @rtype: [str]
+        """
+        if self._all_stacks is None:
+            stacks = self._get_index().list_stacks()
+            self.load_manifests(stacks)
+            self._all_stacks = stacks
+        return self._all_stacks
@@ -0,0 +1,238 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2011, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# Revision $Id$
+
+"""
+Micro-benchmark for the (de)serialization code generated by
+L{roslib.genpy_electric} for common geometry types.
+
+Generates std_msgs and geometry_msgs packages with the message
+definitions below, generates their Python modules and reports the
+time per serialize() and deserialize() call of each type. With
+--baseline, the modules are also generated with the roslib of another
+revision, e.g. the core/roslib/src directory of an older checkout, and
+both are timed with the roslib runtime of this revision, alternating
+between the two to even out noise.
+
+Usage: genpy_serialization.py [--baseline DIR] [--number N] [--rounds N] [--keep DIR]
+"""
+
+from __future__ import print_function
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from optparse import OptionParser
+
+MANIFEST = '<package><description>%s</description><author>a</author><license>BSD</license>%s</package>\n'
+
+MSGS = [
+    ('std_msgs', [], {
+        'Header': 'uint32 seq\ntime stamp\nstring frame_id\n'}),
+    ('geometry_msgs', ['std_msgs'], {
+        'Point': 'float64 x\nfloat64 y\nfloat64 z\n',
+        'Point32': 'float32 x\nfloat32 y\nfloat32 z\n',
+        'Vector3': 'float64 x\nfloat64 y\nfloat64 z\n',
+        'Quaternion': 'float64 x\nfloat64 y\nfloat64 z\nfloat64 w\n',
+        'Pose': 'Point position\nQuaternion orientation\n',
+        'PoseStamped': 'Header header\nPose pose\n',
+        'PoseArray': 'Header header\nPose[] poses\n',
+        'PoseWithCovariance': 'Pose pose\nfloat64[36] covariance\n',
+        'PoseWithCovarianceStamped': 'Header header\nPoseWithCovariance pose\n',
+        'Twist': 'Vector3 linear\nVector3 angular\n',
+        'TwistWithCovariance': 'Twist twist\nfloat64[36] covariance\n',
+        'Transform': 'Vector3 translation\nQuaternion rotation\n',
+        'TransformStamped': 'Header header\nstring child_frame_id\nTransform transform\n',
+        'Polygon': 'Point32[] points\n',
+        'Odometry': 'Header header\nstring child_frame_id\nPoseWithCovariance pose\nTwistWithCovariance twist\n'}),
+    ]
+
+# (type, number of elements of array field)
+BENCHMARKS = [
+    ('Pose', 0),
+    ('PoseStamped', 0),
+    ('TransformStamped', 0),
+    ('PoseWithCovarianceStamped', 0),
+    ('Odometry', 0),
+    ('PoseArray', 100),
+    ('Polygon', 100),
+    ]
+
+GENERATE = """
+import os, sys
+import roslib.msgs
+from roslib.genpy_electric import msg_generator
+out = sys.argv[1]
+for package in %r:
+    roslib.msgs.load_package_dependencies(package, load_recursive=True)
+    roslib.msgs.load_package(package)
+    d = os.path.join(out, package, 'msg')
+    os.makedirs(d)
+    open(os.path.join(out, package, '__init__.py'), 'w').close()
+    names = sorted(roslib.msgs.list_msg_types(package, False))
+    with open(os.path.join(d, '__init__.py'), 'w') as f:
+        f.write(''.join(['from ._%%s import *\\n'%%n for n in names]))
+    for n in names:
+        _, spec = roslib.msgs.load_by_type('%%s/%%s'%%(package, n))
+        with open(os.path.join(d, '_%%s.py'%%n), 'w') as f:
+            f.write('\\n'.join(msg_generator(package, n, spec)) + '\\n')
+"""
+
+TIME = """
+import json, sys, time
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import BytesIO as StringIO
+import geometry_msgs.msg
+
+def best(fn, number, repeat=5):
+    times = []
+    for r in range(repeat):
+        start = time.time()
+        for i in range(number):
+            fn()
+        times.append((time.time() - start) / number)
+    return min(times)
+
+number = int(sys.argv[1])
+results = {}
+for name, count in %r:
+    cls = getattr(geometry_msgs.msg, name)
+    m = cls()
+    if name == 'PoseArray':
+        m.poses = [geometry_msgs.msg.Pose() for i in range(count)]
+    elif name == 'Polygon':
+        m.points = [geometry_msgs.msg.Point32() for i in range(count)]
+    buff = StringIO()
+    m.serialize(buff)
+    data = buff.getvalue()
+    results[name] = (best(lambda: m.serialize(StringIO()), number),
+                     best(lambda: cls().deserialize(data), number))
+print(json.dumps(results))
+"""
+
+def generate_msgs(root):
+    """
+    Generate the packages of L{MSGS} in root.
+    """
+    for package, depends, msgs in MSGS:
+        d = os.path.join(root, package)
+        os.makedirs(os.path.join(d, 'msg'))
+        with open(os.path.join(d, 'manifest.xml'), 'w') as f:
+            f.write(MANIFEST%(package, ''.join(['<depend package="%s"/>'%p for p in depends])))
+        for name, text in msgs.items():
+            with open(os.path.join(d, 'msg', name + '.msg'), 'w') as f:
+                f.write(text)
+
+def _python_path(*paths):
+    return os.pathsep.join(list(paths) + [p for p in os.environ.get('PYTHONPATH', '').split(os.pathsep) if p])
+
+def _roslib_src():
+    import roslib
+    return os.path.dirname(os.path.dirname(os.path.abspath(roslib.__file__)))
+
+def generate(roslib_src, root, out):
+    """
+    Generate the message modules of root into out with the roslib in
+    roslib_src.
+    """
+    env = dict(os.environ)
+    env['ROS_PACKAGE_PATH'] = root
+    env['ROS_HOME'] = os.path.join(out, 'ros_home')
+    env['PYTHONPATH'] = _python_path(roslib_src)
+    subprocess.check_call([sys.executable, '-c', GENERATE%[p for p, _, _ in MSGS], out], env=env)
+
+def run(out, number, results=None):
+    """
+    Time the message modules in out with the runtime of this revision.
+    @param results: results of previous runs to merge with
+    @type  results: dict
+    @return: best {type: (serialize time, deserialize time)}
+    @rtype: dict
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = _python_path(out, _roslib_src())
+    output = subprocess.check_output([sys.executable, '-c', TIME%BENCHMARKS, str(number)], env=env)
+    times = json.loads(output.decode())
+    if results:
+        for name, (s, d) in results.items():
+            times[name] = (min(s, times[name][0]), min(d, times[name][1]))
+    return times
+
+def main():
+    parser = OptionParser(usage="usage: %prog [--baseline DIR] [--number N] [--rounds N] [--keep DIR]")
+    parser.add_option('--baseline', dest='baseline', default=None,
+                      help="roslib source directory of the revision to compare with")
+    parser.add_option('--number', dest='number', type='int', default=2000,
+                      help="number of calls per measurement")
+    parser.add_option('--rounds', dest='rounds', type='int', default=3,
+                      help="number of timing processes per revision")
+    parser.add_option('--keep', dest='keep', default=None,
+                      help="generate the packages in DIR and keep them")
+    options, args = parser.parse_args()
+
+    root = options.keep or tempfile.mkdtemp()
+    tmp = tempfile.mkdtemp()
+    try:
+        if not os.path.exists(os.path.join(root, 'geometry_msgs')):
+            generate_msgs(root)
+        generate(_roslib_src(), root, os.path.join(tmp, 'current'))
+        if options.baseline:
+            generate(os.path.abspath(options.baseline), root, os.path.join(tmp, 'baseline'))
+        current = baseline = None
+        for i in range(options.rounds):
+            if options.baseline:
+                baseline = run(os.path.join(tmp, 'baseline'), options.number, baseline)
+            current = run(os.path.join(tmp, 'current'), options.number, current)
+        if options.baseline:
+            print('%-28s %23s %23s'%('[us/call]', 'serialize', 'deserialize'))
+            print('%-28s %7s %7s %7s %7s %7s %7s'%('type', 'base', 'new', 'speedup', 'base', 'new', 'speedup'))
+            for name, _ in BENCHMARKS:
+                (bs, bd), (s, d) = baseline[name], current[name]
+                print('%-28s %7.2f %7.2f %6.2fx %7.2f %7.2f %6.2fx'%(name, 1e6 * bs, 1e6 * s, bs / s, 1e6 * bd, 1e6 * d, bd / d))
+        else:
+            print('%-28s %11s %11s'%('[us/call]', 'serialize', 'deserialize'))
+            for name, _ in BENCHMARKS:
+                s, d = current[name]
+                print('%-28s %11.2f %11.2f'%(name, 1e6 * s, 1e6 * d))
+    finally:
+        shutil.rmtree(tmp)
+        if not options.keep:
+            shutil.rmtree(root)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# Revision $Id$
+
+"""
+Memory benchmark for the manifest model of L{roslib.manifestlib}.
+
+Generates a synthetic tree of packages (5000 by default), loads all
+manifests into a L{roslib.packages.ROSPackages} instance, as long
+running tools do, and reports the footprint of the loaded manifests,
+both as parsed for dependency queries and after all fields have been
+accessed.
+
+Usage: manifest_memory.py [--packages N] [--keep DIR]
+"""
+
+from __future__ import print_function
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+MANIFEST = """<package>
+  <description brief="%(name)s">
+    Synthetic package %(name)s, generated by manifest_memory.py. It
+    exists only to measure the memory footprint of parsed manifests.
+  </description>
+  <author>Benchmark Author</author>
+  <license>BSD</license>
+  <review status="unreviewed" notes=""/>
+  <url>http://www.ros.org/wiki/%(name)s</url>
+%(depends)s
+%(rosdeps)s
+  <export>
+    <cpp cflags="-I${prefix}/include" lflags="-L${prefix}/lib -l%(name)s"/>
+    <python path="${prefix}/src"/>
+    <rviz plugin="${prefix}/plugin_description.xml"/>
+  </export>
+</package>
+"""
+
+STACK = """<stack>
+  <description brief="%(name)s">Synthetic stack</description>
+  <author>Benchmark Author</author>
+  <license>BSD</license>
+</stack>
+"""
+
+def generate_tree(root, count, per_stack=100, seed=0):
+    """
+    Generate a tree of count packages in stacks of per_stack
+    packages. Each package depends on up to 5 packages generated
+    before it and has 2 rosdeps.
+    @return: package names
+    @rtype: [str]
+    """
+    rand = random.Random(seed)
+    names = []
+    for i in range(count):
+        name = 'bench_pkg_%05d'%i
+        stack_dir = os.path.join(root, 'bench_stack_%03d'%(i // per_stack))
+        if i % per_stack == 0:
+            os.makedirs(stack_dir)
+            with open(os.path.join(stack_dir, 'stack.xml'), 'w') as f:
+                f.write(STACK%{'name': os.path.basename(stack_dir)})
+        depends = rand.sample(names, min(len(names), rand.randint(0, 5)))
+        rosdeps = ['bench_rosdep_%02d'%rand.randint(0, 49) for _ in range(2)]
+        d = os.path.join(stack_dir, name)
+        os.makedirs(d)
+        with open(os.path.join(d, 'manifest.xml'), 'w') as f:
+            f.write(MANIFEST%{'name': name,
+                              'depends': '\n'.join(['  <depend package="%s"/>'%p for p in depends]),
+                              'rosdeps': '\n'.join(['  <rosdep name="%s"/>'%r for r in rosdeps])})
+        names.append(name)
+    return names
+
+def deep_size(obj):
+    """
+    @return: size in bytes of obj and all objects reachable from it,
+      counting shared objects once. Unset slots are not materialized.
+    @rtype: int
+    """
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        else:
+            cls = type(o)
+            for c in cls.__mro__:
+                for s in c.__dict__.get('__slots__', ()):
+                    try:
+                        stack.append(c.__dict__[s].__get__(o, cls))
+                    except (AttributeError, KeyError):
+                        pass
+            # avoid hasattr(), which would materialize lazy manifests
+            if cls.__dictoffset__ and not isinstance(o, type):
+                stack.append(object.__getattribute__(o, '__dict__'))
+    return total
+
+def _report(label, manifests, count, elapsed):
+    size = deep_size(manifests)
+    print('%-24s %10.1f KiB %8d B/package %8.3f s'%(label, size / 1024., size // count, elapsed))
+
+def main():
+    parser = OptionParser(usage="usage: %prog [--packages N] [--keep DIR]")
+    parser.add_option('--packages', dest='packages', type='int', default=5000,
+                      help="number of packages to generate")
+    parser.add_option('--keep', dest='keep', default=None,
+                      help="generate the tree in DIR and keep it")
+    options, args = parser.parse_args()
+
+    root = options.keep or tempfile.mkdtemp()
+    try:
+        if not os.path.exists(os.path.join(root, 'bench_stack_000')):
+            generate_tree(root, options.packages)
+        os.environ['ROS_PACKAGE_PATH'] = root
+        # measure parsed manifests, not the manifest cache
+        os.environ['ROS_MANIFEST_CACHE'] = '0'
+
+        import roslib.packages
+        names = sorted([p for p in roslib.packages.list_pkgs_by_path(root) if p.startswith('bench_pkg_')])
+        count = len(names)
+        print('%d packages'%count)
+
+        rp = roslib.packages.ROSPackages()
+        start = time.time()
+        rp.load_manifests(names)
+        rp.depends(names)
+        manifests = dict([(p, rp.manifests[p]) for p in names])
+        _report('dependencies only', manifests, count, time.time() - start)
+
+        start = time.time()
+        for m in manifests.values():
+            m.exports
+        _report('all fields', manifests, count, time.time() - start)
+    finally:
+        if not options.keep:
+            shutil.rmtree(root)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# Revision $Id$
+
+"""
+Startup benchmark for Python ROS nodes.
+
+Generates a synthetic tree of packages (see manifest_memory.py) and a
+minimal std_msgs package, and then repeatedly starts a process that
+runs C{import roslib}, L{roslib.load_manifest()} and
+L{roslib.msgs._init()}. Cold runs start with an empty ROS_HOME, i.e.
+without any roslib caches, warm runs share a ROS_HOME. Per-phase wall
+time and filesystem operation counts are collected with
+ROS_STARTUP_PROFILE (see L{roslib.instrument}) and the median of each
+is reported.
+
+Usage: startup.py [--packages N] [--runs N] [--keep DIR]
+"""
+
+from __future__ import print_function
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+from manifest_memory import generate_tree
+
+PHASES = ['import', 'sys_path', 'crawl', 'manifest_parse', 'msg_load']
+
+NODE = """
+import roslib
+roslib.load_manifest(%r)
+import roslib.msgs
+roslib.msgs._init()
+"""
+
+def generate_std_msgs(root):
+    d = os.path.join(root, 'std_msgs', 'msg')
+    os.makedirs(d)
+    with open(os.path.join(root, 'std_msgs', 'manifest.xml'), 'w') as f:
+        f.write('<package><description>std_msgs</description><author>a</author><license>BSD</license></package>\n')
+    with open(os.path.join(d, 'Header.msg'), 'w') as f:
+        f.write('uint32 seq\ntime stamp\nstring frame_id\n')
+
+def run(package, env, tmp):
+    """
+    Start a node process and collect its startup report.
+    @return: wall time of process, startup report
+    @rtype: float, dict
+    """
+    report_file = os.path.join(tmp, 'report.json')
+    env = dict(env)
+    env['ROS_STARTUP_PROFILE'] = report_file
+    start = time.time()
+    subprocess.check_call([sys.executable, '-c', NODE%package], env=env)
+    elapsed = time.time() - start
+    with open(report_file) as f:
+        return elapsed, json.load(f)
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def summarize(label, results):
+    print('%s: process %.1f ms'%(label, 1000 * _median([r[0] for r in results])))
+    print('  %-16s %10s %8s %8s %8s'%('phase', 'self [ms]', 'stat', 'listdir', 'open'))
+    for name in PHASES:
+        phases = [r[1]['phases'].get(name, None) for r in results]
+        phases = [p for p in phases if p is not None]
+        if not phases:
+            continue
+        counts = [_median([p['fs'].get(op, 0) for p in phases]) for op in ['stat', 'listdir', 'open']]
+        print('  %-16s %10.1f %8d %8d %8d'%tuple([name, 1000 * _median([p['self_time'] for p in phases])] + counts))
+
+def main():
+    parser = OptionParser(usage="usage: %prog [--packages N] [--runs N] [--keep DIR]")
+    parser.add_option('--packages', dest='packages', type='int', default=5000,
+                      help="number of packages to generate")
+    parser.add_option('--runs', dest='runs', type='int', default=5,
+                      help="number of cold and warm runs")
+    parser.add_option('--keep', dest='keep', default=None,
+                      help="generate the tree in DIR and keep it")
+    options, args = parser.parse_args()
+
+    root = options.keep or tempfile.mkdtemp()
+    tmp = tempfile.mkdtemp()
+    try:
+        if not os.path.exists(os.path.join(root, 'bench_stack_000')):
+            generate_tree(root, options.packages)
+        if not os.path.exists(os.path.join(root, 'std_msgs')):
+            generate_std_msgs(root)
+        # the roslib caches skip files modified in the last seconds
+        time.sleep(2.5)
+        package = 'bench_pkg_%05d'%(options.packages // 2)
+        env = dict(os.environ)
+        env['ROS_PACKAGE_PATH'] = root
+
+        cold = []
+        for i in range(options.runs):
+            env['ROS_HOME'] = os.path.join(tmp, 'cold%s'%i)
+            cold.append(run(package, env, tmp))
+        env['ROS_HOME'] = os.path.join(tmp, 'warm')
+        run(package, env, tmp)
+        warm = [run(package, env, tmp) for i in range(options.runs)]
+
+        print('%d packages, loading %s'%(options.packages, package))
+        summarize('cold', cold)
+        summarize('warm', warm)
+    finally:
+        shutil.rmtree(tmp)
+        if not options.keep:
+            shutil.rmtree(root)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2011, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# Revision $Id$
+
+"""
+Benchmark for L{roslib.message.strify_message()} on large messages.
+
+Builds messages with large arrays of numbers and of embedded messages,
+and reports the time and the additional peak memory of converting each
+to text and writing it to /dev/null, both with strify_message() and
+with the streaming L{roslib.message.write_message()}. With --baseline,
+strify_message() of the roslib of another revision, e.g. the
+core/roslib/src directory of an older checkout, is timed as well. Each
+measurement runs in a separate process.
+
+Usage: strify_message.py [--baseline DIR] [--number N] [--size N]
+"""
+
+from __future__ import print_function
+
+import json
+import os
+import subprocess
+import sys
+from optparse import OptionParser
+
+# (name, description)
+BENCHMARKS = [
+    ('Floats', 'float64[] of %d elements'),
+    ('PoseArray', '%d embedded Pose messages'),
+    ('Image', 'uint8[] of %d elements as str'),
+    ]
+
+TIME = """
+import json, os, resource, sys, time
+import genpy
+import roslib.message
+from roslib.message import Message
+
+class Point(Message):
+    __slots__ = ['x', 'y', 'z']
+    _slot_types = ['float64', 'float64', 'float64']
+    def __init__(self):
+        self.x, self.y, self.z = 1., 2., 3.
+class Quaternion(Message):
+    __slots__ = ['x', 'y', 'z', 'w']
+    _slot_types = ['float64', 'float64', 'float64', 'float64']
+    def __init__(self):
+        self.x, self.y, self.z, self.w = 0., 0., 0., 1.
+class Pose(Message):
+    __slots__ = ['position', 'orientation']
+    _slot_types = ['geometry_msgs/Point', 'geometry_msgs/Quaternion']
+    def __init__(self):
+        self.position, self.orientation = Point(), Quaternion()
+class Header(Message):
+    __slots__ = ['seq', 'stamp', 'frame_id']
+    _slot_types = ['uint32', 'time', 'string']
+    def __init__(self):
+        self.seq, self.stamp, self.frame_id = 1, genpy.Time(1, 2), 'map'
+class Floats(Message):
+    __slots__ = ['header', 'data']
+    _slot_types = ['std_msgs/Header', 'float64[]']
+class PoseArray(Message):
+    __slots__ = ['header', 'poses']
+    _slot_types = ['std_msgs/Header', 'geometry_msgs/Pose[]']
+class Image(Message):
+    __slots__ = ['header', 'encoding', 'data']
+    _slot_types = ['std_msgs/Header', 'string', 'uint8[]']
+
+def best(fn, number):
+    times = []
+    for r in range(number):
+        start = time.time()
+        fn()
+        times.append(time.time() - start)
+    return min(times)
+
+name, mode, number, size = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+if name == 'Floats':
+    m = Floats(header=Header(), data=[float(i) for i in range(size)])
+elif name == 'PoseArray':
+    m = PoseArray(header=Header(), poses=[Pose() for i in range(size)])
+else:
+    m = Image(header=Header(), encoding='mono8', data=''.join([chr(i % 256) for i in range(size)]))
+out = open(os.devnull, 'w')
+if mode == 'strify':
+    fn = lambda: out.write(roslib.message.strify_message(m))
+else:
+    fn = lambda: roslib.message.write_message(out, m)
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t = best(fn, number)
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps((t, after - before)))
+"""
+
+def _python_path(*paths):
+    return os.pathsep.join(list(paths) + [p for p in os.environ.get('PYTHONPATH', '').split(os.pathsep) if p])
+
+def _roslib_src():
+    import roslib
+    return os.path.dirname(os.path.dirname(os.path.abspath(roslib.__file__)))
+
+def run(roslib_src, name, mode, number, size):
+    """
+    Time conversion of message name with the roslib in roslib_src.
+    @param mode: 'strify' for strify_message(), 'write' for write_message()
+    @type  mode: str
+    @return: best time [s], additional peak memory [kB]
+    @rtype: (float, int)
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = _python_path(roslib_src)
+    output = subprocess.check_output([sys.executable, '-c', TIME, name, mode, str(number), str(size)], env=env)
+    return tuple(json.loads(output.decode()))
+
+def main():
+    parser = OptionParser(usage="usage: %prog [--baseline DIR] [--number N] [--size N]")
+    parser.add_option('--baseline', dest='baseline', default=None,
+                      help="roslib source directory of the revision to compare with")
+    parser.add_option('--number', dest='number', type='int', default=5,
+                      help="number of calls per measurement")
+    parser.add_option('--size', dest='size', type='int', default=100000,
+                      help="number of array elements")
+    options, args = parser.parse_args()
+
+    columns = [('strify', _roslib_src(), 'strify'), ('write', _roslib_src(), 'write')]
+    if options.baseline:
+        columns.insert(0, ('base', os.path.abspath(options.baseline), 'strify'))
+    print('%-34s'%'[ms, kB]' + ''.join(['%20s'%c for c, _, _ in columns]))
+    for name, description in BENCHMARKS:
+        results = [run(src, name, mode, options.number, options.size) for _, src, mode in columns]
+        print('%-34s'%(description%options.size) + ''.join(['%11.1f %8d'%(1e3 * t, m) for t, m in results]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Shared fixture for tests that generate message packages in a
+temporary ROS_PACKAGE_PATH.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+MANIFEST = '<package><description>%s</description><author>a</author><license>BSD</license>%s</package>\n'
+
+HEADER = 'uint32 seq\ntime stamp\nstring frame_id\n'
+
+def make_package(root, name, depends=[], msgs={}):
+  """
+  Create package name in root with a manifest and .msg files.
+  @param depends: names of packages that name depends on
+  @type  depends: [str]
+  @param msgs: text of each message, keyed by type name
+  @type  msgs: {str: str}
+  """
+  d = os.path.join(root, name)
+  os.makedirs(os.path.join(d, 'msg'))
+  with open(os.path.join(d, 'manifest.xml'), 'w') as f:
+    f.write(MANIFEST%(name, ''.join(['<depend package="%s"/>'%p for p in depends])))
+  for t, text in msgs.items():
+    with open(os.path.join(d, 'msg', t + '.msg'), 'w') as f:
+      f.write(text)
+
+class MsgPackageTestCase(unittest.TestCase):
+  """
+  Test case with std_msgs/Header and the message packages of
+  subclasses on ROS_PACKAGE_PATH. ROS_HOME is a temporary directory
+  as well, so that caches start out empty.
+  """
+
+  # package: ([depends], {type name: text})
+  packages = {}
+
+  def setUp(self):
+    import roslib.msgs
+    self.tmp = tempfile.mkdtemp()
+    self.root = os.path.join(self.tmp, 'root')
+    make_package(self.root, 'std_msgs', [], {'Header': HEADER})
+    for name, (depends, msgs) in self.packages.items():
+      make_package(self.root, name, depends, msgs)
+    self.env = {}
+    for k, v in [('ROS_PACKAGE_PATH', self.root), ('ROS_HOME', os.path.join(self.tmp, 'ros_home'))]:
+      self.env[k] = os.environ.get(k, None)
+      os.environ[k] = v
+    roslib.msgs.reinit()
+
+  def tearDown(self):
+    import roslib.msgs
+    roslib.msgs.reinit()
+    for k, v in self.env.items():
+      if v is None:
+        del os.environ[k]
+      else:
+        os.environ[k] = v
+    shutil.rmtree(self.tmp)
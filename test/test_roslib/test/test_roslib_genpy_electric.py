@@ -0,0 +1,421 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import roslib; roslib.load_manifest('test_roslib')
+
+import os
+import sys
+import unittest
+
+import rosunit
+
+from msg_fixture import MsgPackageTestCase, make_package
+
+class RoslibGenpyElectricTest(MsgPackageTestCase):
+
+  packages = {
+      'gp_geo': (['std_msgs'], {
+          'Point': 'float64 x\nfloat64 y\nfloat64 z\n',
+          'Polygon': 'Header header\nPoint[] points\n'}),
+      'gp_nav': (['gp_geo'], {
+          'Path': 'gp_geo/Polygon[] polygons\nstring name\n',
+          'Goal': 'gp_geo/Point target\nint32 GOAL=1\n'})}
+
+  def _read(self, package, name):
+    with open(os.path.join(self.root, package, 'src', package, 'msg', name)) as f:
+      return f.read()
+
+  def test_generate_messages(self):
+    from roslib.genpy_electric import generate_messages, msg_output_file, msg_generator
+    import roslib.msgs
+    self.assertEquals(os.path.join(self.root, 'gp_geo', 'src', 'gp_geo', 'msg', '_Point.py'), msg_output_file('gp_geo', 'Point'))
+    
+    written = generate_messages(['gp_geo', 'gp_nav'], processes=1)
+    expected = [os.path.join(self.root, p, 'src', p, 'msg', f) for p, f in [
+        ('gp_geo', '_Point.py'), ('gp_geo', '_Polygon.py'), ('gp_nav', '_Goal.py'), ('gp_nav', '_Path.py')]]
+    expected += [os.path.join(self.root, p, 'src', p, 'msg', '__init__.py') for p in ['gp_geo', 'gp_nav']]
+    expected += [os.path.join(self.root, p, 'src', p, '__init__.py') for p in ['gp_geo', 'gp_nav']]
+    self.assertEquals(sorted(expected), sorted(written))
+    self.assertEquals('from _Goal import *\nfrom _Path import *\n', self._read('gp_nav', '__init__.py'))
+
+    # same output as generating a single message
+    roslib.msgs.load_package_dependencies('gp_nav', load_recursive=True)
+    roslib.msgs.load_package('gp_nav')
+    _, spec = roslib.msgs.load_by_type('gp_nav/Path')
+    self.assertEquals(''.join([l + '\n' for l in msg_generator('gp_nav', 'Path', spec)]), self._read('gp_nav', '_Path.py'))
+
+    # only changed files are written
+    self.assertEquals([], generate_messages(['gp_geo', 'gp_nav'], processes=2))
+    with open(os.path.join(self.root, 'gp_geo', 'msg', 'Point.msg'), 'w') as f:
+      f.write('float32 x\nfloat32 y\nfloat32 z\n')
+    changed = sorted([msg_output_file(p, n) for p, n in [('gp_geo', 'Point'), ('gp_geo', 'Polygon'), ('gp_nav', 'Goal'), ('gp_nav', 'Path')]])
+    self.assertEquals(changed, sorted(generate_messages(['gp_geo', 'gp_nav'], dry_run=True)))
+    self.failIf('float32' in self._read('gp_geo', '_Point.py'))
+    self.assertEquals(changed, sorted(generate_messages(['gp_geo', 'gp_nav'], processes=2)))
+    self.assert_('float32' in self._read('gp_geo', '_Point.py'))
+    self.assertEquals([], generate_messages(['gp_geo', 'gp_nav'], dry_run=True))
+
+  def test_fingerprint(self):
+    from roslib.genpy_electric import generate_messages, msg_output_file, compute_fingerprint, read_fingerprint
+    import roslib.genpy_electric
+    import roslib.gentools
+    import roslib.msgs
+    generate_messages(['gp_geo'], processes=1)
+    path = msg_output_file('gp_geo', 'Polygon')
+    roslib.msgs.load_package_dependencies('gp_geo', load_recursive=True)
+    roslib.msgs.load_package('gp_geo')
+    _, spec = roslib.msgs.load_by_type('gp_geo/Polygon')
+    deps = roslib.gentools.get_dependencies(spec, 'gp_geo', compute_files=False)
+    fingerprint = compute_fingerprint('gp_geo', 'Polygon', deps)
+    self.assertEquals(fingerprint, read_fingerprint(path))
+    self.assertEquals(None, read_fingerprint(os.path.join(self.tmp, 'fake.py')))
+
+    # fingerprint covers comments of embedded types and generator version
+    with open(os.path.join(self.root, 'gp_geo', 'msg', 'Point.msg'), 'a') as f:
+      f.write('# comment\n')
+    roslib.msgs.reinit()
+    self.assertEquals(sorted([path, msg_output_file('gp_geo', 'Point')]), sorted(generate_messages(['gp_geo'], dry_run=True)))
+    roslib.msgs.reinit()
+    _, spec = roslib.msgs.load_by_type('gp_geo/Polygon', 'gp_geo')
+    deps = roslib.gentools.get_dependencies(spec, 'gp_geo', compute_files=False)
+    self.assertNotEquals(fingerprint, compute_fingerprint('gp_geo', 'Polygon', deps))
+    version = roslib.genpy_electric.GENERATOR_VERSION
+    try:
+      roslib.genpy_electric.GENERATOR_VERSION = version + 1
+      self.assertNotEquals(compute_fingerprint('gp_geo', 'Polygon', deps), read_fingerprint(path))
+    finally:
+      roslib.genpy_electric.GENERATOR_VERSION = version
+
+  def test_generate_messages_error(self):
+    from roslib.genpy_electric import generate_messages, MsgGenerationException
+    make_package(self.root, 'gp_bad', ['std_msgs'], {'Bad': 'gp_nav/Path path\n'})
+    try:
+      generate_messages(['gp_bad'], processes=1)
+      self.fail("should have raised")
+    except MsgGenerationException:
+      pass
+
+  def test_generate_dynamic(self):
+    import roslib.genpy_electric
+    from roslib.genpy_electric import generate_dynamic
+    try:
+      from cStringIO import StringIO
+    except ImportError:
+      from io import BytesIO as StringIO
+    msg_cat = """gp_geo/Point[] points
+int32 id
+================================================================================
+MSG: gp_geo/Point
+float64 x
+float64 y
+float64 z
+"""
+    sys_path = list(sys.path)
+    msgs = generate_dynamic('gp_nav/Points', msg_cat)
+    self.assertEquals(['gp_geo/Point', 'gp_nav/Points'], sorted(msgs.keys()))
+    self.assertEquals(sys_path, sys.path)
+    m = msgs['gp_nav/Points'](points=[msgs['gp_geo/Point'](1., 2., 3.)], id=7)
+    buff = StringIO()
+    m.serialize(buff)
+    m2 = msgs['gp_nav/Points']().deserialize(buff.getvalue())
+    self.assertEquals(7, m2.id)
+    self.assertEquals(3., m2.points[0].z)
+
+    # classes are cached by content
+    self.assert_(msgs['gp_nav/Points'] is generate_dynamic('gp_nav/Points', msg_cat)['gp_nav/Points'])
+    self.failIf(msgs['gp_nav/Points'] is generate_dynamic('gp_nav/Points2', msg_cat)['gp_nav/Points2'])
+
+    # compiled code is optionally cached on disk
+    compile_dynamic = roslib.genpy_electric._compile_dynamic
+    os.environ['ROS_DYNAMIC_CACHE'] = '1'
+    try:
+      roslib.genpy_electric._dynamic_classes.clear()
+      generate_dynamic('gp_nav/Points', msg_cat)
+      roslib.genpy_electric._dynamic_classes.clear()
+      def fail(*args):
+        self.fail("should have been cached")
+      roslib.genpy_electric._compile_dynamic = fail
+      msgs2 = generate_dynamic('gp_nav/Points', msg_cat)
+      self.failIf(msgs2['gp_nav/Points'] is msgs['gp_nav/Points'])
+      self.assertEquals(msgs['gp_nav/Points']._md5sum, msgs2['gp_nav/Points']._md5sum)
+    finally:
+      roslib.genpy_electric._compile_dynamic = compile_dynamic
+      del os.environ['ROS_DYNAMIC_CACHE']
+
+  def test_zero_copy(self):
+    from roslib.genpy_electric import msg_generator, generate_messages, msg_output_file
+    import roslib.msgs
+    try:
+      from cStringIO import StringIO
+    except ImportError:
+      from io import BytesIO as StringIO
+    with open(os.path.join(self.root, 'gp_nav', 'msg', 'Scan.msg'), 'w') as f:
+      f.write('string frame\nuint8[] data\nuint8[4] tag\nfloat32[] ranges\nint16[3] dims\nbool ok\nint32 n\n')
+    roslib.msgs.load_package_dependencies('gp_nav', load_recursive=True)
+    roslib.msgs.load_package('gp_nav')
+    _, spec = roslib.msgs.load_by_type('gp_nav/Scan')
+    text = '\n'.join(msg_generator('gp_nav', 'Scan', spec, zero_copy=True))
+    self.failIf('str[start:end]' in text)
+    self.assert_('unpack_from' in text)
+    self.assertEquals(text, '\n'.join(msg_generator('gp_nav', 'Scan', spec, zero_copy=True)))
+
+    # zero-copy and regular generated files have different fingerprints
+    generate_messages(['gp_geo'], processes=1)
+    self.assertEquals([], generate_messages(['gp_geo'], dry_run=True))
+    path = msg_output_file('gp_geo', 'Point')
+    self.assert_(path in generate_messages(['gp_geo'], processes=1, zero_copy=True))
+    self.assert_('unpack_from' in self._read('gp_geo', '_Point.py'))
+    self.assertEquals([], generate_messages(['gp_geo'], dry_run=True, zero_copy=True))
+
+    regular = {}
+    exec('\n'.join(msg_generator('gp_nav', 'Scan', spec)), regular)
+    zero_copy = {}
+    exec(text, zero_copy)
+    m = regular['Scan'](frame='laser', data=b'abc', tag=b'wxyz', ranges=[1.5, 2.5], dims=[1, -2, 3], ok=True, n=7)
+    buff = StringIO()
+    m.serialize(buff)
+    data = buff.getvalue()
+    expected = regular['Scan']().deserialize(data)
+    for b in [data, bytearray(data), memoryview(data)]:
+      m2 = zero_copy['Scan']().deserialize(b)
+      for f in m.__slots__:
+        self.assertEquals(getattr(expected, f), getattr(m2, f))
+      self.assertEquals(bytes, type(m2.data))
+    try:
+      zero_copy['Scan']().deserialize(data[:-1])
+      self.fail("should have raised")
+    except roslib.message.DeserializationError:
+      pass
+
+  def test_fused_serializers(self):
+    from roslib.genpy_electric import generate_messages, reduce_pattern, compute_struct_pattern
+    import roslib.message
+    try:
+      from cStringIO import StringIO
+    except ImportError:
+      from io import BytesIO as StringIO
+    self.assertEquals('99d', reduce_pattern('99d'))
+    self.assertEquals('6di', reduce_pattern(compute_struct_pattern(['float64', 'float64[4]', 'float64', 'int32'])))
+    self.assertEquals('b2B', reduce_pattern(compute_struct_pattern(['int8', 'bool[2]'])))
+    self.assertEquals(None, compute_struct_pattern(['float64', 'float64[]']))
+
+    msgs = {
+      'Pose2': 'Point position\nfloat64 theta\n',
+      'Cov': 'Header header\nPose2 pose\nfloat64[4] cov\nint8 k\nbool[2] flags\nint16[3] dims\n',
+      'Poses': 'Pose2[] poses\nfloat32[2] range\nuint8[2] tag\n'}
+    for t, text in msgs.items():
+      with open(os.path.join(self.root, 'gp_geo', 'msg', t + '.msg'), 'w') as f:
+        f.write(text)
+    generate_messages(['std_msgs', 'gp_geo'], processes=1)
+    # fixed-size sub-trees are (de)serialized with a single struct call
+    text = self._read('gp_geo', '_Cov.py')
+    self.assert_('_struct_8db2B3h = struct.Struct("<8db2B3h")' in text, text)
+    text = self._read('gp_geo', '_Poses.py')
+    self.assert_('_struct_4d = struct.Struct("<4d")' in text, text)
+    self.assert_('_struct_3d = ' not in text, text)
+
+    paths = [os.path.join(self.root, p, 'src') for p in ['std_msgs', 'gp_geo']]
+    sys.path[0:0] = paths
+    try:
+      import gp_geo.msg
+      m = gp_geo.msg.Cov()
+      m.header.frame_id = 'base'
+      m.pose.position.z = 3.
+      m.pose.theta = 0.5
+      m.cov = [1., 2., 3., 4.]
+      m.k = -1
+      m.flags = [True, False]
+      m.dims = (1, 2, 3)
+      buff = StringIO()
+      m.serialize(buff)
+      self.assertEquals(buff.getvalue(), self._serialize_reference(m))
+      m2 = gp_geo.msg.Cov().deserialize(buff.getvalue())
+      self.assertEquals(('base', 3., 0.5, (1., 2., 3., 4.), -1, [True, False], (1, 2, 3)),
+                        (m2.header.frame_id, m2.pose.position.z, m2.pose.theta, m2.cov, m2.k, list(m2.flags), m2.dims))
+      # a wrong length must not shift values into the next array of the run
+      m.flags = [True, False, True]
+      m.dims = (1, 2)
+      try:
+        m.serialize(StringIO())
+        self.fail("should have raised")
+      except roslib.message.SerializationError:
+        pass
+
+      m = gp_geo.msg.Poses(poses=[gp_geo.msg.Pose2(gp_geo.msg.Point(i, 2., 3.), i) for i in range(3)], range=[1., 2.], tag='ab')
+      buff = StringIO()
+      m.serialize(buff)
+      m2 = gp_geo.msg.Poses().deserialize(buff.getvalue())
+      self.assertEquals([(i, 2., 3., i) for i in range(3)], [(p.position.x, p.position.y, p.position.z, p.theta) for p in m2.poses])
+      self.assertEquals(((1., 2.), 'ab'), (m2.range, m2.tag))
+
+      m.range = [1.]
+      try:
+        m.serialize(StringIO())
+        self.fail("should have raised")
+      except roslib.message.SerializationError:
+        pass
+    finally:
+      del sys.path[0:2]
+      for k in list(sys.modules.keys()):
+        if k.split('.')[0] in ['std_msgs', 'gp_geo']:
+          del sys.modules[k]
+
+  def test_numpy_struct_arrays(self):
+    from roslib.genpy_electric import generate_messages, msg_output_file
+    import roslib.message
+    import numpy
+    try:
+      from cStringIO import StringIO
+    except ImportError:
+      from io import BytesIO as StringIO
+    with open(os.path.join(self.root, 'gp_geo', 'msg', 'Stamped.msg'), 'w') as f:
+      f.write('time stamp\nbool ok\nPoint p\n')
+    with open(os.path.join(self.root, 'gp_geo', 'msg', 'Track.msg'), 'w') as f:
+      f.write('Stamped[] points\nStamped[2] ends\nPolygon[] polygons\n')
+    generate_messages(['std_msgs', 'gp_geo'], processes=1)
+    path = msg_output_file('gp_geo', 'Track')
+    self.assert_(path in generate_messages(['gp_geo'], dry_run=True, numpy_struct_arrays=True))
+    generate_messages(['std_msgs', 'gp_geo'], processes=1, numpy_struct_arrays=True)
+    self.assertEquals([], generate_messages(['std_msgs', 'gp_geo'], dry_run=True, numpy_struct_arrays=True))
+
+    paths = [os.path.join(self.root, p, 'src') for p in ['std_msgs', 'gp_geo']]
+    sys.path[0:0] = paths
+    try:
+      import gp_geo.msg
+      import genpy
+      def stamped(i):
+        return gp_geo.msg.Stamped(genpy.Time(i, 1), i % 2 == 0, gp_geo.msg.Point(i, 2., 3.))
+      m = gp_geo.msg.Track(points=[stamped(i) for i in range(5)], ends=[stamped(10), stamped(11)],
+                           polygons=[gp_geo.msg.Polygon(points=[gp_geo.msg.Point(1., 2., 3.)])])
+      buff = StringIO()
+      m.serialize(buff)
+      data = buff.getvalue()
+
+      m2 = gp_geo.msg.Track().deserialize_numpy(data, numpy)
+      self.assertEquals(roslib.message.StructArray, type(m2.points))
+      self.assertEquals(roslib.message.StructArray, type(m2.ends))
+      # only fixed-size messages are mapped onto structured arrays
+      self.assertEquals(list, type(m2.polygons))
+      self.assertEquals(5, len(m2.points))
+      self.assertEquals([0., 1., 2., 3., 4.], list(m2.points.array['p.x']))
+      self.assertEquals({}, m2.points._messages)
+      # elements are materialized on access
+      p = m2.points[3]
+      self.assertEquals(stamped(3), p)
+      self.assertEquals(bool, type(p.ok))
+      self.assert_(p is m2.points[-2])
+      self.assertEquals([stamped(i) for i in range(5)], m2.points)
+      self.assertEquals(m.ends, list(m2.ends))
+      self.assertEquals(m, gp_geo.msg.Track().deserialize(data))
+
+      # serialization includes changes to materialized elements
+      buff = StringIO()
+      m2.serialize_numpy(buff, numpy)
+      self.assertEquals(data, buff.getvalue())
+      m2.points[1].p.y = 7.
+      m2.points[2] = stamped(12)
+      m.points[1].p.y = 7.
+      m.points[2] = stamped(12)
+      for serialize in [m2.serialize, lambda b: m2.serialize_numpy(b, numpy)]:
+        buff = StringIO()
+        serialize(buff)
+        expected = StringIO()
+        m.serialize(expected)
+        self.assertEquals(expected.getvalue(), buff.getvalue())
+
+      try:
+        gp_geo.msg.Track().deserialize_numpy(data[:20], numpy)
+        self.fail("should have raised")
+      except roslib.message.DeserializationError:
+        pass
+    finally:
+      del sys.path[0:2]
+      for k in list(sys.modules.keys()):
+        if k.split('.')[0] in ['std_msgs', 'gp_geo']:
+          del sys.modules[k]
+
+  def _serialize_reference(self, m):
+    import struct
+    h = m.header
+    return struct.pack('<3II%ss'%len(h.frame_id), h.seq, h.stamp.secs, h.stamp.nsecs, len(h.frame_id), h.frame_id) + \
+        struct.pack('<8db2B3h', m.pose.position.x, m.pose.position.y, m.pose.position.z, m.pose.theta, *(tuple(m.cov) + (m.k,) + tuple(m.flags) + tuple(m.dims)))
+
+  def test_msg_generator_context(self):
+    from roslib.genpy_electric import msg_generator, get_context
+    import roslib.msgs
+    roslib.msgs.load_package_dependencies('gp_nav', load_recursive=True)
+    roslib.msgs.load_package('gp_nav')
+    _, path = roslib.msgs.load_by_type('gp_nav/Path')
+    _, goal = roslib.msgs.load_by_type('gp_nav/Goal')
+    expected = [list(msg_generator('gp_nav', 'Path', path)), list(msg_generator('gp_nav', 'Goal', goal))]
+    # interleaved generators have separate state
+    generated = [[], []]
+    gens = [msg_generator('gp_nav', 'Path', path), msg_generator('gp_nav', 'Goal', goal)]
+    done = 0
+    while done < 2:
+      done = 0
+      for i, g in enumerate(gens):
+        try:
+          generated[i].append(next(g))
+        except StopIteration:
+          done += 1
+    self.assertEquals(expected, generated)
+    self.assertEquals('', get_context().serial_context)
+    self.assertEquals([], get_context().patterns)
+
+  def test_generate_dynamic_threads(self):
+    import threading
+    from roslib.genpy_electric import generate_dynamic
+    import roslib.msgs
+    before = dict(roslib.msgs.REGISTERED_TYPES)
+    msg_cats = [('gp_dyn/T%s'%i, "Header header\ngp_dyn/Sub%s[] subs\n"%i + '='*80 + "\nMSG: std_msgs/Header\nuint32 seq\ntime stamp\nstring frame_id\n" + '='*80 + "\nMSG: gp_dyn/Sub%s\nint32 a%s\nstring b\n"%(i, i)) for i in range(20)]
+    results = {}
+    errors = []
+    def generate(i):
+      try:
+        for t, msg_cat in msg_cats[i::4]:
+          results[t] = generate_dynamic(t, msg_cat)
+      except Exception as e:
+        errors.append(e)
+    threads = [threading.Thread(target=generate, args=(i,)) for i in range(4)]
+    for t in threads:
+      t.start()
+    for t in threads:
+      t.join()
+    self.assertEquals([], errors)
+    self.assertEquals(before, roslib.msgs.REGISTERED_TYPES)
+    for i, (t, msg_cat) in enumerate(msg_cats):
+      cls = results[t][t]
+      self.assertEquals(['header', 'subs'], cls.__slots__)
+      self.assertEquals(['a%s'%i, 'b'], results[t]['gp_dyn/Sub%s'%i].__slots__)
+    
+if __name__ == '__main__':
+  rosunit.unitrun('test_roslib', 'test_genpy_electric', RoslibGenpyElectricTest, coverage_packages=['roslib.genpy_electric'])
@@ -0,0 +1,115 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import roslib; roslib.load_manifest('test_roslib')
+
+import os
+import sys
+import unittest
+
+import rosunit
+
+from msg_fixture import MsgPackageTestCase
+
+class RoslibGentoolsTest(MsgPackageTestCase):
+
+  packages = {
+      'gt_geo': (['std_msgs'], {
+          'Point': 'float64 x\nfloat64 y\nfloat64 z\n',
+          'Polygon': 'Header header\nPoint[] points\n',
+          'Polygons': 'Polygon[] a\ngt_geo/Polygon[] b\nPoint c\n'})}
+
+  def _md5(self, type_):
+    import roslib.gentools
+    import roslib.msgs
+    package, _ = roslib.names.package_resource_name(type_)
+    _, spec = roslib.msgs.load_by_type(type_)
+    return roslib.gentools.compute_md5(roslib.gentools.get_dependencies(spec, package, compute_files=False))
+
+  def test_compute_md5(self):
+    import roslib.gentools
+    import roslib.md5_cache
+    import roslib.msgs
+    self.assertEquals('2176decaecbce78abc3b96ef049fabed', self._md5('std_msgs/Header'))
+    point = self._md5('gt_geo/Point')
+    self.assertEquals('4a842b65f413084dc2b10fb484ea7f17', point)
+    polygon = self._md5('gt_geo/Polygon')
+    polygons = self._md5('gt_geo/Polygons')
+    
+    # md5sums of embedded types are memoized and persisted
+    cache = roslib.md5_cache.get_cache()
+    self.assert_(len(cache.entries) == 3, cache.entries)
+    roslib.md5_cache.save()
+    cache = roslib.md5_cache.Md5Cache(cache.cache_file)
+    key = ('gt_geo/Polygon', roslib.gentools.hashlib.md5(roslib.msgs.get_registered('gt_geo/Polygon').text).hexdigest())
+    self.assertEquals(polygon, cache.get(key)[0])
+
+    # valid entries are used without computing the md5sum again
+    cache = roslib.md5_cache.get_cache()
+    cache.put(key, 'f'*32, cache.get(key)[1])
+    self.assertNotEquals(polygons, self._md5('gt_geo/Polygons'))
+    cache.put(key, polygon, cache.get(key)[1])
+    self.assertEquals(polygons, self._md5('gt_geo/Polygons'))
+
+    # changes to embedded types invalidate memoized md5sums
+    roslib.msgs.reinit()
+    with open(os.path.join(self.root, 'gt_geo', 'msg', 'Point.msg'), 'w') as f:
+      f.write('float32 x\nfloat32 y\nfloat32 z\n')
+    self.assertNotEquals(point, self._md5('gt_geo/Point'))
+    self.assertNotEquals(polygon, self._md5('gt_geo/Polygon'))
+    self.assertNotEquals(polygons, self._md5('gt_geo/Polygons'))
+
+  def test_get_files_dependencies(self):
+    import roslib.gentools
+    import roslib.msgs
+    d = os.path.join(self.root, 'gt_geo', 'msg')
+    files = [os.path.join(d, t + '.msg') for t in ['Polygons', 'Point', 'Polygon']]
+    self.assertEquals(sorted(files), sorted(roslib.gentools.get_package_files(['gt_geo'])))
+    retvals = roslib.gentools.get_files_dependencies(files)
+    self.assertEquals(sorted(files), sorted(retvals.keys()))
+    for f in files:
+      roslib.msgs.reinit()
+      expected = roslib.gentools.get_file_dependencies(f)
+      for k in ['files', 'deps', 'uniquedeps', 'package']:
+        self.assertEquals(expected[k], retvals[f][k])
+      self.assertEquals(roslib.gentools.compute_md5(expected), roslib.gentools.compute_md5(retvals[f]))
+    self.assertEquals(['gt_geo/Polygon', 'std_msgs/Header', 'gt_geo/Point', 'gt_geo/Polygon', 'std_msgs/Header', 'gt_geo/Point', 'gt_geo/Point'],
+                      retvals[files[0]]['deps'])
+
+    # md5sums of embedded types are shared by all files
+    self.assert_(retvals[files[0]]['md5sums'] is retvals[files[1]]['md5sums'])
+    self.assert_('gt_geo/Polygon' in retvals[files[0]]['md5sums'])
+
+    retvals = roslib.gentools.get_files_dependencies(files, compute_files=False)
+    self.failIf('files' in retvals[files[0]])
+    
+if __name__ == '__main__':
+  rosunit.unitrun('test_roslib', 'test_gentools', RoslibGentoolsTest, coverage_packages=['roslib.gentools', 'roslib.md5_cache'])
@@ -0,0 +1,111 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import roslib; roslib.load_manifest('test_roslib')
+
+import os
+import sys
+import unittest
+
+import rosunit
+
+class RoslibInstrumentTest(unittest.TestCase):
+
+  def setUp(self):
+    import roslib.instrument
+    self.enabled = roslib.instrument._enabled
+    self.phases = roslib.instrument._phases
+    self.other = roslib.instrument._other
+    roslib.instrument._enabled = True
+    roslib.instrument._phases = {}
+    roslib.instrument._other = {}
+
+  def tearDown(self):
+    import roslib.instrument
+    roslib.instrument._enabled = self.enabled
+    roslib.instrument._phases = self.phases
+    roslib.instrument._other = self.other
+    
+  def test_phase(self):
+    import roslib.instrument
+    from roslib.instrument import phase, enter, leave, get_report, _count
+
+    @phase('outer')
+    def outer(n):
+      _count('stat')
+      if n:
+        # recursive activations are not counted twice
+        return outer(n - 1)
+      inner()
+      _count('open')
+      return 'result'
+
+    @phase('inner')
+    def inner():
+      _count('stat')
+      _count('stat')
+      _count('listdir')
+
+    self.assertEquals('outer', outer.__name__)
+    self.assertEquals('result', outer(2))
+    _count('open')
+    report = get_report()
+    self.assertEquals(os.getpid(), report['pid'])
+    self.assertEquals({'open': 1}, report['other']['fs'])
+    self.assertEquals(['inner', 'outer'], sorted(report['phases'].keys()))
+    o = report['phases']['outer']
+    i = report['phases']['inner']
+    self.assertEquals(3, o['calls'])
+    self.assertEquals(1, i['calls'])
+    self.assertEquals({'stat': 3, 'open': 1}, o['fs'])
+    self.assertEquals({'stat': 2, 'listdir': 1}, i['fs'])
+    self.assert_(o['time'] >= i['time'])
+    self.assert_(abs(o['time'] - (o['self_time'] + i['time'])) < 1e-6)
+
+    # enter/leave must be paired
+    enter('explicit')
+    leave('other')
+    leave('explicit')
+    self.assertEquals(1, get_report()['phases']['explicit']['calls'])
+
+  def test_disabled(self):
+    import roslib.instrument
+    from roslib.instrument import phase
+    roslib.instrument._enabled = False
+    def f():
+      pass
+    self.assert_(phase('foo')(f) is f)
+    roslib.instrument.enter('foo')
+    roslib.instrument.leave('foo')
+    self.assertEquals({}, roslib.instrument.get_report()['phases'])
+    
+if __name__ == '__main__':
+  rosunit.unitrun('test_roslib', 'test_instrument', RoslibInstrumentTest, coverage_packages=['roslib.instrument'])
@@ -0,0 +1,171 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import roslib; roslib.load_manifest('test_roslib')
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import rosunit
+
+MANIFEST = """<package>
+  <description>%s</description>
+  <author>author</author>
+  <license>BSD</license>
+%s
+%s
+</package>
+"""
+
+def _make_package(root, name, depends=[], python_path=None):
+  d = os.path.join(root, name)
+  os.makedirs(os.path.join(d, 'src'))
+  if python_path:
+    export = '<export><python path="%s"/></export>'%python_path
+  else:
+    export = ''
+  with open(os.path.join(d, 'manifest.xml'), 'w') as f:
+    f.write(MANIFEST%(name, '\n'.join(['<depend package="%s"/>'%p for p in depends]), export))
+  _age(d)
+
+def _age(d):
+  # move mtimes into the past so that the package is not considered racy
+  for p in [os.path.join(d, 'manifest.xml'), d]:
+    t = os.stat(p).st_mtime - 10
+    os.utime(p, (t, t))
+  
+class RoslibLauncherTest(unittest.TestCase):
+
+  def setUp(self):
+    import roslib.launcher
+    self.tmp = tempfile.mkdtemp()
+    self.root = os.path.join(self.tmp, 'root')
+    _make_package(self.root, 'lc_foo', ['lc_bar', 'lc_baz'])
+    _make_package(self.root, 'lc_bar', ['lc_baz'], '${prefix}/lib:${prefix}/other')
+    _make_package(self.root, 'lc_baz')
+    self.ros_package_path = os.environ.get('ROS_PACKAGE_PATH', None)
+    os.environ['ROS_PACKAGE_PATH'] = self.root
+    self.env = dict(os.environ)
+    self.env['ROS_HOME'] = os.path.join(self.tmp, 'ros_home')
+    self.bootstrapped = roslib.launcher._bootstrapped
+    self.manifest_file = roslib.manifest.manifest_file
+    roslib.launcher._cache_key = None
+    
+  def tearDown(self):
+    import roslib.launcher
+    roslib.launcher._bootstrapped = self.bootstrapped
+    roslib.launcher._cache_key = None
+    roslib.manifest.manifest_file = self.manifest_file
+    if self.ros_package_path is None:
+      del os.environ['ROS_PACKAGE_PATH']
+    else:
+      os.environ['ROS_PACKAGE_PATH'] = self.ros_package_path
+    shutil.rmtree(self.tmp)
+
+  def _generate_python_path(self, pkg):
+    import roslib.launcher
+    roslib.launcher._bootstrapped = set()
+    return roslib.launcher._generate_python_path(pkg, [], self.env)
+    
+  def test_generate_python_path(self):
+    import roslib.launcher
+    foo, bar, baz = [os.path.join(self.root, p) for p in ['lc_foo', 'lc_bar', 'lc_baz']]
+    expected = [os.path.join(foo, 'src'), os.path.join(bar, 'lib'), os.path.join(bar, 'other'), os.path.join(baz, 'src')]
+    self.assertEquals(expected, self._generate_python_path('lc_foo'))
+    self.assertEquals(set(['lc_foo', 'lc_bar', 'lc_baz']), roslib.launcher._bootstrapped)
+    self.assertEquals([], roslib.launcher._generate_python_path('lc_bar', [], self.env))
+    # packages in depends are skipped
+    roslib.launcher._bootstrapped = set()
+    self.assertEquals([os.path.join(bar, 'lib'), os.path.join(bar, 'other')],
+                      roslib.launcher._generate_python_path('lc_bar', ['lc_baz'], self.env))
+    
+  def test_get_package_info(self):
+    import roslib.launcher
+    from roslib.launcher import _get_package_info
+    d = os.path.join(self.root, 'lc_foo')
+    info = _get_package_info('lc_foo', self.env)
+    self.assertEquals((d, [os.path.join(d, 'src')], ['lc_bar', 'lc_baz']), info)
+    paths = self._generate_python_path('lc_foo')
+    roslib.launcher._save_cache()
+    self.assert_(os.path.isfile(roslib.launcher._cache_file))
+    self.assert_(roslib.launcher._cache_file.startswith(self.env['ROS_HOME']))
+
+    # reload from cache file: packages are not located or parsed again
+    roslib.launcher._cache_key = None
+    def manifest_file(*args):
+      raise Exception("should not be called")
+    roslib.manifest.manifest_file = manifest_file
+    self.assertEquals(info, _get_package_info('lc_foo', self.env))
+    self.assertEquals(paths, self._generate_python_path('lc_foo'))
+    roslib.manifest.manifest_file = self.manifest_file
+
+    # entries of changed packages are invalid
+    _make_package(self.root, 'lc_qux')
+    with open(os.path.join(d, 'manifest.xml'), 'w') as f:
+      f.write(MANIFEST%('lc_foo', '<depend package="lc_qux"/>', ''))
+    _age(d)
+    self.assertEquals((d, [os.path.join(d, 'src')], ['lc_qux']), _get_package_info('lc_foo', self.env))
+    os.rmdir(os.path.join(d, 'src'))
+    _age(d)
+    self.assertEquals((d, [], ['lc_qux']), _get_package_info('lc_foo', self.env))
+    self.assert_(roslib.launcher._cache_dirty)
+
+    # recently changed packages are not cached
+    os.makedirs(os.path.join(d, 'src'))
+    self.assertEquals((d, [os.path.join(d, 'src')], ['lc_qux']), _get_package_info('lc_foo', self.env))
+    self.failIf('lc_foo' in roslib.launcher._cache)
+    
+  def test_get_package_info_disabled(self):
+    import roslib.launcher
+    from roslib.launcher import _get_package_info
+    self.env['ROS_MANIFEST_CACHE'] = '0'
+    paths = self._generate_python_path('lc_foo')
+    roslib.launcher._save_cache()
+    self.assertEquals(None, roslib.launcher._cache_file)
+    self.failIf(os.path.exists(os.path.join(self.tmp, 'roslib_cache', 'python_path')))
+    del self.env['ROS_MANIFEST_CACHE']
+    self.assertEquals(paths, self._generate_python_path('lc_foo'))
+    
+  def test_generate_python_path_invalid(self):
+    import roslib.launcher
+    from roslib.packages import InvalidROSPkgException
+    try:
+      self._generate_python_path('fake_package_roslib_launcher')
+      self.fail("should have raised")
+    except InvalidROSPkgException:
+      pass
+    self.failIf('fake_package_roslib_launcher' in roslib.launcher._bootstrapped)
+    
+if __name__ == '__main__':
+  rosunit.unitrun('test_roslib', 'test_launcher', RoslibLauncherTest, coverage_packages=['roslib.launcher'])
@@ -0,0 +1,151 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import roslib; roslib.load_manifest('test_roslib')
+
+import os
+import sys
+import unittest
+
+import rosunit
+
+from msg_fixture import MsgPackageTestCase
+
+class RoslibLazyMessageTest(MsgPackageTestCase):
+
+  packages = {
+      'lm_geo': (['std_msgs'], {
+          'Point': 'float64 x\nfloat64 y\nfloat64 z\n',
+          'Cloud': 'Header header\nPoint[] points\nstring name\nint32[] ids\nuint8[] data\nbool ok\nPoint origin\n' \
+            'duration age\nstring[] tags\nfloat64[2] range\nbool[] flags\nPoint[2] ends\n'})}
+
+  def setUp(self):
+    from roslib.genpy_electric import generate_messages
+    MsgPackageTestCase.setUp(self)
+    generate_messages(['std_msgs', 'lm_geo'], processes=1)
+    sys.path[0:0] = [os.path.join(self.root, p, 'src') for p in ['std_msgs', 'lm_geo']]
+
+  def tearDown(self):
+    del sys.path[0:2]
+    for k in list(sys.modules.keys()):
+      if k.split('.')[0] in ['std_msgs', 'lm_geo']:
+        del sys.modules[k]
+    MsgPackageTestCase.tearDown(self)
+
+  def _cloud(self):
+    import genpy
+    import std_msgs.msg
+    import lm_geo.msg
+    return lm_geo.msg.Cloud(header=std_msgs.msg.Header(3, genpy.Time(4, 5), 'base'),
+                            points=[lm_geo.msg.Point(i, 2., 3.) for i in range(3)],
+                            name='cloud', ids=[1, -2], data='abc', ok=True,
+                            origin=lm_geo.msg.Point(7., 8., 9.), age=genpy.Duration(-1, 5),
+                            tags=['a', 'bc'], range=[0.5, 1.5], flags=[True, False],
+                            ends=[lm_geo.msg.Point(), lm_geo.msg.Point(1., 1., 1.)])
+
+  def _serialize(self, m):
+    try:
+      from cStringIO import StringIO
+    except ImportError:
+      from io import BytesIO as StringIO
+    buff = StringIO()
+    m.serialize(buff)
+    return buff.getvalue()
+
+  def test_lazy_message(self):
+    import roslib.message
+    from roslib.lazy_message import deserialize, lazy_class, is_lazy, materialize
+    import lm_geo.msg
+    Cloud = lm_geo.msg.Cloud
+    data = self._serialize(self._cloud())
+    expected = Cloud().deserialize(data)
+
+    m = deserialize(Cloud, data)
+    self.assert_(isinstance(m, Cloud))
+    self.assert_(lazy_class(Cloud) is type(m))
+    self.assert_(is_lazy(m))
+    # fields are decoded on first access
+    self.assertEquals(True, m.ok)
+    self.assertRaises(AttributeError, Cloud.__dict__['header'].__get__, m, Cloud)
+    self.assertEquals(expected.header, m.header)
+    self.assertEquals('base', Cloud.__dict__['header'].__get__(m, Cloud).frame_id)
+    self.assertRaises(AttributeError, Cloud.__dict__['points'].__get__, m, Cloud)
+    for f in Cloud.__slots__:
+      self.assertEquals(getattr(expected, f), getattr(m, f))
+      self.assertEquals(type(getattr(expected, f)), type(getattr(m, f)))
+    self.assertEquals(expected, m)
+
+    # untouched messages serialize their buffer
+    m = lazy_class(Cloud)().deserialize(data)
+    self.assertEquals('cloud', m.name)
+    self.assertEquals(data, self._serialize(m))
+    m.origin.z = 1.
+    expected.origin.z = 1.
+    self.assertEquals(self._serialize(expected), self._serialize(m))
+    self.failIf(is_lazy(m))
+
+    expected = Cloud().deserialize(data)
+    m = deserialize(Cloud, data)
+    m.name = 'renamed'
+    expected.name = 'renamed'
+    self.assertEquals(self._serialize(expected), self._serialize(m))
+
+    m = deserialize(Cloud, data)
+    header = m.header
+    self.assert_(m is materialize(m))
+    self.failIf(is_lazy(m))
+    self.assert_(header is m.header)
+    self.assertEquals(expected.points, m.points)
+
+    # constructed instances of lazy classes are not lazy
+    m = lazy_class(Cloud)(name='x')
+    self.failIf(is_lazy(m))
+    self.assertEquals([], m.points)
+    self.assertEquals(self._serialize(Cloud(name='x')), self._serialize(m))
+
+  def test_lazy_message_underfill(self):
+    import roslib.message
+    from roslib.lazy_message import deserialize
+    import lm_geo.msg
+    data = self._serialize(self._cloud())
+    m = deserialize(lm_geo.msg.Cloud, data[:40])
+    # fields before the end of the buffer can still be decoded
+    self.assertEquals('base', m.header.frame_id)
+    try:
+      m.range
+      self.fail("should have raised")
+    except roslib.message.DeserializationError:
+      pass
+
+if __name__ == '__main__':
+  rosunit.unitrun('test_roslib', 'test_lazy_message', RoslibLazyMessageTest, coverage_packages=['roslib.lazy_message'])
+
@@ -0,0 +1,230 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import roslib; roslib.load_manifest('test_roslib')
+import roslib.packages
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import rosunit
+
+def _copy(src, dst):
+  shutil.copyfile(src, dst)
+  # move mtime into the past so that the file is not considered racy
+  t = os.stat(dst).st_mtime - 10
+  os.utime(dst, (t, t))
+
+class RoslibManifestCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.mkdtemp()
+    d = os.path.join(roslib.packages.get_pkg_dir('test_roslib'), 'test')
+    self.example = os.path.join(d, 'manifest_tests', 'example1.xml')
+    self.manifest = os.path.join(self.tmp, 'manifest.xml')
+    _copy(self.example, self.manifest)
+    self.stack_example = os.path.join(d, 'manifest_tests', 'stack_example1.xml')
+    self.stack = os.path.join(self.tmp, 'stack.xml')
+    _copy(self.stack_example, self.stack)
+    self.cache_file = os.path.join(self.tmp, 'cache')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp)
+
+  def _assert_manifest_eq(self, a, b):
+    for f in ['description', 'brief', 'author', 'license', 'license_url', 'url',
+              'logo', 'status', 'version', 'notes', 'unknown_tags']:
+      self.assertEquals(getattr(a, f), getattr(b, f), f)
+    for f in ['depends', 'rosdeps', 'platforms', 'exports']:
+      self.assertEquals([x.xml() for x in getattr(a, f)], [x.xml() for x in getattr(b, f)], f)
+    self.assertEquals(a.versioncontrol and a.versioncontrol.xml(), b.versioncontrol and b.versioncontrol.xml())
+    self.assertEquals(a.xml(), b.xml())
+    
+  def test_ManifestCache(self):
+    from roslib.manifest import Manifest
+    from roslib.stack_manifest import StackManifest
+    from roslib.manifestlib import parse_file
+    from roslib.manifest_cache import ManifestCache
+    cache = ManifestCache(self.cache_file)
+    expected = parse_file(Manifest(), self.manifest)
+    self._assert_manifest_eq(expected, cache.parse_file(Manifest(), self.manifest))
+    self.assertEquals([os.path.abspath(self.manifest)], list(cache.entries.keys()))
+    # hit
+    m = cache.parse_file(Manifest(), self.manifest, lazy=True)
+    self._assert_manifest_eq(expected, m)
+    self.assertEquals('package', m._type)
+    self.assertEquals(['pkgname', 'common'], [d.package for d in m.depends])
+
+    # stack manifests are cached with their own type
+    expected = parse_file(StackManifest(), self.stack)
+    cache.parse_file(StackManifest(), self.stack)
+    self._assert_manifest_eq(expected, cache.parse_file(StackManifest(), self.stack))
+    
+    # round trip through cache file
+    self.assert_(cache.save())
+    self.failIf(cache.save())
+    cache2 = ManifestCache(self.cache_file)
+    self._assert_manifest_eq(expected, cache2.parse_file(StackManifest(), self.stack))
+    self.assertEquals({}, cache2._new)
+    self.assertEquals(2, len(cache2.entries))
+
+    # in-process cache
+    cache = ManifestCache(None)
+    cache.parse_file(Manifest(), self.manifest)
+    self.failIf(cache.save())
+    
+  def test_ManifestCache_invalid(self):
+    from roslib.manifest import Manifest
+    from roslib.manifestlib import ManifestException
+    from roslib.manifest_cache import ManifestCache
+    cache = ManifestCache(self.cache_file)
+    cache.parse_file(Manifest(), self.manifest)
+    try:
+      cache.parse_file(Manifest(), os.path.join(self.tmp, 'fake.xml'))
+      self.fail("should have raised")
+    except ValueError:
+      pass
+    _copy(self.stack_example, self.manifest)
+    try:
+      cache.parse_file(Manifest(), self.manifest)
+      self.fail("should have raised")
+    except ManifestException:
+      pass
+
+  def test_ManifestCache_changed(self):
+    from roslib.manifest import Manifest
+    from roslib.manifest_cache import ManifestCache
+    cache = ManifestCache(self.cache_file)
+    self.assertEquals('a brief description', cache.parse_file(Manifest(), self.manifest).brief)
+    self.assert_(cache.save())
+
+    with open(self.example) as f:
+      text = f.read()
+    with open(self.manifest, 'w') as f:
+      f.write(text.replace('a brief description', 'a changed description'))
+    st = os.stat(self.manifest)
+    t = st.st_mtime - 10
+    os.utime(self.manifest, (t, t))
+    self.assertEquals('a changed description', cache.parse_file(Manifest(), self.manifest).brief)
+    self.assertEquals('a changed description', ManifestCache(self.cache_file).parse_file(Manifest(), self.manifest).brief)
+
+    # recent changes are not cached
+    with open(self.manifest, 'w') as f:
+      f.write(text)
+    cache = ManifestCache(self.cache_file)
+    self.assertEquals('a brief description', cache.parse_file(Manifest(), self.manifest).brief)
+    self.assertEquals({}, cache._new)
+    
+  def test_ManifestCache_hash(self):
+    from roslib.manifest import Manifest
+    from roslib.manifest_cache import ManifestCache
+    cache = ManifestCache(self.cache_file, use_hash=True)
+    self.assertEquals('a brief description', cache.parse_file(Manifest(), self.manifest).brief)
+    # same size and mtime, different contents
+    with open(self.example) as f:
+      text = f.read()
+    st = os.stat(self.manifest)
+    with open(self.manifest, 'w') as f:
+      f.write(text.replace('a brief description', 'a BRIEF description'))
+    os.utime(self.manifest, (st.st_atime, st.st_mtime))
+    self.assertEquals('a BRIEF description', cache.parse_file(Manifest(), self.manifest).brief)
+    # without the hash, the change goes unnoticed
+    cache = ManifestCache(self.cache_file)
+    cache.parse_file(Manifest(), self.manifest)
+    with open(self.manifest, 'w') as f:
+      f.write(text)
+    os.utime(self.manifest, (st.st_atime, st.st_mtime))
+    self.assertEquals('a BRIEF description', cache.parse_file(Manifest(), self.manifest).brief)
+
+  def test_ManifestCache_merge(self):
+    import roslib.manifest_cache
+    from roslib.manifest import Manifest
+    from roslib.stack_manifest import StackManifest
+    from roslib.manifest_cache import ManifestCache
+    c1 = ManifestCache(self.cache_file)
+    c2 = ManifestCache(self.cache_file)
+    c1.parse_file(Manifest(), self.manifest)
+    c2.parse_file(StackManifest(), self.stack)
+    self.assert_(c1.save())
+    self.assert_(c2.save())
+    c3 = ManifestCache(self.cache_file)
+    c3._load()
+    self.assertEquals(sorted([os.path.abspath(self.manifest), os.path.abspath(self.stack)]),
+                      sorted(c3.entries.keys()))
+
+    # removed manifests are evicted
+    os.remove(self.stack)
+    c3.parse_file(Manifest(), self.manifest)
+    c3._new = dict(c3.entries)
+    self.assert_(c3.save())
+    c4 = ManifestCache(self.cache_file)
+    c4._load()
+    self.assertEquals([os.path.abspath(self.manifest)], list(c4.entries.keys()))
+
+    # beyond MAX_ENTRIES, the oldest entries are evicted
+    paths = []
+    for i in range(5):
+      p = os.path.join(self.tmp, 'manifest%s.xml'%i)
+      _copy(self.example, p)
+      paths.append(os.path.abspath(p))
+    max_entries = roslib.manifest_cache.MAX_ENTRIES
+    try:
+      roslib.manifest_cache.MAX_ENTRIES = 3
+      c5 = ManifestCache(self.cache_file)
+      for p in paths:
+        c5.parse_file(Manifest(), p)
+      self.assert_(c5.save())
+    finally:
+      roslib.manifest_cache.MAX_ENTRIES = max_entries
+    c6 = ManifestCache(self.cache_file)
+    c6._load()
+    self.assertEquals(sorted(paths[-3:]), sorted(c6.entries.keys()))
+    
+  def test_get_cache(self):
+    import roslib.manifest_cache
+    from roslib.manifest_cache import get_cache, ROS_MANIFEST_CACHE
+    env = {'ROS_HOME': os.path.join(self.tmp, 'ros_home')}
+    cache = get_cache(env)
+    self.assert_(cache is get_cache(env))
+    self.failIf(cache.use_hash)
+    self.assert_(cache.cache_file.startswith(env['ROS_HOME']))
+    env[ROS_MANIFEST_CACHE] = 'hash'
+    self.assert_(get_cache(env).use_hash)
+    env[ROS_MANIFEST_CACHE] = '0'
+    self.assertEquals(None, get_cache(env))
+    # reset to default cache
+    get_cache()
+    
+if __name__ == '__main__':
+  rosunit.unitrun('test_roslib', 'test_manifest_cache', RoslibManifestCacheTest, coverage_packages=['roslib.manifest_cache'])
@@ -230,6 +230,75 @@ class RoslibManifestlibTest(unittest.TestCase):
     parse(m2, m.xml())
     self._subtest_parse_example1(m2)
     
+  def test_parse_description_xhtml(self):
+    from roslib.manifestlib import parse, _Manifest
+    m = parse(_Manifest(), """<package><description brief="b">Text <b class="c" a="1&amp;2">bold &lt;</b><br/><p></p> <!-- c --><![CDATA[<raw>]]></description>
+<author>A <i>not</i> B</author><license>BSD</license></package>""")
+    self.assertEquals('Text <b a="1&amp;2" class="c">bold &lt;</b><br/><p/> <!-- c --><![CDATA[<raw>]]>', m.description)
+    self.assertEquals('b', m.brief)
+    # only direct text is used for non-XHTML fields
+    self.assertEquals('A  B', m.author)
+    self.assertEquals(None, m.url)
+    self.assertEquals('unreviewed', m.status)
+
+  def test_parse_lazy(self):
+    from roslib.manifestlib import parse, _Manifest, ManifestException
+    m = parse(_Manifest(), EXAMPLE1, 'example1', lazy=True)
+    self.assertEquals(['pkgname', 'common'], [d.package for d in m.depends])
+    self.assertEquals(['python', 'bar', 'baz'], [d.name for d in m.rosdeps])
+    # remaining fields are materialized on access
+    self._subtest_parse_example1(m)
+
+    m = parse(_Manifest('stack'), STACK_EXAMPLE1, lazy=True)
+    self._subtest_parse_stack_example1(m)
+    
+    # errors outside of dependencies are deferred
+    m = parse(_Manifest(), EXAMPLE1.replace('<url>', '<author/><url>'), 'example1', lazy=True)
+    self.assertEquals(['pkgname', 'common'], [d.package for d in m.depends])
+    try:
+      m.description
+      self.fail("should have raised")
+    except ManifestException as e:
+      self.assert_('example1' in str(e))
+    # errors in dependencies are not
+    try:
+      parse(_Manifest(), EXAMPLE1.replace('<depend package="common"/>', '<depend />'), lazy=True)
+      self.fail("should have raised")
+    except ManifestException:
+      pass
+    try:
+      parse(_Manifest('stack'), STACK_INVALID1, lazy=True)
+      self.fail("should have raised")
+    except ManifestException:
+      pass
+
+  def test_parse_file_lazy(self):
+    from roslib.manifestlib import parse_file, _Manifest
+    my_dir = roslib.packages.get_pkg_dir('test_roslib')
+    p = os.path.join(my_dir, 'test', 'manifest_tests', 'example1.xml')
+    m = parse_file(_Manifest(), p, lazy=True)
+    # the manifest text is not retained
+    self.assertEquals((None, os.path.abspath(p)), m._lazy)
+    self.assertEquals(['pkgname', 'common'], [d.package for d in m.depends])
+    self._subtest_parse_example1(m)
+    self.assertEquals(None, m._lazy)
+
+  def test_interned_names(self):
+    from roslib.manifestlib import parse, _Manifest, Depend, Export
+    m1 = parse(_Manifest(), EXAMPLE1)
+    m2 = parse(_Manifest(), EXAMPLE1)
+    for a, b in zip(m1.depends, m2.depends):
+      self.assert_(a.package is b.package)
+    for a, b in zip(m1.rosdeps, m2.rosdeps):
+      self.assert_(a.name is b.name)
+    for a, b in zip(m1.exports, m2.exports):
+      self.assert_(a.tag is b.tag)
+    self.assert_(Depend(u'pkgname').package is Depend(u'pkgname').package)
+    self.assert_(Depend('pkgname').package is Depend(''.join(['pkg', 'name'])).package)
+    # model objects are slotted
+    self.failIf(hasattr(Export('cpp', {}, ''), '__dict__'))
+    self.failIf(hasattr(Depend('pkgname'), '__dict__'))
+    
   # bad file examples should be more like the roslaunch tests where there is just 1 thing wrong
   def test_parse_bad_file(self):
     from roslib.manifestlib import parse_file, _Manifest, ManifestException
@@ -0,0 +1,219 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import roslib; roslib.load_manifest('test_roslib')
+
+import sys
+import unittest
+
+import rosunit
+
+_cache = []
+def _classes():
+  if _cache:
+    return _cache[0]
+  from roslib.message import Message
+  class Point(Message):
+    __slots__ = ['x', 'y', 'z', 'id']
+    _slot_types = ['float64', 'float64', 'float64', 'uint32']
+    _type = 'tm_geo/Point'
+    def __init__(self, *args, **kwds):
+      super(Point, self).__init__(*args, **kwds)
+      for f in self.__slots__:
+        if getattr(self, f) is None:
+          setattr(self, f, 0)
+    def _get_types(self):
+      return self._slot_types
+  class Sample(Message):
+    __slots__ = ['i8', 'u8', 'i32', 'u64', 'flag', 'f', 'name', 'stamp', 'd', 'p',
+                 'data', 'values', 'counts', 'flags', 'names', 'stamps', 'points']
+    _slot_types = ['int8', 'uint8', 'int32', 'uint64', 'bool', 'float32', 'string', 'time', 'duration', 'tm_geo/Point',
+                   'uint8[]', 'int16[]', 'uint32[4]', 'bool[]', 'string[]', 'time[]', 'tm_geo/Point[]']
+    _type = 'tm_geo/Sample'
+    def _get_types(self):
+      return self._slot_types
+  _cache.append((Point, Sample))
+  return Point, Sample
+
+class RoslibMessageTest(unittest.TestCase):
+
+  def _sample(self):
+    import genpy
+    Point, Sample = _classes()
+    return Sample(i8=-3, u8=200, i32=2**31-1, u64=2**64-1, flag=True, f=1.5, name='n',
+                  stamp=genpy.Time(1, 2), d=genpy.Duration(3), p=Point(1., 2., 3., 4),
+                  data='abc', values=[-2**15+1, 0, 2**15-1], counts=(0, 1, 2, 2**32-1), flags=[True, 0, 1],
+                  names=['a', 'b'], stamps=[genpy.Time(1)], points=[Point(), Point()])
+
+  def _error(self, fn, *args):
+    from roslib.message import SerializationError
+    try:
+      fn(*args)
+    except SerializationError as e:
+      return str(e)
+    return None
+
+  def _check_type(self, msg):
+    from roslib.message import check_type
+    for n, t in zip(msg.__slots__, msg._get_types()):
+      check_type(n, t, getattr(msg, n))
+
+  def test_get_validator(self):
+    import genpy
+    from roslib.message import get_validator
+    Point, Sample = _classes()
+    validate = get_validator(Sample)
+    self.assert_(validate is get_validator(Sample))
+    m = self._sample()
+    self.assertEquals(None, self._error(validate, m))
+    self.assertEquals(None, self._error(self._check_type, m))
+    m._check_types()
+    m.values = []
+    m.data = [1, 2, 255]
+    self.assertEquals(None, self._error(validate, m))
+
+    if sys.hexversion > 0x03000000:
+      text = str
+    else:
+      text = unicode
+    invalid = [('i8', 128), ('i8', -128), ('i8', 1.), ('i8', True), ('u8', -1), ('u8', 256),
+               ('i32', 2**31), ('u64', 2**64), ('flag', 2), ('name', text('n')), ('name', 1),
+               ('stamp', genpy.Duration(1)), ('d', genpy.Time(1)), ('d', 1), ('p', 1), ('p', Sample()),
+               ('data', (1, 256)), ('data', set([1])),
+               ('values', 'ab'), ('values', [1, 2**15]), ('values', [1, -2**15]), ('values', [1, 'a']),
+               ('counts', [0, -1, 0, 0]), ('flags', [True, 2]), ('flags', [[]]), ('names', ['a', 1]),
+               ('names', ['a', text('b')]), ('stamps', [genpy.Time(1), 1]), ('points', [Point(), 1]),
+               ('points', [Point(), Point(id=-1)]), ('points', None)]
+    for field, value in invalid:
+      m = self._sample()
+      setattr(m, field, value)
+      expected = self._error(self._check_type, m)
+      if expected is None:
+        # not all values are invalid in both Python 2 and 3
+        continue
+      self.assertEquals(expected, self._error(validate, m), field)
+      self.assertEquals(expected, self._error(m._check_types))
+
+    # fields of embedded messages are checked
+    m = self._sample()
+    m.p.id = 2**32
+    self.assertEquals('field p.id exceeds specified width [uint32]', self._error(validate, m))
+    self.assertEquals('field id exceeds specified width [uint32]', self._error(get_validator(Point), m.p))
+    m = self._sample()
+    m.points[1].id = 'a'
+    self.assertEquals('field points[].id must be unsigned integer type', self._error(validate, m))
+
+  def test_strify_message(self):
+    import genpy
+    from roslib.message import strify_message, strify_message_iter, write_message
+    try:
+      from cStringIO import StringIO
+    except ImportError:
+      from io import StringIO
+    Point, Sample = _classes()
+    m = self._sample()
+    m.names = []
+    m.stamps = [genpy.Time(1)]
+    m.points = [Point(id=i) for i in range(3)]
+    p = 'x: 1.0\ny: 2.0\nz: 3.0\nid: 4'
+    self.assertEquals(p, strify_message(m.p))
+    self.assertEquals('\n  x: 1.0\n  y: 2.0\n  z: 3.0\n  id: 4', strify_message(m.p, '  '))
+    self.assertEquals('x: 1.0\nid: 4', strify_message(m.p, field_filter=lambda x: ['x', 'id']))
+    m.p.y = None
+    self.assertEquals('x: 1.0\ny: None\nz: 3.0\nid: 4', strify_message(m.p))
+    m.p.y = 2.
+    self.assertEquals('[]', strify_message([]))
+    self.assertEquals("''", strify_message(''))
+    self.assertEquals(str(list(range(5000))), strify_message(list(range(5000))))
+    self.assertEquals('\n- \n  x: 1.0\n  y: 2.0\n  z: 3.0\n  id: 4', strify_message([m.p]))
+
+    s = strify_message(m)
+    self.assert_(s.startswith('i8: -3\nu8: 200\n'), s)
+    self.assert_('\nname: n\nstamp: \n  secs: 1\n  nsecs: 2\n' in s, s)
+    self.assert_('\ndata: [97, 98, 99]\nvalues: [-32767, 0, 32767]\n' in s, s)
+    self.assert_('\npoints: \n  - \n    x: 0\n    y: 0\n    z: 0\n    id: 0\n  - \n' in s, s)
+    self.assertEquals(s, ''.join(strify_message_iter(m)))
+    buff = StringIO()
+    write_message(buff, m)
+    self.assertEquals(s, buff.getvalue())
+
+    # truncation and summaries of arrays
+    s = strify_message(m, max_array_length=1)
+    self.assert_('\nvalues: [-32767, ... (2 more)]\n' in s, s)
+    self.assert_('\npoints: \n  - \n    x: 0\n    y: 0\n    z: 0\n    id: 0\n  - ... (2 more)' in s, s)
+    self.assertEquals('[... (3 more)]', strify_message([1, 2, 3], max_array_length=0))
+    self.assertEquals('[1, 2, 3]', strify_message([1, 2, 3], max_array_length=3))
+    s = strify_message(m, summarize_arrays=True)
+    self.assert_('\ndata: <array type: uint8, length: 3>\nvalues: <array type: int16, length: 3>\n' in s, s)
+    self.assert_(s.endswith('\npoints: <array type: tm_geo/Point, length: 3>'), s)
+
+  def test_fill_message_args(self):
+    import genpy
+    import roslib.message
+    from roslib.message import fill_message_args, fill_messages, ROSMessageException
+    Point, Sample = _classes()
+    roslib.message._message_class_cache['tm_geo/Point'] = Point
+    try:
+      m = self._sample()
+      m.points = []
+      now = genpy.Time(5)
+      fill_message_args(m, [{'i8': 1, 'name': None, 'stamp': 'now', 'p': {'x': 7.}, 'values': (4, 5),
+                             'points': [{'id': 1}, [1., 2., 3., 4]]}], keys={'now': now})
+      self.assertEquals(1, m.i8)
+      self.assertEquals('', m.name)
+      self.assert_(now is m.stamp)
+      self.assertEquals(Point(7., 2., 3., 4), m.p)
+      self.assertEquals((4, 5), m.values)
+      self.assertEquals([Point(id=1), Point(1., 2., 3., 4)], m.points)
+
+      p = Point()
+      fill_message_args(p, [1., 2., 3., 4])
+      self.assertEquals(Point(1., 2., 3., 4), p)
+      for args in [[1., 2., 3.], [1., 2., 3., 4, 5], [{'q': 1}]]:
+        self.assertRaises(ROSMessageException, fill_message_args, Point(), args)
+      try:
+        fill_message_args(self._sample(), [{'p': {'q': 1}}])
+        self.fail("should have raised")
+      except ROSMessageException as e:
+        self.assertEquals('No field name [p.q]', str(e))
+      self.assertRaises(ROSMessageException, fill_message_args, self._sample(), [{'values': 1}])
+      self.assertRaises(ROSMessageException, fill_message_args, self._sample(), [{'stamp': 'then'}])
+
+      msgs = fill_messages(Point, [{'x': 1.}, [1., 2., 3., 4], [{'id': 3}]])
+      self.assertEquals([Point(x=1.), Point(1., 2., 3., 4), Point(id=3)], msgs)
+      self.assertEquals([], fill_messages(Point, []))
+      self.assertRaises(ROSMessageException, fill_messages, Point, [{'x': 1.}, {'q': 1}])
+    finally:
+      del roslib.message._message_class_cache['tm_geo/Point']
+
+if __name__ == '__main__':
+  rosunit.unitrun('test_roslib', 'test_message', RoslibMessageTest, coverage_packages=['roslib.message'])
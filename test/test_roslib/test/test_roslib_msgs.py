@@ -0,0 +1,129 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import roslib; roslib.load_manifest('test_roslib')
+
+import sys
+import unittest
+
+import rosunit
+
+from msg_fixture import MsgPackageTestCase
+
+class RoslibMsgsTest(MsgPackageTestCase):
+
+  packages = {
+      'lm_base': (['std_msgs'], {'Base': 'Header header\nint32 x\n', 'Bad': 'not a message\n'}),
+      'lm_dep': (['lm_base'], {'Dep': 'lm_base/Base base\nint32 y\n'}),
+      'lm_other': ([], {'Other': 'int32 z\n'}),
+      'lm_main': (['lm_dep'], {'Main': 'lm_dep/Dep dep\n'})}
+
+  def test_load_package_dependencies(self):
+    import roslib.msgs
+    from roslib.msgs import is_registered, get_registered, load_package_dependencies
+    self.failIf(is_registered('lm_dep/Dep'))
+    load_package_dependencies('lm_main')
+    # messages are loaded on first lookup
+    self.failIf('lm_dep/Dep' in roslib.msgs.REGISTERED_TYPES)
+    self.assert_(is_registered('lm_dep/Dep'))
+    spec = get_registered('lm_dep/Dep')
+    self.assertEquals(['lm_base/Base', 'int32'], spec.types)
+    self.assert_(spec is get_registered('Dep', 'lm_dep'))
+    self.assertEquals(1, len(roslib.msgs._lazy_types))
+    # only direct dependencies are registered
+    self.failIf(is_registered('lm_base/Base'))
+    self.failIf(is_registered('lm_other/Other'))
+    self.failIf(is_registered('lm_dep/Fake'))
+    try:
+      get_registered('Fake', 'lm_dep')
+      self.fail("should have raised")
+    except KeyError:
+      pass
+    
+    load_package_dependencies('lm_main', load_recursive=True)
+    self.assertEquals(['Header', 'int32'], get_registered('lm_base/Base').types)
+    self.failIf(is_registered('lm_base/Bad'))
+    self.failIf(is_registered('lm_other/Other'))
+
+    # explicit registrations take precedence
+    roslib.msgs.register('lm_base/Base', spec)
+    self.assert_(spec is get_registered('lm_base/Base'))
+    
+    roslib.msgs.reinit()
+    self.failIf(is_registered('lm_dep/Dep'))
+    self.assertEquals(0, len(roslib.msgs._lazy_types))
+
+  def test_lazy_cache_size(self):
+    import roslib.msgs
+    from roslib.msgs import _LRUCache
+    c = _LRUCache(2)
+    c.put('a', 1)
+    c.put('b', 2)
+    self.assertEquals(1, c.get('a'))
+    c.put('c', 3)
+    self.assertEquals(None, c.get('b'))
+    self.assertEquals(1, c.get('a'))
+    self.assertEquals(3, c.get('c'))
+    self.assertEquals(2, len(c))
+
+    lazy_types = roslib.msgs._lazy_types
+    roslib.msgs._lazy_types = _LRUCache(1)
+    try:
+      roslib.msgs.load_package_dependencies('lm_main', load_recursive=True)
+      dep = roslib.msgs.get_registered('lm_dep/Dep')
+      roslib.msgs.get_registered('lm_base/Base')
+      self.assertEquals(1, len(roslib.msgs._lazy_types))
+      # evicted messages are loaded again
+      self.assertEquals(dep, roslib.msgs.get_registered('lm_dep/Dep'))
+    finally:
+      roslib.msgs._lazy_types = lazy_types
+
+  def test_local_registry(self):
+    import threading
+    import roslib.msgs
+    from roslib.msgs import local_registry, register, is_registered, get_registered
+    spec = roslib.msgs.load_from_string('int32 x\n', 'lm_local')
+    with local_registry() as registry:
+      register('lm_local/Local', spec)
+      self.assert_(spec is registry['lm_local/Local'])
+      self.assert_(is_registered('lm_local/Local'))
+      self.assert_(spec is get_registered('Local', 'lm_local'))
+      # the local registry is not visible to other threads
+      seen = []
+      t = threading.Thread(target=lambda: seen.append(is_registered('lm_local/Local')))
+      t.start()
+      t.join()
+      self.assertEquals([False], seen)
+    self.failIf(is_registered('lm_local/Local'))
+    self.failIf('lm_local/Local' in roslib.msgs.REGISTERED_TYPES)
+    
+if __name__ == '__main__':
+  rosunit.unitrun('test_roslib', 'test_msgs', RoslibMsgsTest, coverage_packages=['roslib.msgs'])
@@ -0,0 +1,197 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import roslib; roslib.load_manifest('test_roslib')
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import rosunit
+
+def _touch(path):
+  with open(path, 'w') as f:
+    f.write('<package/>\n')
+
+def _bump_mtime(path):
+  # move mtime into the past so that the change is not considered racy
+  t = os.stat(path).st_mtime - 10
+  os.utime(path, (t, t))
+  
+class RoslibPackageIndexTest(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.mkdtemp()
+    self.env = {'ROS_HOME': os.path.join(self.tmp, 'ros_home')}
+    self.root = os.path.join(self.tmp, 'root')
+    for d in ['s1/foo', 's1/bar', 'sub/baz', 'nosub/hidden_pkg', '.svn/svn_pkg']:
+      os.makedirs(os.path.join(self.root, d))
+    _touch(os.path.join(self.root, 's1', 'stack.xml'))
+    for p in ['s1/foo', 's1/bar', 'sub/baz', 'nosub/hidden_pkg', '.svn/svn_pkg']:
+      _touch(os.path.join(self.root, p, 'manifest.xml'))
+    _touch(os.path.join(self.root, 'nosub', 'rospack_nosubdirs'))
+    
+  def tearDown(self):
+    import roslib.package_index
+    roslib.package_index.clear()
+    shutil.rmtree(self.tmp)
+
+  def _index(self):
+    from roslib.package_index import PackageIndex, CACHE_NAME
+    import roslib.diskcache
+    cache_file = roslib.diskcache.get_cache_file(CACHE_NAME, (self.root,), self.env)
+    return PackageIndex([self.root], cache_file)
+    
+  def test_PackageIndex(self):
+    index = self._index()
+    self.assertEquals(['bar', 'foo', 'baz'], index.list_packages())
+    self.assertEquals(['s1'], index.list_stacks())
+    self.assertEquals(os.path.join(self.root, 's1', 'foo'), index.get_pkg_dir('foo'))
+    self.assertEquals(os.path.join(self.root, 's1'), index.get_stack_dir('s1'))
+    self.assertEquals('s1', index.get_stack_of('foo'))
+    self.assertEquals(None, index.get_stack_of('baz'))
+    self.assertEquals(None, index.get_pkg_dir('hidden_pkg'))
+    self.assertEquals(None, index.get_pkg_dir('svn_pkg'))
+    self.assertEquals(None, index.get_stack_dir('fake'))
+    mtime = os.stat(os.path.join(self.root, 's1', 'foo', 'manifest.xml')).st_mtime
+    self.assertEquals(mtime, index.get_manifest_mtime('foo'))
+
+  def test_PackageIndex_persist(self):
+    index = self._index()
+    self.assertEquals(['bar', 'foo', 'baz'], index.list_packages())
+    self.assert_(os.path.isfile(index.cache_file))
+    # reload from disk
+    index = self._index()
+    self.assertEquals(['bar', 'foo', 'baz'], index.list_packages())
+    self.assertEquals(['s1'], index.list_stacks())
+
+  def test_PackageIndex_incremental(self):
+    for d, _, _ in os.walk(self.root):
+      _bump_mtime(d)
+    index = self._index()
+    self.assertEquals(['bar', 'foo', 'baz'], index.list_packages())
+    
+    # add a package, which must be noticed by a new index loaded from disk
+    d = os.path.join(self.root, 'sub', 'new_pkg')
+    os.makedirs(d)
+    _touch(os.path.join(d, 'manifest.xml'))
+    index = self._index()
+    self.assertEquals(['bar', 'foo', 'baz', 'new_pkg'], index.list_packages())
+    
+    # an in-process index must revalidate on lookup failure
+    d = os.path.join(self.root, 'sub', 'new_pkg2')
+    os.makedirs(d)
+    _touch(os.path.join(d, 'manifest.xml'))
+    self.assertEquals(d, index.get_pkg_dir('new_pkg2'))
+
+    # remove a package
+    shutil.rmtree(os.path.join(self.root, 's1', 'bar'))
+    index = self._index()
+    self.assertEquals(None, index.get_pkg_dir('bar'))
+    self.assertEquals(['foo', 'baz', 'new_pkg', 'new_pkg2'], index.list_packages())
+
+  def test_PackageIndex_precedence(self):
+    from roslib.package_index import PackageIndex
+    root2 = os.path.join(self.tmp, 'root2')
+    os.makedirs(os.path.join(root2, 'foo'))
+    _touch(os.path.join(root2, 'foo', 'manifest.xml'))
+    index = PackageIndex([root2, self.root])
+    self.assertEquals(os.path.join(root2, 'foo'), index.get_pkg_dir('foo'))
+    index = PackageIndex([self.root, root2])
+    self.assertEquals(os.path.join(self.root, 's1', 'foo'), index.get_pkg_dir('foo'))
+    
+  def test_PackageIndex_symlink_cycle(self):
+    if not hasattr(os, 'symlink'):
+      return
+    from roslib.package_index import PackageIndex
+    os.symlink(self.root, os.path.join(self.root, 'sub', 'loop'))
+    index = PackageIndex([self.root])
+    self.assertEquals(['bar', 'foo', 'baz'], index.list_packages())
+    
+  def test_PackageIndex_threads(self):
+    from roslib.package_index import PackageIndex
+    for i in range(20):
+      d = os.path.join(self.root, 'many', 'd%02d'%i, 'pkg%02d'%i)
+      os.makedirs(d)
+      _touch(os.path.join(d, 'manifest.xml'))
+    _touch(os.path.join(self.root, 'many', 'd05', 'stack.xml'))
+    serial = PackageIndex([self.root], threads=1)
+    threaded = PackageIndex([self.root], threads=4)
+    self.assertEquals(serial.list_packages(), threaded.list_packages())
+    self.assertEquals(serial.list_stacks(), threaded.list_stacks())
+    self.assertEquals(serial.packages, threaded.packages)
+    self.assertEquals(['d05', 's1'], threaded.list_stacks())
+    self.assertEquals('d05', threaded.get_stack_of('pkg05'))
+    self.assertEquals(23, len(threaded.list_packages()))
+
+  def test_PackageIndex_listdir(self):
+    import roslib.package_index
+    from roslib.package_index import PackageIndex
+    expected = PackageIndex([self.root]).list_packages()
+    scandir = roslib.package_index._scandir
+    try:
+      roslib.package_index._scandir = None
+      self.assertEquals(expected, PackageIndex([self.root]).list_packages())
+    finally:
+      roslib.package_index._scandir = scandir
+      
+  def test_get_index(self):
+    from roslib.package_index import get_index
+    index = get_index([self.root], env=self.env)
+    self.assert_(index is get_index([self.root], env=self.env))
+    self.assertEquals(['bar', 'foo', 'baz'], index.list_packages())
+
+    # in-process indices are only revalidated on request
+    d = os.path.join(self.root, 's2', 'new_pkg')
+    os.makedirs(d)
+    _touch(os.path.join(d, 'manifest.xml'))
+    _touch(os.path.join(self.root, 's2', 'stack.xml'))
+    self.assertEquals(['bar', 'foo', 'baz'], get_index([self.root], env=self.env).list_packages())
+    self.assertEquals(['bar', 'foo', 'new_pkg', 'baz'], get_index([self.root], env=self.env, refresh=True).list_packages())
+
+  def test_list_by_path(self):
+    import roslib.packages
+    import roslib.stacks
+    env = {'ROS_ROOT': self.root, 'ROS_HOME': self.env['ROS_HOME']}
+    self.assertEquals(['bar', 'foo', 'baz'], roslib.packages.list_pkgs_by_path(self.root, env=env))
+    self.assertEquals(['s1'], roslib.stacks.list_stacks_by_path(self.root, env=env))
+    # listings are revalidated against the filesystem on each call
+    d = os.path.join(self.root, 's2', 'new_pkg')
+    os.makedirs(d)
+    _touch(os.path.join(d, 'manifest.xml'))
+    _touch(os.path.join(self.root, 's2', 'stack.xml'))
+    self.assertEquals(['bar', 'foo', 'new_pkg', 'baz'], roslib.packages.list_pkgs_by_path(self.root, env=env))
+    self.assertEquals(['s1', 's2'], roslib.stacks.list_stacks_by_path(self.root, env=env))
+    
+if __name__ == '__main__':
+  rosunit.unitrun('test_roslib', 'test_package_index', RoslibPackageIndexTest, coverage_packages=['roslib.package_index'])
@@ -185,6 +185,120 @@ class RoslibPackagesTest(unittest.TestCase):
         self.assertEquals({p: []},  rp.rosdeps([p]))      
     
     
+  def test_ROSPackages_depends_on(self):
+    from roslib.packages import ROSPackages
+    import roslib.rospack
+    rp = ROSPackages()
+    # depends is in topological order
+    for p in ['test_roslib', 'rosmake']:
+      d = rp.depends([p])[p]
+      self.assertEquals(set(roslib.rospack.rospackexec(['deps', p]).split()), set(d))
+      for i, q in enumerate(d):
+        self.failIf(set(rp.depends([q])[q]) & set(d[i:]))
+
+    x = rp.depends_on1(['roslib', 'rosunit'])
+    self.assertEquals(set(['roslib', 'rosunit']), set(x.keys()))
+    self.assert_('test_roslib' in x['roslib'])
+    self.assert_('test_roslib' in x['rosunit'])
+    self.assert_('rosmake' in x['roslib'])
+    self.assert_('test_rospack' not in x['roslib'])
+    x = rp.depends_on(['rospack'])
+    self.assert_('test_roslib' in x['rospack'])
+    self.assert_('test_rospack' in x['rospack'])
+    self.assert_('rospack' not in x['rospack'])
+    for p in ['roslib', 'rospack']:
+      self.assertEquals(set(roslib.rospack.rospackexec(['depends-on', p]).split()), set(rp.depends_on([p])[p]))
+      self.assertEquals(set(roslib.rospack.rospackexec(['depends-on1', p]).split()), set(rp.depends_on1([p])[p]))
+    self.assertEquals({'fake': []}, rp.depends_on(['fake']))
+    self.assertEquals({'fake': []}, rp.depends_on1(['fake']))
+
+    # bulk query must agree with single queries and with depends()
+    all_packages = roslib.rospack.rospackexec(['list-names']).split()
+    depends = rp.depends(all_packages)
+    x = rp.depends_on(all_packages)
+    self.assertEquals(set(all_packages), set(x.keys()))
+    for p in all_packages:
+      self.assertEquals(set([q for q in all_packages if p in depends[q]]), set(x[p]))
+      self.assertEquals(x[p], ROSPackages().depends_on([p])[p])
+    # results must not alias the cache
+    x['roslib'].append('fake')
+    self.assert_('fake' not in rp.depends_on(['roslib'])['roslib'])
+
+  def test_ROSPackages_cycles(self):
+    from roslib.packages import ROSPackages
+    from roslib.manifestlib import Depend, ROSDep
+    def manifest(depends, rosdeps):
+      m = roslib.manifest.Manifest()
+      m.depends = [Depend(d) for d in depends]
+      m.rosdeps = [ROSDep(r) for r in rosdeps]
+      return m
+    # a -> b -> c -> b, c -> d, e -> e
+    rp = ROSPackages()
+    rp.manifests = {'a': manifest(['b'], ['ra']), 'b': manifest(['c'], ['rb']),
+                    'c': manifest(['b', 'd'], []), 'd': manifest([], ['rd']),
+                    'e': manifest(['e'], ['re'])}
+    self.assertEquals(['d', 'b'], rp.depends(['c'])['c'])
+    x = rp.depends(['a', 'b', 'c', 'd', 'e'])
+    self.assertEquals(['d'], x['a'][:1])
+    self.assertEquals(set(['b', 'c', 'd']), set(x['a']))
+    self.assertEquals(set(['c', 'd']), set(x['b']))
+    self.assertEquals(set(['b', 'd']), set(x['c']))
+    self.assertEquals([], x['d'])
+    self.assertEquals([], x['e'])
+    x = rp.rosdeps(['a', 'b', 'c', 'd', 'e'])
+    self.assertEquals(set(['ra', 'rb', 'rd']), set(x['a']))
+    self.assertEquals(set(['rb', 'rd']), set(x['b']))
+    self.assertEquals(set(['rb', 'rd']), set(x['c']))
+    self.assertEquals(['rd'], x['d'])
+    self.assertEquals(['re'], x['e'])
+
+  def test_ROSPackages_depends_on_cycles(self):
+    from roslib.packages import ROSPackages
+    from roslib.manifestlib import Depend
+    def manifest(depends):
+      m = roslib.manifest.Manifest()
+      m.depends = [Depend(d) for d in depends]
+      return m
+    # a <-> b, d -> a, e -> d, c
+    def packages():
+      rp = ROSPackages()
+      rp.manifests = {'a': manifest(['b']), 'b': manifest(['a']), 'c': manifest([]),
+                      'd': manifest(['a']), 'e': manifest(['d'])}
+      rp._all_packages = ['a', 'b', 'c', 'd', 'e']
+      return rp
+    expected = {'a': ['a', 'b', 'd', 'e'], 'b': ['a', 'b', 'd', 'e'], 'c': [], 'd': ['e'], 'e': []}
+    # closures do not depend on the order of queries
+    for query in [['a', 'b'], ['b', 'a'], ['e', 'd', 'b', 'a', 'c']]:
+      rp = packages()
+      x = rp.depends_on(query)
+      for p in query:
+        self.assertEquals(expected[p], x[p])
+      for p in expected:
+        self.assertEquals(expected[p], rp.depends_on([p])[p])
+        self.assertEquals(expected[p], packages().depends_on([p])[p])
+
+  def test__decode_bits(self):
+    from roslib.packages import _decode_bits
+    names = ['a', 'b', 'c', 'd']
+    self.assertEquals([], _decode_bits(0, names))
+    self.assertEquals(['a'], _decode_bits(1, names))
+    self.assertEquals(['b', 'd'], _decode_bits(10, names))
+    self.assertEquals(names, _decode_bits(15, names))
+
+  def test__export_flags(self):
+    from roslib.packages import _export_flags, _get_ros_os
+    from roslib.manifestlib import Export
+    m = roslib.manifest.Manifest()
+    self.assertEquals('', _export_flags(m, 'foo', 'plugin', '/tmp'))
+    m.exports = [Export('foo', {'plugin': '${prefix}/plugin.xml'}, ''),
+                 Export('foo', {'plugin': 'other.xml', 'os': 'other_os'}, ''),
+                 Export('bar', {'plugin': 'a   b'}, '')]
+    self.assertEquals('/tmp/plugin.xml', _export_flags(m, 'foo', 'plugin', '/tmp'))
+    self.assertEquals('a b', _export_flags(m, 'bar', 'plugin', '/tmp'))
+    self.assertEquals('', _export_flags(m, 'bar', 'cpp', '/tmp'))
+    m.exports.append(Export('foo', {'plugin': '`echo os`.xml', 'os': _get_ros_os()}, ''))
+    self.assertEquals('os.xml', _export_flags(m, 'foo', 'plugin', '/tmp'))
+    
   def test__platform_supported(self):
     self.assertTrue(roslib.packages._platform_supported(os.path.join(roslib.packages.get_pkg_dir("test_roslib"), "test", "platform_supported.manifest.xml"), "test_os", "test_version"))
     self.assertFalse(roslib.packages._platform_supported(os.path.join(roslib.packages.get_pkg_dir("test_roslib"), "test", "platform_supported.manifest.xml"), "test_os", "not_test_version"))
@@ -49,6 +49,25 @@ class RoslibRospackTest(unittest.TestCase):
     self.assertEquals(set(['rospack']), set(rospack_depends_1('roslib')))    
     self.assertEquals(set(['roslib', 'rosdep']), set(rospack_depends_1('rosmake')))
     self.assertEquals(set(['roslib', 'rosdep', 'rospack']), set(rospack_depends('rosmake')))
+    # order must match rospack
+    for p in ['rosmake', 'test_roslib']:
+      self.assertEquals(rospackexec(['deps', p]).split(), rospack_depends(p))
+      self.assertEquals(rospackexec(['deps1', p]).split(), rospack_depends_1(p))
+    self.assertEquals(set(rospackexec(['depends-on', 'roslib']).split()), set(rospack_depends_on('roslib')))
+    self.assertEquals(set(rospackexec(['depends-on1', 'roslib']).split()), set(rospack_depends_on_1('roslib')))
+    self.assertEquals([], rospack_depends_on('fake_package'))
+
+    import roslib.exceptions
+    for f in [rospack_depends, rospack_depends_1]:
+      try:
+        f('fake_package')
+        self.fail("should have raised")
+      except roslib.exceptions.ROSLibException:
+        pass
+
+  def test_rospack_plugins(self):
+    from roslib.rospack import rospack_plugins
+    self.assertEquals([], rospack_plugins('rospack'))
 
   def test_rosstack(self):
     from roslib.rospack import rosstackexec, rosstack_depends, rosstack_depends_1,\
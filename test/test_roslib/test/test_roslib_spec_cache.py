@@ -0,0 +1,162 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import roslib; roslib.load_manifest('test_roslib')
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import rosunit
+
+MSG = """# comment
+Header header
+int32 X=1
+string S= a # b
+foo/Bar[] bars
+Baz[3] baz
+"""
+
+def _write(path, text):
+  with open(path, 'w') as f:
+    f.write(text)
+  # move mtime into the past so that the file is not considered racy
+  t = os.stat(path).st_mtime - 10
+  os.utime(path, (t, t))
+
+class RoslibSpecCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    import roslib.spec_cache
+    self.tmp = tempfile.mkdtemp()
+    self.ros_home = os.environ.get('ROS_HOME', None)
+    os.environ['ROS_HOME'] = os.path.join(self.tmp, 'ros_home')
+    self.caches = roslib.spec_cache._caches
+    roslib.spec_cache._caches = {}
+    for d in ['msg', 'srv']:
+      os.makedirs(os.path.join(self.tmp, 'pkg', d))
+    self.msg = os.path.join(self.tmp, 'pkg', 'msg', 'Foo.msg')
+    self.srv = os.path.join(self.tmp, 'pkg', 'srv', 'Foo.srv')
+    _write(self.msg, MSG)
+    _write(self.srv, MSG + '---\n' + MSG)
+    
+  def tearDown(self):
+    import roslib.spec_cache
+    roslib.spec_cache._caches = self.caches
+    if self.ros_home is None:
+      del os.environ['ROS_HOME']
+    else:
+      os.environ['ROS_HOME'] = self.ros_home
+    shutil.rmtree(self.tmp)
+
+  def _reset(self):
+    # simulate a new process
+    import roslib.spec_cache
+    roslib.spec_cache.save()
+    roslib.spec_cache._caches = {}
+    
+  def test_msgs(self):
+    import roslib.msgs
+    import roslib.spec_cache
+    expected = roslib.msgs.load_from_file(self.msg, 'pkg')
+    self.assertEquals(1, len(roslib.spec_cache._caches))
+    self._reset()
+    def fail(*args):
+      raise Exception("should not be called")
+    load_from_string = roslib.msgs.load_from_string
+    try:
+      roslib.msgs.load_from_string = fail
+      name, spec = roslib.msgs.load_from_file(self.msg, 'pkg')
+    finally:
+      roslib.msgs.load_from_string = load_from_string
+    self.assertEquals(expected[0], name)
+    self.assertEquals(expected[1], spec)
+    for a in ['types', 'names', 'full_name', 'short_name', 'package']:
+      self.assertEquals(getattr(expected[1], a), getattr(spec, a))
+    self.assertEquals(['Header', 'foo/Bar[]', 'pkg/Baz[3]'], spec.types)
+    self.assertEquals([('int32', 'X', 1, '1'), ('string', 'S', 'a # b', 'a # b')],
+                      [(c.type, c.name, c.val, c.val_text) for c in spec.constants])
+    self.assertEquals([(f.name, f.base_type, f.is_array, f.array_len) for f in expected[1].parsed_fields()],
+                      [(f.name, f.base_type, f.is_array, f.array_len) for f in spec.parsed_fields()])
+
+    # specs are cached per package context
+    name, spec = roslib.msgs.load_from_file(self.msg)
+    self.assertEquals('Foo', name)
+    self.assertEquals(['Header', 'foo/Bar[]', 'Baz[3]'], spec.types)
+    
+  def test_srvs(self):
+    import roslib.srvs
+    expected = roslib.srvs.load_from_file(self.srv, 'pkg')
+    self._reset()
+    name, spec = roslib.srvs.load_from_file(self.srv, 'pkg')
+    self.assertEquals(expected, (name, spec))
+    self.assertEquals('pkg/FooRequest', spec.request.full_name)
+    self.assertEquals('FooResponse', spec.response.short_name)
+    
+  def test_changed(self):
+    import roslib.msgs
+    import roslib.spec_cache
+    roslib.msgs.load_from_file(self.msg, 'pkg')
+    self._reset()
+    _write(self.msg, MSG + 'int32 y\n')
+    _, spec = roslib.msgs.load_from_file(self.msg, 'pkg')
+    self.assert_('y' in spec.names)
+    self._reset()
+    _, spec = roslib.msgs.load_from_file(self.msg, 'pkg')
+    self.assert_('y' in spec.names)
+    # recently modified files are not cached
+    with open(self.msg, 'w') as f:
+      f.write(MSG)
+    _, spec = roslib.msgs.load_from_file(self.msg, 'pkg')
+    self.failIf('y' in spec.names)
+    self.assertEquals({}, list(roslib.spec_cache._caches.values())[0]._new)
+    # entries of removed files are dropped
+    os.remove(self.msg)
+    cache = list(roslib.spec_cache._caches.values())[0]
+    cache._new = dict(cache.entries)
+    self.assert_(cache.save())
+    cache._load()
+    self.assertEquals({}, cache.entries)
+
+  def test_disabled(self):
+    import roslib.spec_cache
+    from roslib.spec_cache import lookup
+    env = {'ROS_HOME': os.environ['ROS_HOME']}
+    self.assertEquals((None, None), lookup(os.path.join(self.tmp, 'fake.msg'), 'pkg', env))
+    self.assertEquals(None, lookup(self.msg, 'pkg', env)[0])
+    self.assertNotEquals(None, lookup(self.msg, 'pkg', env)[1])
+    env['ROS_SPEC_CACHE'] = '0'
+    self.assertEquals((None, None), lookup(self.msg, 'pkg', env))
+    
+if __name__ == '__main__':
+  rosunit.unitrun('test_roslib', 'test_spec_cache', RoslibSpecCacheTest, coverage_packages=['roslib.spec_cache'])
@@ -232,6 +232,26 @@ class RoslibStacksTest(unittest.TestCase):
         for c in check:
             self.assert_(c in valid, "expected [%s] to be in ros expansion"%c)
             
+    def test_ROSStacks(self):
+        import roslib.packages
+        from roslib.stacks import ROSStacks
+        d = roslib.packages.get_pkg_dir('test_roslib')
+        d = os.path.join(d, 'test', 'stack_depends_tests')
+        env = os.environ.copy()
+        env[rospkg.environment.ROS_PACKAGE_PATH] = d
+        rs = ROSStacks(env=env)
+        try:
+            rs.load_manifests('sa')
+            self.fail("should have raised")
+        except TypeError:
+            pass
+        self.assertEquals({'sa': [], 'sb': ['sa'], 'sc': ['sb']}, rs.depends1(['sa', 'sb', 'sc']))
+        self.assertEquals({'sa': [], 'sb': ['sa'], 'sc': ['sa', 'sb']}, rs.depends(['sa', 'sb', 'sc']))
+        self.assertEquals({'sa': ['sb'], 'sc': []}, rs.depends_on1(['sa', 'sc']))
+        self.assertEquals({'sa': ['sb', 'sc'], 'sb': ['sc'], 'ros': []}, rs.depends_on(['sa', 'sb', 'ros']))
+        # non-existent stacks have no dependencies
+        self.assertEquals({'fake': []}, rs.depends(['fake']))
+        
     def test_get_stack_version(self):
         from roslib.stacks import get_stack_version
         